@@ -33,6 +33,9 @@ setup(
         'xdg',
         'PyYAML'
     ],
+    extras_require={
+        'asyncio': ['aio-pika']
+    },
     data_files=[
         ('/etc/villas/controller', glob('etc/*.{json,yaml}')),
         ('/etc/systemd/system', ['villas-controller.service'])
@@ -0,0 +1,82 @@
+""" Benchmark for adding and removing components at runtime.
+
+Runs a ControllerMixin with many dummy simulators on kombu's memory://
+transport and measures a single component being added and removed.
+The former behaviour, which re-declared the consumers of all components
+on each change, is compared with the incremental update.
+
+Usage: python -m tests.bench_churn [components] [changes]
+"""
+import sys
+import time
+
+import kombu
+
+# Registers the headers exchange for the memory transport
+import tests.conftest  # noqa F401
+
+from villas.controller.controller import ControllerMixin
+from villas.controller.components.simulators.dummy import DummySimulator
+
+
+def make_simulator(i):
+    return DummySimulator(category='simulator',
+                          type='dummy',
+                          name=f'Dummy Simulator #{i}',
+                          realm='de.rwth-aachen.eonerc.acs',
+                          workdir_root='/tmp/villas-bench-churn')
+
+
+def redeclare(mixin):
+    # Restarting the ConsumerMixin cancelled all consumers and
+    # declared and consumed the queues of all components again
+    for consumer in mixin.consumers.values():
+        consumer.cancel()
+
+    mixin.consumers = {}
+    for uuid, comp in mixin.active_components.items():
+        consumer = comp.get_consumer(mixin.channel)
+        consumer.consume()
+
+        mixin.consumers[uuid] = consumer
+
+
+def churn(mixin, changes, full):
+    start = time.perf_counter()
+
+    for i in range(changes):
+        comp = make_simulator(i)
+
+        mixin.components[comp.uuid] = comp
+        mixin.on_iteration()
+        if full:
+            redeclare(mixin)
+
+        del mixin.components[comp.uuid]
+        mixin.on_iteration()
+        if full:
+            redeclare(mixin)
+
+    # Each iteration adds and removes a component
+    return (time.perf_counter() - start) / (2 * changes)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    changes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with kombu.Connection('memory://') as conn:
+        sims = [make_simulator(i) for i in range(count)]
+        mixin = ControllerMixin(conn, sims)
+
+        with mixin.consumer_context():
+            mixin.on_iteration()
+
+            for name, full in [('full re-declare', True),
+                               ('incremental', False)]:
+                duration = churn(mixin, changes, full)
+                print(f'{name:<24} {duration * 1e3:8.2f} ms per change')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+""" Benchmark comparing per-component queues with the shared dispatcher.
+
+Declares the queues of N dummy simulators on kombu's memory:// transport
+either with a queue per component or with a single queue and local
+header dispatch (daemon --single-queue). We report the queues and
+bindings of the broker, the memory which the broker state allocates
+and the latency from publishing an action to its dispatch to the
+addressed component.
+
+The in-memory broker polls its queues in turn, so the latency of
+per-component queues grows with their number like the work of a real
+broker does. Absolute figures differ from RabbitMQ.
+
+Usage: python -m tests.bench_dispatcher [components] [messages]
+"""
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import kombu
+import kombu.transport.memory
+
+# Registers the headers exchange for the memory transport
+import tests.conftest  # noqa F401
+
+from villas.controller.controller import ControllerMixin
+from villas.controller.components.simulators.dummy import DummySimulator
+
+
+def make_simulator(i):
+    return DummySimulator(category='simulator',
+                          type='dummy',
+                          name=f'Dummy Simulator #{i}',
+                          realm='de.rwth-aachen.eonerc.acs',
+                          workdir_root='/tmp/villas-bench-dispatcher')
+
+
+def broker_state():
+    """ Return the queues and bindings of the 'villas' exchange. """
+    state = kombu.transport.memory.Transport.global_state
+    bindings = [key for key in state.bindings if key.exchange == 'villas']
+
+    return len({key.queue for key in bindings}), len(bindings)
+
+
+def run(count, messages, single_queue):
+    # Each configuration starts with an empty broker
+    kombu.transport.memory.Channel.queues.clear()
+    kombu.transport.memory.Transport.global_state.clear()
+
+    with kombu.Connection('memory://') as conn:
+        sims = [make_simulator(i) for i in range(count)]
+        mixin = ControllerMixin(conn, sims, single_queue=single_queue)
+
+        received = []
+        for sim in sims:
+            def on_message(message):
+                received.append(time.perf_counter())
+
+            sim.on_message = on_message
+
+        # Allocations of the virtual transport belong to the broker
+        tracemalloc.start()
+        start = tracemalloc.take_snapshot()
+
+        with mixin.consumer_context() as (connection, channel, consumers):
+            mixin.on_iteration()
+
+            stats = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(True, '*/kombu/transport/*')
+            ]).compare_to(start.filter_traces([
+                tracemalloc.Filter(True, '*/kombu/transport/*')
+            ]), 'filename')
+            memory = sum(s.size_diff for s in stats)
+            tracemalloc.stop()
+
+            queues, bindings = broker_state()
+
+            producer = kombu.Producer(channel, exchange=mixin.exchange)
+            latencies = []
+
+            for _ in range(messages):
+                sim = random.choice(sims)
+                received.clear()
+
+                sent = time.perf_counter()
+                producer.publish({'action': 'ping'},
+                                 headers={'uuid': sim.uuid})
+
+                while not received:
+                    connection.drain_events(timeout=5)
+
+                latencies.append(received[0] - sent)
+
+            mixin.scheduler.stop()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+
+    return queues, bindings, memory, statistics.median(latencies), p99
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print(f'{count} components, {messages} messages')
+    print(f'{"":<16} {"queues":>8} {"bindings":>9} {"memory":>10}'
+          f' {"median":>10} {"p99":>10}')
+
+    for name, single_queue in [('per-component', False),
+                               ('shared', True)]:
+        queues, bindings, memory, median, p99 = \
+            run(count, messages, single_queue)
+
+        print(f'{name:<16} {queues:>8} {bindings:>9}'
+              f' {memory / 1024:>6.0f} KiB {median * 1e3:>7.2f} ms'
+              f' {p99 * 1e3:>7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
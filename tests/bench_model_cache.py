@@ -0,0 +1,87 @@
+""" Benchmark for downloading and extracting zipped models.
+
+Serves a synthetic model from a local HTTP server and compares the
+former download path (8 KiB chunks, serial extraction) with the
+ModelCache.
+
+Usage: python -m tests.bench_model_cache [size in MiB] [members]
+"""
+import functools
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from villas.controller.model_cache import ModelCache
+
+
+class Handler(SimpleHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+def make_model(path, size, members):
+    block = os.urandom(1 << 20)
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for i in range(members):
+            with z.open(f'model/part{i}.bin', 'w') as f:
+                for _ in range(size // members >> 20):
+                    f.write(block)
+
+
+def legacy(url, workdir):
+    fn = os.path.join(workdir, 'model.zip')
+
+    with requests.get(url, stream=True) as r:
+        r.raise_for_status()
+        with open(fn, 'wb') as f:
+            for chunk in r.iter_content(chunk_size=8192):
+                f.write(chunk)
+
+    with zipfile.ZipFile(fn) as z:
+        z.extractall(os.path.join(workdir, 'tree'))
+
+
+def measure(name, func):
+    start = time.perf_counter()
+    func()
+    print(f'{name:<24} {time.perf_counter() - start:8.2f} s')
+
+
+def main():
+    size = int(sys.argv[1]) << 20 if len(sys.argv) > 1 else 1 << 30
+    members = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    root = tempfile.mkdtemp()
+    try:
+        make_model(os.path.join(root, 'model.zip'), size, members)
+
+        handler = functools.partial(Handler, directory=root)
+        srv = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+        url = f'http://127.0.0.1:{srv.server_port}/model.zip'
+
+        measure('legacy', functools.partial(
+            legacy, url, tempfile.mkdtemp(dir=root)))
+
+        cache = ModelCache(os.path.join(root, 'cache'))
+        measure('cache (cold)', functools.partial(cache.fetch, url))
+        measure('cache (warm)', functools.partial(cache.fetch, url))
+
+        srv.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+""" Benchmark for the periodic status publishing of many components.
+
+Compares the former publisher thread per component with the shared
+Scheduler of the controller. Each configuration runs in a separate
+process with dummy simulators on kombu's memory:// transport. Threads,
+RSS and CPU usage are reported after a measurement window.
+
+Usage: python -m tests.bench_scheduler [window in s] [components ...]
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import kombu
+import psutil
+
+# Registers the headers exchange for the memory transport
+import tests.conftest  # noqa F401
+
+from villas.controller.controller import ControllerMixin
+from villas.controller.components.simulators.dummy import DummySimulator
+
+
+def make_simulator(i):
+    return DummySimulator(category='simulator',
+                          type='dummy',
+                          name=f'Dummy Simulator #{i}',
+                          realm='de.rwth-aachen.eonerc.acs',
+                          workdir_root='/tmp/villas-bench-scheduler')
+
+
+def publisher_thread(comp, stop):
+    # The former publisher thread of each component
+    def run():
+        while not stop.wait(comp.publish_status_interval):
+            comp.publish_status()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+
+def run(mode, count, window):
+    with kombu.Connection('memory://') as conn:
+        sims = [make_simulator(i) for i in range(count)]
+        mixin = ControllerMixin(conn, sims)
+
+        with mixin.consumer_context():
+            mixin.on_iteration()
+
+            stop = threading.Event()
+            if mode == 'before':
+                for sim in sims:
+                    mixin.scheduler.remove(sim.uuid)
+                    publisher_thread(sim, stop)
+            else:
+                mixin.scheduler.start()
+
+            start = os.times()
+            time.sleep(window)
+            end = os.times()
+
+            cpu = (end.user - start.user + end.system - start.system) / \
+                (end.elapsed - start.elapsed)
+
+            print(threading.active_count(),
+                  psutil.Process().memory_info().rss >> 20,
+                  round(cpu * 100))
+
+            stop.set()
+            mixin.scheduler.stop()
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        return run(sys.argv[2], int(sys.argv[3]), float(sys.argv[4]))
+
+    window = float(sys.argv[1]) if len(sys.argv) > 1 else 6
+    counts = [int(c) for c in sys.argv[2:]] or [1000, 10000]
+
+    print(f'{"":<12} {"threads":>8} {"RSS":>10} {"CPU":>6}')
+
+    for count in counts:
+        for mode in ['before', 'after']:
+            out = subprocess.check_output([
+                sys.executable, '-m', 'tests.bench_scheduler',
+                '--run', mode, str(count), str(window)
+            ], text=True)
+
+            threads, rss, cpu = out.split()[-3:]
+            name = f'{count // 1000}k {mode}'
+
+            print(f'{name:<12} {threads:>8} {rss:>6} MiB {cpu:>5}%')
+
+
+if __name__ == '__main__':
+    main()
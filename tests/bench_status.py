@@ -0,0 +1,71 @@
+""" Microbenchmark for the generation of status messages.
+
+Compares the former status property, which rebuilt the whole dict
+including hostname and kernel version on each call, with the cached
+static fields, the pre-serialized template and delta updates.
+
+Usage: python -m tests.bench_status [iterations]
+"""
+import json
+import os
+import socket
+import sys
+import time
+
+from villas.controller import __version__ as version
+from villas.controller.component import Component
+
+
+def legacy_status(comp):
+    status = {
+        'state': comp._state,
+        'version': version,
+        'uptime': time.time() - comp.started,
+        'host': socket.gethostname(),
+        'kernel': os.uname(),
+        **comp._status_fields
+    }
+
+    if comp.manager is not None:
+        status['managed_by'] = comp.manager.uuid
+
+    return {
+        'status': status,
+        'properties': {
+            **comp.properties,
+            **comp.headers
+        }
+    }
+
+
+def measure(name, iterations, func):
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+
+    rate = iterations / (time.perf_counter() - start)
+    print(f'{name:<32} {rate / 1e3:8.0f}k/s')
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    comp = Component(category='simulator',
+                     type='dummy',
+                     name='Dummy Simulator',
+                     realm='de.rwth-aachen.eonerc.acs')
+
+    last = comp.status
+
+    measure('legacy status + json.dumps', iterations,
+            lambda i: json.dumps(legacy_status(comp)))
+    measure('status + json.dumps', iterations,
+            lambda i: json.dumps(comp.status))
+    measure('status_json() from template', iterations,
+            comp.status_json)
+    measure('status delta + json.dumps', iterations,
+            lambda i: json.dumps(Component.status_delta(last, comp.status)))
+
+
+if __name__ == '__main__':
+    main()
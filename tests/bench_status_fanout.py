@@ -0,0 +1,105 @@
+""" Load test for the delivery of status updates.
+
+Publishes one status tick of N dummy simulators in the same realm on
+kombu's memory:// transport and counts the messages which are delivered
+to the component queues and to a monitor. The former behaviour, which
+published status on the 'villas' exchange, is compared with the
+dedicated 'villas.status' exchange.
+
+Usage: python -m tests.bench_status_fanout [components]
+"""
+import sys
+import time
+
+import kombu
+
+# Registers the headers exchange for the memory transport
+import tests.conftest  # noqa F401
+
+from villas.controller.controller import ControllerMixin
+from villas.controller.components.simulators.dummy import DummySimulator
+
+
+def make_simulator(i):
+    return DummySimulator(category='simulator',
+                          type='dummy',
+                          name=f'Dummy Simulator #{i}',
+                          realm='de.rwth-aachen.eonerc.acs',
+                          workdir_root='/tmp/villas-bench-fanout')
+
+
+def legacy_publish(comp):
+    # Status used to share the exchange of the actions
+    def publish(payload, **kwargs):
+        comp.publish(payload,
+                     headers=comp.headers,
+                     exchange=comp.exchange,
+                     declare=[comp.exchange],
+                     **kwargs)
+
+    return publish
+
+
+def drain(connection):
+    while True:
+        try:
+            connection.drain_events(timeout=0.1)
+        except (TimeoutError, OSError):
+            return
+
+
+def tick(count, legacy):
+    with kombu.Connection('memory://') as conn:
+        sims = [make_simulator(i) for i in range(count)]
+        mixin = ControllerMixin(conn, sims)
+
+        deliveries = {sim.uuid: 0 for sim in sims}
+        for sim in sims:
+            def on_message(message, uuid=sim.uuid):
+                deliveries[uuid] += 1
+
+            sim.on_message = on_message
+
+            if legacy:
+                sim._publish_status = legacy_publish(sim)
+
+        with mixin.consumer_context() as (connection, channel, consumers):
+            mixin.on_iteration()
+
+            monitor = []
+            exchange = sims[0].exchange if legacy else sims[0].status_exchange
+            consumer = kombu.Consumer(channel, queues=kombu.Queue(
+                exchange=exchange,
+                binding_arguments={'x-match': 'any', 'category': 'simulator'},
+                durable=False
+            ), on_message=monitor.append, no_ack=True)
+            consumer.consume()
+
+            start = time.perf_counter()
+
+            for sim in sims:
+                sim.publish_status()
+
+            drain(connection)
+
+            duration = time.perf_counter() - start - 0.1
+
+        return sum(deliveries.values()), len(monitor), duration
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    print(f'{count} components, one status tick')
+    print(f'{"":<10} {"components":>12} {"per comp.":>10} {"monitor":>8}'
+          f' {"time":>10}')
+
+    for name, legacy in [('before', True), ('after', False)]:
+        comps, monitor, duration = tick(count, legacy)
+
+        print(f'{name:<10} {comps:>12} {comps / count:>10.1f} {monitor:>8}'
+              f' {duration * 1e3:>7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
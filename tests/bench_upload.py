@@ -0,0 +1,96 @@
+""" Benchmark for archiving and uploading simulation results.
+
+Compares the former path (write results.zip, then PUT the file) with
+the streaming upload of an UploadJob against a local HTTP server.
+
+Usage: python -m tests.bench_upload [files] [file size in KiB]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from villas.controller.uploader import UploadJob
+
+
+class Handler(BaseHTTPRequestHandler):
+    """ Discards the body of all PUT requests. """
+
+    def do_PUT(self):
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                self.rfile.read(size + 2)
+                if size == 0:
+                    break
+        else:
+            self.rfile.read(int(self.headers['Content-Length']))
+
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def make_results(folder, files, size):
+    os.makedirs(folder)
+
+    # Log-like data which compresses reasonably well
+    line = b'%d,0.123456,0.654321,1.000000\n'
+    for i in range(files):
+        with open(os.path.join(folder, f'signal{i}.csv'), 'wb') as f:
+            f.write(b''.join(line % j for j in range(size // len(line))))
+
+
+def legacy(url, folder, workdir):
+    filename = os.path.join(workdir, 'results.zip')
+    with zipfile.ZipFile(filename, 'w') as z:
+        for sub in os.scandir(folder):
+            z.write(sub.path, sub.name)
+
+    with open(filename, 'rb') as f:
+        requests.put(url, data=f).raise_for_status()
+
+
+def measure(name, func, *args):
+    start = time.perf_counter()
+    func(*args)
+    print(f'{name:<24} {time.perf_counter() - start:8.2f} s')
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    size = int(sys.argv[2]) << 10 if len(sys.argv) > 2 else 16 << 10
+
+    root = tempfile.mkdtemp()
+    try:
+        folder = os.path.join(root, 'Logs')
+        make_results(folder, files, size)
+
+        srv = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+        url = f'http://127.0.0.1:{srv.server_port}/results.zip'
+
+        measure('legacy', legacy, url, folder, root)
+
+        for level in [0, 6]:
+            job = UploadJob(url, folder, level)
+            measure(f'streaming (level {level})', job.upload)
+
+        srv.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import kombu.transport.memory
+
+from kombu.transport.virtual.exchange import ExchangeType
+
+
+class HeadersExchange(ExchangeType):
+    """ Minimal headers exchange for kombu's in-memory transport. """
+
+    type = 'headers'
+
+    def prepare_bind(self, queue, exchange, routing_key, arguments):
+        return routing_key, tuple(sorted((arguments or {}).items())), queue
+
+    def lookup(self, table, exchange, routing_key, default):
+        return {queue for _, _, queue in table}
+
+    def deliver(self, message, exchange, routing_key, **kwargs):
+        headers = message.get('headers') or {}
+        queues = set()
+
+        for _, arguments, queue in self.channel.get_table(exchange):
+            if self.matches(dict(arguments), headers):
+                queues.add(queue)
+
+        for queue in queues:
+            self.channel._put(queue, message, **kwargs)
+
+    @staticmethod
+    def matches(arguments, headers):
+        match = arguments.pop('x-match', 'all')
+        hits = [k in headers and headers[k] == v
+                for k, v in arguments.items()]
+
+        return any(hits) if match == 'any' else all(hits)
+
+
+class Channel(kombu.transport.memory.Channel):
+    """ The virtual transports identify bindings only by their routing key.
+
+    Headers exchanges ignore the routing key, so we derive one from the
+    binding arguments to support multiple bindings per queue.
+    """
+
+    exchange_types = {
+        **kombu.transport.memory.Channel.exchange_types,
+        'headers': HeadersExchange
+    }
+
+    def _routing_key(self, exchange, routing_key, arguments):
+        if self.typeof(exchange).type == 'headers':
+            return repr(sorted((arguments or {}).items()))
+
+        return routing_key
+
+    def queue_bind(self, queue, exchange=None, routing_key='',
+                   arguments=None, **kwargs):
+        routing_key = self._routing_key(exchange, routing_key, arguments)
+
+        return super().queue_bind(queue, exchange, routing_key,
+                                  arguments, **kwargs)
+
+    def queue_unbind(self, queue, exchange=None, routing_key='',
+                     arguments=None, **kwargs):
+        routing_key = self._routing_key(exchange, routing_key, arguments)
+
+        return super().queue_unbind(queue, exchange, routing_key,
+                                    arguments, **kwargs)
+
+
+kombu.transport.memory.Transport.Channel = Channel
@@ -0,0 +1,37 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from villas.controller.archiver import ZipStream
+
+
+@pytest.mark.parametrize('level', [0, 6])
+def test_zip_stream(tmp_path, level):
+    files = {
+        'a.log': b'Hello' * 1000,
+        'sub/b.csv': os.urandom(1000),
+        'sub/large.bin': b'0123456789' * 100000,
+        'empty': b'',
+        'umlaut-ä.txt': 'ä'.encode()
+    }
+
+    for name, data in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(data)
+
+    # Larger files are compressed in chunks with a data descriptor
+    stream = ZipStream(str(tmp_path), level, workers=2,
+                       chunk_size=4096, small_size=10000)
+    body = b''.join(stream)
+
+    assert stream.read == sum(len(d) for d in files.values())
+
+    with zipfile.ZipFile(io.BytesIO(body)) as z:
+        assert z.testzip() is None
+        assert sorted(z.namelist()) == sorted(files)
+
+        for name, data in files.items():
+            assert z.read(name) == data
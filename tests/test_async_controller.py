@@ -0,0 +1,176 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+aio_pika = pytest.importorskip('aio_pika')
+
+from villas.controller.async_controller import AsyncController  # noqa E402
+from villas.controller.components.simulators.dummy import DummySimulator  # noqa E402, E501
+
+
+class FakeExchange:
+    """ A headers exchange of the fake broker. """
+
+    def __init__(self, broker, name):
+        self.broker = broker
+        self.name = name
+        self.published = []
+
+    async def publish(self, message, routing_key=''):
+        self.published.append(message)
+
+        headers = message.headers or {}
+        for queue in self.broker.queues:
+            if queue.matches(self, headers):
+                await queue.deliver(message)
+
+
+class FakeIncomingMessage:
+
+    def __init__(self, message):
+        self.body = message.body
+        self.headers = message.headers
+
+    def info(self):
+        return {'headers': self.headers}
+
+
+class FakeQueue:
+
+    def __init__(self):
+        self.bindings = set()
+        self.callback = None
+
+    async def bind(self, exchange, arguments):
+        self.bindings.add((exchange.name, tuple(sorted(arguments.items()))))
+
+    async def unbind(self, exchange, arguments):
+        self.bindings.discard((exchange.name,
+                               tuple(sorted(arguments.items()))))
+
+    async def consume(self, callback, no_ack=False):
+        self.callback = callback
+
+    def matches(self, exchange, headers):
+        for name, arguments in self.bindings:
+            arguments = dict(arguments)
+            arguments.pop('x-match')
+
+            if name == exchange.name and \
+               any(headers.get(k) == v for k, v in arguments.items()):
+                return True
+
+        return False
+
+    async def deliver(self, message):
+        if self.callback is not None:
+            await self.callback(FakeIncomingMessage(message))
+
+
+class FakeChannel:
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    async def declare_exchange(self, name, type, durable=False):
+        return self.broker.exchanges.setdefault(name,
+                                                FakeExchange(self.broker,
+                                                             name))
+
+    async def declare_queue(self, exclusive=False):
+        queue = FakeQueue()
+        self.broker.queues.append(queue)
+
+        return queue
+
+
+class FakeBroker:
+    """ Stands in for aio_pika.connect_robust() and the broker. """
+
+    def __init__(self):
+        self.exchanges = {}
+        self.queues = []
+
+    async def connect_robust(self, url):
+        return self
+
+    async def channel(self):
+        return FakeChannel(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def status(self):
+        exchange = self.exchanges.get('villas.status')
+        if exchange is None:
+            return []
+
+        return [json.loads(m.body) for m in exchange.published]
+
+
+async def wait_for(cond, timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        if cond():
+            return
+
+        await asyncio.sleep(0.01)
+
+    raise TimeoutError()
+
+
+def binding(sim):
+    return 'villas', (('uuid', sim.uuid), ('x-match', 'any'))
+
+
+def test_async_controller(monkeypatch, tmp_path):
+    broker = FakeBroker()
+    monkeypatch.setattr(aio_pika, 'connect_robust', broker.connect_robust)
+
+    sims = [DummySimulator(category='simulator',
+                           type='dummy',
+                           realm='de.rwth-aachen.eonerc.acs',
+                           workdir_root=str(tmp_path))
+            for _ in range(3)]
+
+    pinged = threading.Event()
+    sims[1].ping = lambda message: pinged.set()
+
+    controller = AsyncController('amqp://localhost', sims)
+
+    async def main():
+        task = asyncio.create_task(controller.main())
+
+        # All components share a single bound queue
+        await wait_for(lambda: broker.queues and
+                       all(binding(sim) in broker.queues[0].bindings
+                           for sim in sims))
+
+        assert len(broker.queues) == 1
+
+        # Actions are dispatched to the addressed components
+        for sim in sims[:2]:
+            await broker.exchanges['villas'].publish(aio_pika.Message(
+                json.dumps({'action': 'ping'}).encode(),
+                headers={'uuid': sim.uuid}))
+
+        await wait_for(pinged.is_set)
+
+        # Replies are published from the action workers
+        # through the event loop
+        await wait_for(lambda: any(s['properties']['uuid'] == sims[0].uuid
+                                   for s in broker.status()))
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+
+    # The final states are published before the loop ends
+    gone = {s['properties']['uuid'] for s in broker.status()
+            if s['status']['state'] == 'gone'}
+    assert {sim.uuid for sim in sims} <= gone
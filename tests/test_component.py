@@ -0,0 +1,80 @@
+import json
+
+from villas.controller.component import Component
+
+
+class Producer:
+
+    def __init__(self):
+        self.messages = []
+
+    def acquire(self, block=False):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def publish(self, payload, **kwargs):
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+
+        self.messages.append(payload)
+
+
+def test_status_delta():
+    comp = Component(category='simulator',
+                     type='dummy',
+                     publish_status_delta=True,
+                     publish_status_full_interval=3)
+    comp.producers = Producer()
+
+    comp.change_state('running', msg='Hello')
+    comp.publish_status_periodically()
+    comp.change_state('idle')
+    comp.publish_status_periodically()
+    comp.publish_status_periodically()
+
+    first, second, third, fourth, fifth = comp.producers.messages
+
+    assert 'delta' not in first
+    assert first['status']['state'] == 'running'
+    assert 'properties' in first
+
+    assert second['delta']
+    assert set(second['status'].keys()) == {'uptime'}
+    assert 'properties' not in second
+
+    assert third['status']['state'] == 'idle'
+    assert third['status']['msg'] is None
+
+    # Every third tick publishes a full snapshot
+    assert fourth['delta']
+    assert 'delta' not in fifth
+    assert 'properties' in fifth
+
+    assert [m['seq'] for m in comp.producers.messages] == [1, 2, 3, 4, 5]
+
+
+def test_status_json():
+    comp = Component(category='simulator', type='dummy')
+    comp.producers = Producer()
+
+    for i in range(2):
+        comp.change_state('running' if i else 'error', msg='Failed')
+        comp.publish_status()
+
+        status = comp.status
+        message = comp.producers.messages[-1]
+
+        assert message['seq'] == comp._status_seq
+        assert message['status']['uptime'] >= status['status']['uptime'] - 1
+        assert message['properties'] == status['properties']
+
+        del message['seq']
+        del message['status']['uptime']
+        del status['status']['uptime']
+
+        assert message == json.loads(json.dumps(status))
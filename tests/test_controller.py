@@ -0,0 +1,247 @@
+import tempfile
+import threading
+import kombu
+
+from villas.controller.controller import ControllerMixin
+from villas.controller.components.simulators.dummy import DummySimulator
+
+
+def make_simulator(i):
+    return DummySimulator(category='simulator',
+                          type='dummy',
+                          name=f'Dummy Simulator #{i}',
+                          realm='de.rwth-aachen.eonerc.acs')
+
+
+def test_incremental_consumers():
+    with kombu.Connection('memory://') as conn:
+        mixin = ControllerMixin(conn, [make_simulator(i) for i in range(10)])
+
+        with mixin.consumer_context():
+            mixin.on_iteration()
+
+            assert mixin.consumers.keys() == mixin.components.keys()
+
+            before = dict(mixin.consumers)
+
+            added = make_simulator(10)
+            removed = next(c for c in mixin.components.values()
+                           if isinstance(c, DummySimulator))
+
+            mixin.components[added.uuid] = added
+            del mixin.components[removed.uuid]
+
+            mixin.on_iteration()
+
+            assert not mixin.should_stop
+            assert mixin.consumers.keys() == mixin.components.keys()
+
+            # Consumers of unchanged components have not been re-created
+            for uuid, consumer in mixin.consumers.items():
+                if uuid != added.uuid:
+                    assert before[uuid] is consumer
+
+            removed.on_shutdown()
+
+            for comp in mixin.components.values():
+                comp.on_shutdown()
+
+
+def test_single_queue():
+    with kombu.Connection('memory://') as conn:
+        sims = [make_simulator(i) for i in range(3)]
+        mixin = ControllerMixin(conn, sims, single_queue=True)
+
+        received = []
+        for sim in sims:
+            sim.on_message = received.append
+
+        with mixin.consumer_context() as (connection, channel, consumers):
+            mixin.on_iteration()
+
+            assert len(consumers) == 1
+
+            producer = kombu.Producer(channel, exchange=mixin.exchange)
+            producer.publish({'action': 'ping'},
+                             headers={'uuid': sims[1].uuid})
+
+            connection.drain_events(timeout=1)
+
+            assert received == [received[0]]
+            assert received[0].payload == {'action': 'ping'}
+
+            for comp in mixin.components.values():
+                comp.on_shutdown()
+
+
+def test_status_not_delivered_to_components():
+    with kombu.Connection('memory://') as conn:
+        sims = [make_simulator(i) for i in range(5)]
+        mixin = ControllerMixin(conn, sims)
+
+        received = []
+        for sim in sims:
+            sim.on_message = received.append
+
+        with mixin.consumer_context() as (connection, channel, consumers):
+            mixin.on_iteration()
+
+            for sim in sims:
+                sim.publish_status()
+
+            try:
+                connection.drain_events(timeout=0.1)
+            except TimeoutError:
+                pass
+
+            assert received == []
+
+            for comp in mixin.components.values():
+                comp.on_shutdown()
+
+
+def test_bulk_status():
+    with kombu.Connection('memory://') as conn:
+        sims = [make_simulator(i) for i in range(3)]
+        mixin = ControllerMixin(conn, sims, bulk_status=True)
+
+        with mixin.consumer_context() as (connection, channel, consumers):
+            mixin.on_iteration()
+
+            # Only the bulk status is scheduled, no status per component
+            assert 'bulk-status' in mixin.scheduler.jobs
+            assert not any(s.uuid in mixin.scheduler.jobs for s in sims)
+
+            frame = mixin.bulk_status_frame
+
+            assert frame['bulk']
+            assert frame['components'].keys() == mixin.components.keys()
+
+            for sim in sims:
+                status = frame['components'][sim.uuid]
+
+                assert status['status']['state'] == 'idle'
+                assert status['headers'] == sim.headers
+
+            for comp in mixin.components.values():
+                comp.on_shutdown()
+
+
+def test_producer_pool():
+    with kombu.Connection('memory://') as conn:
+        sims = [make_simulator(i) for i in range(20)]
+        mixin = ControllerMixin(conn, sims, producer_pool_limit=2)
+
+        with mixin.consumer_context() as (connection, channel, consumers):
+            mixin.on_iteration()
+
+            queue = kombu.Queue(exchange=sims[0].status_exchange,
+                                durable=False)(channel)
+            queue.declare()
+
+            threads = [threading.Thread(target=lambda sim=sim: [
+                sim.publish_status() for _ in range(50)
+            ]) for sim in sims]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            assert queue.queue_declare(passive=True).message_count == 1000
+
+            for comp in mixin.components.values():
+                comp.on_shutdown()
+
+
+class SlowSimulator(DummySimulator):
+
+    def __init__(self, **args):
+        super().__init__(**args)
+
+        self.downloading = threading.Event()
+        self.download = threading.Event()
+        self.pinged = threading.Event()
+
+    def start(self, message):
+        self.downloading.set()
+
+        # Simulates a long model download
+        self.download.wait(30)
+
+    def ping(self, message):
+        self.pinged.set()
+
+
+def test_slow_action_does_not_block():
+    with kombu.Connection('memory://') as conn:
+        sims = [SlowSimulator(category='simulator',
+                              type='dummy',
+                              realm='de.rwth-aachen.eonerc.acs')
+                for _ in range(2)]
+        mixin = ControllerMixin(conn, sims)
+
+        with mixin.consumer_context() as (connection, channel, consumers):
+            mixin.on_iteration()
+
+            producer = kombu.Producer(channel, exchange=mixin.exchange)
+            producer.publish({'action': 'start'},
+                             headers={'uuid': sims[0].uuid})
+            producer.publish({'action': 'ping'},
+                             headers={'uuid': sims[1].uuid})
+            producer.publish({'action': 'ping'},
+                             headers={'uuid': sims[0].uuid})
+
+            for _ in range(3):
+                connection.drain_events(timeout=1)
+
+            assert sims[1].pinged.wait(1)
+            assert sims[0].downloading.wait(1)
+
+            # The ping to the first simulator waits for its start action
+            assert not sims[0].pinged.is_set()
+            assert mixin.executor.depth(sims[0].uuid) == 1
+
+            sims[0].download.set()
+
+            assert sims[0].pinged.wait(1)
+
+            for comp in mixin.components.values():
+                comp.on_shutdown()
+
+        mixin.executor.shutdown()
+
+
+def test_removed_component_jobs():
+    with kombu.Connection('memory://') as conn:
+        mixin = ControllerMixin(conn, [make_simulator(0)])
+
+        with mixin.consumer_context():
+            mixin.on_iteration()
+
+            jobs = len(mixin.scheduler)
+
+            sim = make_simulator(1)
+            mixin.manager.add_component(sim)
+            mixin.on_iteration()
+
+            assert sim.uuid in mixin.scheduler.jobs
+            assert sim.uuid + '/workdirs' in mixin.scheduler.jobs
+
+            mixin.manager.remove_component(sim)
+            mixin.on_iteration()
+
+            assert not [k for k in mixin.scheduler.jobs
+                        if k.startswith(sim.uuid)]
+            assert len(mixin.scheduler) == jobs
+
+            for comp in mixin.components.values():
+                comp.on_shutdown()
+
+
+def test_dummy_workdir():
+    # Dummy simulators do not need a system-wide working directory
+    sim = make_simulator(0)
+
+    assert sim.workdirs.root.startswith(tempfile.gettempdir())
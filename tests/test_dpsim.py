@@ -0,0 +1,59 @@
+import pytest
+
+dpsimpy = pytest.importorskip('dpsimpy')
+
+from villas.controller.components.simulators.dpsim_runner import DPsimRunner  # noqa E402, E501
+from tests.test_generic import wait_for  # noqa E402
+
+
+def make_runner():
+    n1 = dpsimpy.sp.SimNode('n1')
+    gnd = dpsimpy.sp.SimNode.gnd
+
+    vs = dpsimpy.sp.ph1.VoltageSource('vs')
+    vs.set_parameters(V_ref=complex(10, 0))
+    vs.connect([gnd, n1])
+
+    r = dpsimpy.sp.ph1.Resistor('r')
+    r.set_parameters(R=1)
+    r.connect([n1, gnd])
+
+    runner = DPsimRunner()
+    runner.name = 'test'
+    runner.system = dpsimpy.SystemTopology(50, [n1], [vs, r])
+
+    return runner
+
+
+def test_run():
+    runner = make_runner()
+
+    assert runner.start({'time_step': 1e-3, 'final_time': 0.05}) is None
+
+    wait_for(lambda: not runner.running)
+
+    status = runner.status()['simulation']
+    assert 'error' not in status
+    assert status['time'] == pytest.approx(0.05, abs=1e-3)
+
+    # Each run gets a new simulation
+    sim = runner.sim
+    runner.start({'final_time': 0.01})
+    assert runner.sim is not sim
+
+    wait_for(lambda: not runner.running)
+
+    status = runner.status()['simulation']
+    assert status['time'] == pytest.approx(0.01, abs=1e-3)
+
+
+def test_unsupported_parameters():
+    runner = make_runner()
+
+    with pytest.raises(ValueError, match='Unsupported parameters: gain'):
+        runner.start({'gain': 2})
+
+    with pytest.raises(ValueError, match='Unknown solver'):
+        runner.start({'solver': 'foo'})
+
+    assert not runner.running
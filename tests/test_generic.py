@@ -0,0 +1,138 @@
+import json
+import os
+import time
+
+from villas.controller.components.simulators.generic import GenericSimulator
+from tests.test_component import Producer
+
+
+class Message:
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def ack(self):
+        pass
+
+
+def make_simulator(tmp_path, slots, **props):
+    sim = GenericSimulator(category='simulator',
+                           type='generic',
+                           slots=slots,
+                           **props,
+                           whitelist=['.*'],
+                           workdir_root=str(tmp_path / 'workdirs'),
+                           model_cache_dir=str(tmp_path / 'models'))
+    sim.producers = Producer()
+
+    return sim
+
+
+def wait_for(cond, timeout=5):
+    deadline = time.time() + timeout
+    while not cond():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def start(sim, script):
+    sim.run_action('start', Message({
+        'action': 'start',
+        'parameters': {
+            'executable': 'sh',
+            'argv': ['-c', script]
+        }
+    }))
+
+
+def test_slots(tmp_path):
+    sim = make_simulator(tmp_path, 2)
+
+    start(sim, 'pwd > cwd; sleep 0.5')
+    start(sim, 'pwd > cwd; sleep 0.5')
+
+    wait_for(lambda: sim.compact_status['slots']['busy'] == 2)
+    assert sim._state == 'running'
+
+    # All slots are busy
+    start(sim, 'true')
+    assert sim.compact_status['msg'] == 'No free slot'
+
+    runs = [slot.run for slot in sim.slots]
+    assert runs[0].simuuid != runs[1].simuuid
+
+    wait_for(lambda: sim._state == 'idle')
+
+    # Each run is executed in its own working directory
+    for run in runs:
+        with open(os.path.join(run.logdir, 'cwd')) as f:
+            assert f.read().strip() == run.logdir.rstrip('/')
+
+    assert sim.compact_status['slots']['busy'] == 0
+
+
+def test_single_slot(tmp_path):
+    sim = make_simulator(tmp_path, 1)
+
+    start(sim, 'exit 3')
+
+    wait_for(lambda: sim._state == 'error')
+    assert sim.compact_status['code'] == 3
+
+    # Failed runs are released as well
+    run = sim.slots[0].run
+    assert os.path.exists(os.path.join(run.workdir, sim.workdirs.RELEASED))
+
+    sim.run_action('reset', Message({'action': 'reset'}))
+    sim.change_state('idle')
+
+    start(sim, 'true')
+
+    wait_for(lambda: sim._state == 'idle')
+    states = [m['status']['state'] for m in sim.producers.messages
+              if 'status' in m]
+
+    assert states[-4:] == ['starting', 'running', 'stopping', 'idle']
+
+
+def test_output(tmp_path):
+    sim = make_simulator(tmp_path, 1)
+
+    start(sim, 'echo Hello; echo World >&2')
+    wait_for(lambda: sim._state == 'idle')
+
+    run = sim.slots[0].run
+    with open(os.path.join(run.logdir, 'stdout.log')) as f:
+        assert sorted(f.read().split()) == ['Hello', 'World']
+
+    # The output is published in batches
+    wait_for(lambda: any(m.get('eof') for m in sim.producers.messages))
+    batches = [m for m in sim.producers.messages if 'log' in m]
+
+    assert sorted(''.join(b['log'] for b in batches).split()) == \
+        ['Hello', 'World']
+    assert all(b['simuuid'] == run.simuuid for b in batches)
+
+
+def test_telemetry(tmp_path):
+    sim = make_simulator(tmp_path, 1, telemetry_interval=0.05)
+
+    start(sim, 'sleep 0.3 & sleep 0.3; wait')
+
+    def telemetry():
+        return sim.compact_status['slots']['runs'][0]['telemetry']
+
+    # The whole process tree is sampled
+    wait_for(lambda: telemetry()['processes'] == 3)
+    assert telemetry()['rss'] > 0
+
+    wait_for(lambda: sim._state == 'idle')
+
+    run = sim.slots[0].run
+    with open(os.path.join(run.logdir, 'telemetry.json')) as f:
+        summary = json.load(f)
+
+    assert summary == telemetry()
+    assert summary['processes_peak'] == 3
+    assert summary['rss_peak'] > 0
+    assert summary['samples'] > 1
@@ -0,0 +1,484 @@
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+k8s = pytest.importorskip('kubernetes')
+
+from villas.controller.components.managers.kubernetes import KubernetesManager  # noqa E402, E501
+from villas.controller.components.simulators.kubernetes import KubernetesJob  # noqa E402, E501
+
+PATHS = {
+    '/apis/batch/v1/namespaces/default/jobs': 'jobs',
+    '/api/v1/namespaces/default/pods': 'pods',
+    '/api/v1/namespaces/default/configmaps': 'configmaps'
+}
+
+KINDS = {
+    'jobs': ('batch/v1', 'Job'),
+    'pods': ('v1', 'Pod'),
+    'configmaps': ('v1', 'ConfigMap')
+}
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """ A minimal Kubernetes API server with list and watch support. """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), Handler)
+
+        self.cond = threading.Condition()
+        self.version = 1
+        self.objects = {kind: {} for kind in KINDS}
+
+        # List of (version, kind, type, object)
+        self.events = []
+
+        # Watches from older versions fail with 410 Gone
+        self.oldest = 0
+        self.generation = 0
+
+        # List of (method, kind, watch)
+        self.requests = []
+
+        self.url = 'http://127.0.0.1:%d' % self.server_port
+
+    def emit(self, kind, typ, obj):
+        with self.cond:
+            self.version += 1
+            obj['metadata']['resourceVersion'] = str(self.version)
+
+            if typ == 'DELETED':
+                self.objects[kind].pop(obj['metadata']['name'], None)
+            else:
+                self.objects[kind][obj['metadata']['name']] = obj
+
+            self.events.append((self.version, kind, typ, json.dumps(obj)))
+            self.cond.notify_all()
+
+        return obj
+
+    def create(self, kind, obj):
+        meta = obj.setdefault('metadata', {})
+        if 'generateName' in meta:
+            meta['name'] = meta.pop('generateName') + str(self.version)
+
+        api_version, k = KINDS[kind]
+
+        return self.emit(kind, 'ADDED', {
+            'apiVersion': api_version,
+            'kind': k,
+            **obj,
+            'metadata': {
+                **meta,
+                'namespace': 'default',
+                'uid': meta['name']
+            }
+        })
+
+    def update(self, kind, name, func):
+        with self.cond:
+            obj = json.loads(json.dumps(self.objects[kind][name]))
+            func(obj)
+
+            return self.emit(kind, 'MODIFIED', obj)
+
+    def delete(self, kind, name):
+        with self.cond:
+            obj = self.objects[kind].get(name)
+            if obj is None:
+                return None
+
+            if kind == 'jobs':
+                for pod in list(self.objects['pods'].values()):
+                    if pod['metadata']['labels'].get('job-name') == name:
+                        self.emit('pods', 'DELETED', pod)
+
+            return self.emit(kind, 'DELETED', obj)
+
+    def create_pod(self, job, phase='Pending', reason=None):
+        labels = {
+            **job['spec']['template']['metadata']['labels'],
+            'job-name': job['metadata']['name']
+        }
+
+        status = {
+            'phase': phase,
+            'containerStatuses': [{
+                'name': 'sim',
+                'image': 'sim',
+                'imageID': '',
+                'ready': phase == 'Running',
+                'restartCount': 0,
+                'state': {
+                    'waiting': {'reason': reason}
+                } if reason else {}
+            }]
+        }
+
+        return self.create('pods', {
+            'metadata': {
+                'generateName': job['metadata']['name'] + '-',
+                'labels': labels
+            },
+            'spec': job['spec']['template']['spec'],
+            'status': status
+        })
+
+    def expire(self):
+        """ Compact the event log and close all watches. """
+        with self.cond:
+            self.version += 1
+            self.oldest = self.version
+            self.generation += 1
+            self.cond.notify_all()
+
+    def count(self, method, kind, watch=False):
+        return self.requests.count((method, kind, watch))
+
+
+def matches(obj, selector):
+    labels = obj['metadata'].get('labels') or {}
+
+    for term in filter(None, selector.split(',')):
+        key, value = term.split('=')
+        if labels.get(key) != value:
+            return False
+
+    return True
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    # Watch events are streamed in chunks
+    protocol_version = 'HTTP/1.1'
+
+    def send_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+
+    def send_json(self, obj, code=200):
+        body = json.dumps(obj).encode()
+
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+
+        return json.loads(self.rfile.read(length) or 'null')
+
+    def route(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        path, _, name = url.path.rpartition('/')
+        if url.path in PATHS:
+            return PATHS[url.path], None, query
+
+        return PATHS.get(path), name, query
+
+    def do_GET(self):
+        if self.path.startswith('/api/v1/namespaces?') or \
+           self.path == '/api/v1/namespaces':
+            return self.send_json({
+                'kind': 'NamespaceList',
+                'apiVersion': 'v1',
+                'metadata': {},
+                'items': [{'metadata': {'name': 'default'}}]
+            })
+
+        kind, name, query = self.route()
+        watch = query.get('watch') == 'true'
+        selector = query.get('labelSelector', '')
+
+        self.server.requests.append(('GET', kind, watch))
+
+        if watch:
+            return self.watch(kind, selector, query)
+
+        srv = self.server
+        with srv.cond:
+            items = [o for o in srv.objects[kind].values()
+                     if matches(o, selector)]
+            version = srv.version
+
+        api_version, k = KINDS[kind]
+        self.send_json({
+            'kind': k + 'List',
+            'apiVersion': api_version,
+            'metadata': {'resourceVersion': str(version)},
+            'items': items
+        })
+
+    def watch(self, kind, selector, query):
+        version = int(query.get('resourceVersion', '0'))
+        deadline = time.time() + int(query.get('timeoutSeconds', 5))
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        self.stream(kind, selector, version, deadline)
+
+        self.send_chunk(b'')
+
+    def stream(self, kind, selector, version, deadline):
+        srv = self.server
+
+        if version < srv.oldest:
+            self.send_chunk(json.dumps({
+                'type': 'ERROR',
+                'object': {
+                    'kind': 'Status',
+                    'code': 410,
+                    'reason': 'Expired',
+                    'message': 'too old resource version'
+                }
+            }).encode() + b'\n')
+            return
+
+        generation = srv.generation
+
+        while time.time() < deadline:
+            with srv.cond:
+                events = [e for e in srv.events if e[0] > version]
+                if not events and generation == srv.generation:
+                    srv.cond.wait(deadline - time.time())
+                    continue
+
+            if generation != srv.generation:
+                return
+
+            for v, k, typ, obj in events:
+                version = v
+                if k == kind and matches(json.loads(obj), selector):
+                    self.send_chunk(b'{"type": "%s", "object": %s}\n' %
+                                    (typ.encode(), obj.encode()))
+
+    def do_POST(self):
+        kind, _, _ = self.route()
+        self.server.requests.append(('POST', kind, False))
+
+        self.send_json(self.server.create(kind, self.read_json()), 201)
+
+    def do_DELETE(self):
+        kind, name, _ = self.route()
+        self.server.requests.append(('DELETE', kind, False))
+
+        # Delete options are ignored
+        self.read_json()
+
+        if self.server.delete(kind, name) is None:
+            return self.send_json({
+                'kind': 'Status',
+                'status': 'Failure',
+                'code': 404
+            }, 404)
+
+        self.send_json({'kind': 'Status', 'status': 'Success'})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    srv = FakeApiServer()
+
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+
+    config = tmp_path / 'kubeconfig'
+    config.write_text(json.dumps({
+        'apiVersion': 'v1',
+        'kind': 'Config',
+        'clusters': [{'name': 'fake', 'cluster': {'server': srv.url}}],
+        'users': [{'name': 'fake', 'user': {'token': 'test'}}],
+        'contexts': [{
+            'name': 'fake',
+            'context': {'cluster': 'fake', 'user': 'fake'}
+        }],
+        'current-context': 'fake'
+    }))
+
+    monkeypatch.setenv('KUBECONFIG', str(config))
+    monkeypatch.setattr(k8s.config.kube_config,
+                        'KUBE_CONFIG_DEFAULT_LOCATION', str(config))
+
+    yield srv
+
+    srv.expire()
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def manager(api, tmp_path):
+    mgr = KubernetesManager(category='manager', type='kubernetes',
+                            watch_timeout=1)
+
+    for informer in mgr.informers:
+        assert informer.synced.wait(5)
+
+    yield mgr
+
+    mgr.stop_informers()
+
+
+def wait_for(cond, timeout=5):
+    deadline = time.time() + timeout
+
+    while not cond():
+        if time.time() > deadline:
+            return False
+
+        time.sleep(0.01)
+
+    return True
+
+
+class Message:
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def ack(self):
+        pass
+
+
+def make_job(manager, tmp_path):
+    job = {
+        'metadata': {'name': 'sim'},
+        'spec': {
+            'template': {
+                'spec': {
+                    'restartPolicy': 'Never',
+                    'containers': [{'name': 'sim', 'image': 'sim'}]
+                }
+            }
+        }
+    }
+
+    comp = KubernetesJob(manager, category='simulator', type='kubernetes',
+                         job=job, workdir_root=str(tmp_path))
+    manager.components[comp.uuid] = comp
+    comp.set_manager(manager)
+
+    return comp
+
+
+def test_job_lifecycle(api, manager, tmp_path):
+    comp = make_job(manager, tmp_path)
+
+    comp.run_action('start', Message({'parameters': {'x': 1}}))
+    assert comp._state == 'starting'
+
+    job = api.objects['jobs'][comp.job_name]
+    labels = job['metadata']['labels']
+    assert labels['controller-uuid'] == manager.uuid
+    assert labels['uuid'] == comp.uuid
+
+    container = job['spec']['template']['spec']['containers'][0]
+    assert container['env'][0]['name'] == 'VILLAS_PARAMETERS_FILE'
+
+    cm = api.objects['configmaps'][comp.config_map_name]
+    assert json.loads(cm['data']['parameters.json']) == {'x': 1}
+
+    api.create_pod(job, 'Running')
+    assert wait_for(lambda: comp._state == 'running')
+
+    def complete(obj):
+        obj['status'] = {
+            'succeeded': 1,
+            'conditions': [{'type': 'Complete', 'status': 'True'}]
+        }
+
+    api.update('jobs', comp.job_name, complete)
+    assert wait_for(lambda: comp._state == 'idle')
+
+    # The parameters are removed once the job has finished
+    assert wait_for(lambda: comp.config_map_name not in
+                    api.objects['configmaps'])
+
+
+def test_job_failed(api, manager, tmp_path):
+    comp = make_job(manager, tmp_path)
+    comp.run_action('start', Message({}))
+
+    job = api.objects['jobs'][comp.job_name]
+    api.create_pod(job, 'Pending', reason='ImagePullBackOff')
+
+    assert wait_for(lambda: comp._state == 'error')
+    assert comp._status_fields['msg'] == 'ImagePullBackOff'
+
+
+def test_job_stop(api, manager, tmp_path):
+    comp = make_job(manager, tmp_path)
+    comp.run_action('start', Message({}))
+
+    job = api.objects['jobs'][comp.job_name]
+    api.create_pod(job, 'Running')
+    assert wait_for(lambda: comp._state == 'running')
+
+    comp.run_action('stop', Message({}))
+
+    assert wait_for(lambda: comp._state == 'idle')
+    assert not api.objects['jobs']
+    assert not api.objects['pods']
+
+
+def test_status_from_cache(api, manager, tmp_path):
+    comp = make_job(manager, tmp_path)
+    comp.run_action('start', Message({}))
+
+    job = api.objects['jobs'][comp.job_name]
+    api.create_pod(job, 'Running')
+    assert wait_for(lambda: comp._state == 'running')
+
+    requests = len(api.requests)
+
+    status = comp.compact_status['job']
+    assert status['name'] == comp.job_name
+    assert [p['phase'] for p in status['pods']] == ['Running']
+
+    assert len(api.requests) == requests
+
+
+def test_watch_resume(api, manager, tmp_path):
+    comp = make_job(manager, tmp_path)
+
+    lists = api.count('GET', 'jobs')
+    watches = api.count('GET', 'jobs', True)
+
+    # Watches time out after a second and resume without a list
+    assert wait_for(lambda: api.count('GET', 'jobs', True) > watches + 1)
+    assert api.count('GET', 'jobs') == lists
+
+    comp.run_action('start', Message({}))
+    assert wait_for(lambda: manager.jobs.get(comp.job_name) is not None)
+
+    # Objects changed while the version was expired are listed again
+    lists = api.count('GET', 'pods')
+    api.expire()
+    api.create_pod(api.objects['jobs'][comp.job_name], 'Running')
+
+    assert wait_for(lambda: comp._state == 'running')
+    assert api.count('GET', 'pods') > lists
+    assert manager.pods.by_index('job-name', comp.job_name)
+
+    # Objects deleted while the version was expired are removed as well
+    api.expire()
+    api.delete('jobs', comp.job_name)
+
+    assert wait_for(lambda: comp._state == 'idle')
+    assert manager.jobs.get(comp.job_name) is None
@@ -0,0 +1,55 @@
+import os
+import threading
+
+from villas.controller.logstream import LogStream
+from villas.controller.reaper import Reaper
+
+
+def make_stream(**kwargs):
+    reaper = Reaper()
+    batches = []
+    eof = threading.Event()
+
+    def publish(batch):
+        batches.append(batch)
+        if batch['eof']:
+            eof.set()
+
+    rfd, wfd = os.pipe()
+    stream = LogStream(rfd, reaper, publish, **kwargs)
+
+    return stream, wfd, batches, eof
+
+
+def test_batches():
+    stream, wfd, batches, eof = make_stream(batch_size=10, interval=0.05)
+
+    os.write(wfd, 'Grüße\n'.encode() * 4)
+    os.close(wfd)
+
+    assert eof.wait(5)
+    assert ''.join(b['log'] for b in batches) == 'Grüße\n' * 4
+    assert all(len(b['log']) <= 10 for b in batches)
+    assert [b['seq'] for b in batches] == list(range(1, len(batches) + 1))
+
+    stream.reaper.stop()
+
+
+def test_ring_buffer():
+    stream, wfd, batches, eof = make_stream(batch_size=10, interval=1,
+                                            rate=10, buffer_size=50)
+
+    # The rate limit only allows a single batch per second
+    stream.feed('a' * 10)
+    stream.feed('b' * 100)
+
+    stream.close()
+    os.close(wfd)
+
+    assert eof.wait(5)
+
+    text = ''.join(b['log'] for b in batches)
+    assert text == 'a' * 10 + 'b' * 50
+    assert sum(b['dropped'] for b in batches) == 50
+
+    stream.reaper.stop()
@@ -0,0 +1,197 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import threading
+import zipfile
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from villas.controller.model_cache import ModelCache
+
+
+def make_zip(content):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as z:
+        z.writestr('model/grid.xml', content)
+
+    return buf.getvalue()
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+
+        if self.server.hook is not None:
+            self.server.hook(self)
+
+        body = self.server.files[self.path]
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    srv.files = {}
+    srv.requests = []
+    srv.hook = None
+    srv.url = 'http://127.0.0.1:%d' % srv.server_port
+
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+
+    yield srv
+
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_conditional_get(server, tmp_path):
+    server.files['/a.zip'] = make_zip('<grid/>')
+
+    cache = ModelCache(str(tmp_path))
+
+    first = cache.fetch(server.url + '/a.zip')
+    second = cache.fetch(server.url + '/a.zip')
+
+    assert first == second
+    assert open(os.path.join(first, 'model/grid.xml')).read() == '<grid/>'
+    assert len(server.requests) == 2
+
+    # A changed model is downloaded again
+    server.files['/a.zip'] = make_zip('<grid></grid>')
+
+    third = cache.fetch(server.url + '/a.zip')
+    assert third != first
+
+
+def test_digest(server, tmp_path):
+    body = b'<grid/>'
+    digest = hashlib.sha256(body).hexdigest()
+    server.files['/a.xml'] = body
+
+    cache = ModelCache(str(tmp_path))
+
+    path = cache.fetch(server.url + '/a.xml', digest)
+    assert open(path, 'rb').read() == body
+    assert ModelCache.digest(path) == digest
+
+    # Known digests are served without a request
+    cache.fetch(server.url + '/a.xml', digest)
+    assert len(server.requests) == 1
+
+    with pytest.raises(ValueError):
+        cache.fetch(server.url + '/a.xml', '0' * 64)
+
+
+def test_eviction(server, tmp_path):
+    for name in ['a', 'b', 'c']:
+        server.files['/' + name] = name.encode() * 100
+
+    cache = ModelCache(str(tmp_path), max_size=250)
+
+    a = cache.fetch(server.url + '/a')
+    cache.fetch(server.url + '/b')
+    os.utime(os.path.dirname(a), (0, 0))
+    cache.fetch(server.url + '/c')
+
+    assert not os.path.exists(a)
+    assert cache.size == 200
+
+
+def test_pinned(server, tmp_path):
+    for name in ['a', 'b', 'c']:
+        server.files['/' + name] = name.encode() * 100
+
+    cache = ModelCache(str(tmp_path), max_size=250)
+
+    a = cache.fetch(server.url + '/a', pin=True)
+    cache.fetch(server.url + '/b')
+    os.utime(os.path.dirname(a), (0, 0))
+    cache.fetch(server.url + '/c')
+
+    # Pinned objects are kept even if they are the least recently used
+    assert os.path.exists(a)
+    assert cache.size == 200
+
+    cache.max_size = 0
+    cache.evict()
+    assert os.path.exists(a)
+    assert cache.size == 100
+
+    cache.release(ModelCache.digest(a))
+    cache.evict()
+
+    assert not os.path.exists(a)
+
+
+def pin_worker(directory, url, pinned, done):
+    ModelCache(directory).fetch(url, pin=True)
+
+    pinned.set()
+    done.wait(30)
+
+
+def test_pinned_by_process(server, tmp_path):
+    for name in ['a', 'b']:
+        server.files['/' + name] = name.encode() * 100
+
+    ctx = multiprocessing.get_context('spawn')
+    pinned, done = ctx.Event(), ctx.Event()
+
+    p = ctx.Process(target=pin_worker, args=(str(tmp_path),
+                                             server.url + '/a',
+                                             pinned, done))
+    p.start()
+    assert pinned.wait(30)
+
+    cache = ModelCache(str(tmp_path), max_size=0)
+    cache.fetch(server.url + '/b')
+
+    # Objects pinned by other processes are kept
+    a = cache.fetch(server.url + '/a')
+    cache.evict()
+    assert os.path.exists(a)
+
+    # Unless the process has exited without releasing its pin
+    done.set()
+    p.join()
+
+    cache.evict()
+    assert not os.path.exists(a)
+
+
+def test_evicted_meanwhile(server, tmp_path):
+    server.files['/a'] = b'a' * 100
+
+    cache = ModelCache(str(tmp_path))
+    a = cache.fetch(server.url + '/a')
+
+    # The object is evicted by another process before it is used
+    def evict(handler):
+        server.hook = None
+        shutil.rmtree(os.path.dirname(a))
+
+    server.hook = evict
+
+    assert cache.fetch(server.url + '/a', pin=True) == a
+    assert os.path.exists(a)
+    assert len(server.requests) == 3
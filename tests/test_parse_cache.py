@@ -0,0 +1,65 @@
+import threading
+import time
+
+from villas.controller.parse_cache import ParseCache
+
+
+def test_hits():
+    cache = ParseCache()
+    parsed = []
+
+    def parse():
+        parsed.append(1)
+        time.sleep(0.05)
+        return object()
+
+    first = cache.get('a', parse)
+    assert cache.get('a', parse) is first
+    assert len(parsed) == 1
+
+    status = cache.status
+    assert status['hits'] == 1
+    assert status['misses'] == 1
+    assert status['hit_rate'] == 0.5
+    assert status['time_saved'] >= 0.05
+
+
+def test_eviction():
+    cache = ParseCache(max_size=2 << 20)
+
+    cache.get('a', object, size=1 << 20)
+    cache.get('b', object, size=1 << 20)
+    cache.get('a', object)
+    cache.get('c', object, size=1 << 20)
+
+    # The least recently used model is evicted
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+
+    # The most recent model is always kept
+    cache.get('d', object, size=4 << 20)
+    assert 'd' in cache
+    assert len(cache) == 1
+
+
+def test_concurrent():
+    cache = ParseCache()
+    parsed = []
+
+    def parse():
+        parsed.append(1)
+        time.sleep(0.1)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get('a', parse))) for _ in range(4)]
+
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(parsed) == 1
+    assert len(set(map(id, results))) == 1
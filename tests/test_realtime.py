@@ -0,0 +1,129 @@
+import os
+import sys
+
+import pytest
+
+from villas.controller import realtime
+from villas.controller.realtime import RealtimeOptions, parse_cpus
+from tests.test_generic import Message, make_simulator, wait_for
+
+SCRIPT = '''
+import os
+print(sorted(os.sched_getaffinity(0)), os.sched_getscheduler(0),
+      os.sched_getparam(0).sched_priority,
+      os.getpriority(os.PRIO_PROCESS, 0))
+'''
+
+
+def start(sim, **params):
+    sim.run_action('start', Message({
+        'action': 'start',
+        'parameters': {
+            'executable': sys.executable,
+            'argv': ['-c', SCRIPT],
+            **params
+        }
+    }))
+
+
+def output(sim):
+    wait_for(lambda: sim._state in ['idle', 'error'])
+
+    run = sim.slots[0].run
+    with open(os.path.join(run.logdir, 'stdout.log')) as f:
+        return f.read().strip()
+
+
+def test_parse_cpus():
+    assert parse_cpus('0-2, 5') == {0, 1, 2, 5}
+    assert parse_cpus([3, '4']) == {3, 4}
+    assert parse_cpus(1) == {1}
+
+
+def test_override():
+    opts = RealtimeOptions(cpus='2-3', sched_policy='fifo',
+                           sched_priority=50)
+
+    run = opts.override({'cpus': [3], 'sched_priority': 10})
+    assert run.cpus == {3}
+    assert run.sched_priority == 10
+
+    # Runs are restricted to the options of the simulator
+    with pytest.raises(ValueError):
+        opts.override({'cpus': [1]})
+
+    with pytest.raises(ValueError):
+        opts.override({'sched_priority': 90})
+
+    with pytest.raises(ValueError):
+        opts.override({'mlock': True})
+
+    # Without a configuration, runs can not request privileged options
+    opts = RealtimeOptions(nice=5)
+
+    assert opts.override({'nice': 10}).nice == 10
+
+    with pytest.raises(ValueError):
+        opts.override({'nice': -20})
+
+    with pytest.raises(ValueError):
+        RealtimeOptions().override({'nice': 0})
+
+    for params in [{'cpus': [0]}, {'sched_policy': 'fifo'},
+                   {'mlock': True}, {'ionice': 'rt:0'}]:
+        with pytest.raises(ValueError):
+            opts.override(params)
+
+
+def test_check(monkeypatch):
+    with pytest.raises(ValueError):
+        RealtimeOptions(cpus=[os.cpu_count() + 10]).check()
+
+    with pytest.raises(ValueError):
+        RealtimeOptions(sched_policy='fifo', sched_priority=1000).check()
+
+    # Without privileges, only unprivileged options are granted
+    monkeypatch.setattr(realtime, 'capable', lambda cap: False)
+    monkeypatch.setattr(realtime.resource, 'getrlimit', lambda r: (0, 0))
+
+    with pytest.raises(ValueError):
+        RealtimeOptions(sched_policy='rr').check()
+
+    with pytest.raises(ValueError):
+        RealtimeOptions(mlock=True).check()
+
+    RealtimeOptions(sched_policy='batch', nice=19, ionice='idle').check()
+
+
+def test_start(tmp_path):
+    sim = make_simulator(tmp_path, 1, cpus=[0], nice=5)
+
+    start(sim)
+    assert output(sim) == f'[0] {os.SCHED_OTHER} 0 5'
+
+    # Per-start options override those of the simulator
+    start(sim, nice=7, sched_policy='batch')
+    assert output(sim) == f'[0] {os.SCHED_BATCH} 0 7'
+
+
+def test_start_rejected(tmp_path, monkeypatch):
+    sim = make_simulator(tmp_path, 1, sched_policy='fifo',
+                         sched_priority=20)
+    monkeypatch.setattr(realtime, 'capable', lambda cap: False)
+    monkeypatch.setattr(realtime.resource, 'getrlimit', lambda r: (0, 0))
+
+    start(sim, sched_policy='fifo', sched_priority=10)
+
+    assert sim._state == 'error'
+    assert 'not permitted' in sim.compact_status['msg']
+    assert sim.slots[0].child is None
+
+
+@pytest.mark.skipif(not realtime.capable(realtime.CAP_SYS_NICE),
+                    reason='Real-time scheduling is not permitted')
+def test_start_fifo(tmp_path):
+    sim = make_simulator(tmp_path, 1, sched_policy='fifo',
+                         sched_priority=20)
+
+    start(sim, sched_priority=10)
+    assert output(sim).split()[1:3] == [str(os.SCHED_FIFO), '10']
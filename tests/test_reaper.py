@@ -0,0 +1,129 @@
+import asyncio
+import os
+import subprocess
+import threading
+
+from villas.controller.reaper import AsyncReaper, Reaper
+
+
+def test_watch():
+    reaper = Reaper()
+    exited = []
+    done = threading.Event()
+
+    def on_exit(child):
+        exited.append(child.returncode)
+        if len(exited) == 50:
+            done.set()
+
+    threads = threading.active_count()
+
+    for i in range(50):
+        child = subprocess.Popen(['sh', '-c', f'exit {i % 3}'])
+        reaper.watch(child, on_exit)
+
+    # All children are watched by a single thread
+    assert threading.active_count() == threads + 1
+
+    assert done.wait(5)
+    assert sorted(exited) == sorted(i % 3 for i in range(50))
+    assert len(reaper) == 0
+
+    reaper.stop()
+
+
+def test_poll(monkeypatch):
+    reaper = Reaper()
+    done = threading.Event()
+
+    # Children are polled without pidfd support
+    monkeypatch.delattr('os.pidfd_open', raising=False)
+
+    child = subprocess.Popen(['true'])
+    reaper.watch(child, lambda c: done.set())
+
+    assert done.wait(5)
+    assert child.returncode == 0
+
+    reaper.stop()
+
+
+def test_timers():
+    reaper = Reaper()
+    calls = []
+    done = threading.Event()
+
+    reaper.call_later(0.2, done.set)
+    reaper.call_later(0.1, calls.append, 'second')
+    reaper.call_later(0.05, calls.append, 'first')
+    reaper.call_later(0.1, calls.append, 'cancelled').cancel()
+
+    assert done.wait(5)
+    assert calls == ['first', 'second']
+
+    reaper.stop()
+
+
+def test_async():
+    reaper = AsyncReaper()
+    exited = []
+    calls = []
+    lines = []
+
+    def on_exit(child):
+        exited.append(child.returncode)
+
+    def on_readable(fd):
+        data = os.read(fd, 4096)
+        if data:
+            lines.append(data)
+        else:
+            reaper.remove_reader(fd)
+
+    # Children which are watched before the start are deferred
+    child = subprocess.Popen(['sh', '-c', 'exit 3'])
+    reaper.watch(child, on_exit)
+
+    async def main():
+        threads = threading.active_count()
+
+        reaper.start(asyncio.get_running_loop())
+
+        rfd, wfd = os.pipe()
+        reaper.add_reader(rfd, on_readable)
+
+        for i in range(10):
+            child = subprocess.Popen(['sh', '-c', f'echo {i}; exit {i}'],
+                                     stdout=wfd)
+            reaper.watch(child, on_exit)
+
+        os.close(wfd)
+
+        reaper.call_later(0.1, calls.append, 'second')
+        reaper.call_later(0.05, calls.append, 'first')
+        reaper.call_later(0.1, calls.append, 'cancelled').cancel()
+
+        # Timers are started from other threads as well
+        thread = threading.Thread(target=reaper.call_later,
+                                  args=(0.15, calls.append, 'third'))
+        thread.start()
+        thread.join()
+
+        for _ in range(500):
+            if len(reaper) == 0 and len(calls) == 3:
+                break
+
+            await asyncio.sleep(0.01)
+
+        # No thread watches the children
+        assert threading.active_count() == threads
+
+        reaper.stop()
+        os.close(rfd)
+
+    asyncio.run(main())
+
+    assert sorted(exited) == sorted([3] + list(range(10)))
+    assert calls == ['first', 'second', 'third']
+    assert sorted(b''.join(lines).split()) == \
+        sorted(str(i).encode() for i in range(10))
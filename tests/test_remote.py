@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+
+import pytest
+
+from villas.controller.reaper import Reaper
+from villas.controller.remote import RemoteError, RemoteProcess
+
+
+class Target:
+
+    def __init__(self, offset):
+        self.offset = offset
+
+    def add(self, value):
+        return value + self.offset
+
+    def fail(self):
+        raise ValueError('Invalid value')
+
+    def busy(self, duration):
+        deadline = time.time() + duration
+        while time.time() < deadline:
+            pass
+
+    def crash(self):
+        os._exit(3)
+
+
+def test_calls():
+    remote = RemoteProcess(Target, 10)
+
+    assert remote.add(5) == 15
+    assert remote.pid != os.getpid()
+
+    with pytest.raises(RemoteError) as e:
+        remote.fail()
+
+    assert e.value.type == 'ValueError'
+
+    # The remote process keeps serving after an exception
+    assert remote.add(1) == 11
+
+    remote.stop()
+    assert not remote.alive
+
+
+def test_crash():
+    reaper = Reaper()
+    exited = threading.Event()
+    codes = []
+
+    def on_exit(code):
+        codes.append(code)
+        exited.set()
+
+    remote = RemoteProcess(Target, 0, reaper=reaper, on_exit=on_exit)
+
+    with pytest.raises(RemoteError):
+        remote.crash()
+
+    assert exited.wait(5)
+    assert codes == [3]
+
+    reaper.stop()
+
+
+def test_timeout():
+    remote = RemoteProcess(Target, 0)
+
+    with pytest.raises(TimeoutError):
+        remote.call('busy', 5, timeout=0.2)
+
+    assert not remote.alive
+
+    remote.stop()
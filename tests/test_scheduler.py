@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+from villas.controller.scheduler import Scheduler, AsyncScheduler
+
+
+def test_scheduler():
+    scheduler = Scheduler()
+    counts = {}
+
+    def job(key):
+        counts[key] = counts.get(key, 0) + 1
+
+    for key in range(100):
+        scheduler.add(key, 0.05, lambda key=key: job(key))
+
+    threads = threading.active_count()
+    scheduler.start()
+
+    time.sleep(0.3)
+
+    assert threading.active_count() == threads + 1
+
+    scheduler.remove(0)
+    removed = counts.get(0, 0)
+
+    time.sleep(0.1)
+    scheduler.stop()
+
+    assert len(scheduler) == 99
+    assert counts[0] <= removed + 1
+    assert all(counts[key] >= 4 for key in range(1, 100))
+
+
+def test_async_scheduler():
+    scheduler = AsyncScheduler()
+    counts = {}
+
+    def job(key):
+        counts[key] = counts.get(key, 0) + 1
+
+    async def main():
+        for key in range(50):
+            scheduler.add(key, 0.05, lambda key=key: job(key))
+
+        scheduler.start(asyncio.get_running_loop())
+
+        await asyncio.sleep(0.3)
+
+        scheduler.remove(0)
+        removed = counts.get(0, 0)
+
+        await asyncio.sleep(0.1)
+        scheduler.stop()
+
+        return removed
+
+    threads = threading.active_count()
+    removed = asyncio.run(main())
+
+    assert threading.active_count() == threads
+    assert len(scheduler) == 49
+    assert counts[0] == removed
+    assert all(counts[key] >= 4 for key in range(1, 50))
@@ -0,0 +1,172 @@
+import multiprocessing
+import time
+import types
+
+from villas.controller import controller
+from villas.controller.supervisor import Supervisor, Shard, worker_main
+from villas.controller.components.managers.generic import GenericManager
+
+
+def test_assign():
+    components = [Supervisor.prepare({
+        'category': 'simulator',
+        'type': 'dummy'
+    }) for _ in range(100)]
+
+    manager = Supervisor.find_manager(components)
+    components.append(manager)
+
+    shards = Supervisor.assign(components, 4)
+
+    assert manager in shards[0]
+    assert sum(len(shard) for shard in shards) == 101
+    assert all(len(shard) > 0 for shard in shards)
+
+    # The assignment is stable
+    assert Supervisor.assign(components, 4) == shards
+
+
+def test_shard():
+    loads = multiprocessing.Array('i', 3)
+    inboxes = [multiprocessing.Queue() for _ in range(3)]
+    shards = [Shard(i, loads, inboxes) for i in range(3)]
+
+    shards[0].update_load(10)
+    shards[1].update_load(5)
+    shards[2].update_load(7)
+
+    assert shards[0].least_loaded() == 1
+
+    shards[0].send(1, 'create', {'uuid': 'a'})
+    shards[1].broadcast('delete', {'uuid': 'b'})
+
+    assert inboxes[1].get(timeout=1) == ('create', {'uuid': 'a'})
+    assert inboxes[0].get(timeout=1) == ('delete', {'uuid': 'b'})
+    assert inboxes[2].get(timeout=1) == ('delete', {'uuid': 'b'})
+
+
+def fake_worker(index, url, components, manager, shard, options):
+    options['results'].put((index, [c['uuid'] for c in components]))
+
+    time.sleep(60)
+
+
+class FakeSupervisor(Supervisor):
+
+    target = staticmethod(fake_worker)
+
+
+def test_restore_created():
+    results = multiprocessing.get_context('spawn').Queue()
+    components = [{'category': 'simulator', 'type': 'dummy'}
+                  for _ in range(4)]
+
+    sup = FakeSupervisor('memory://', components, 2, results=results)
+    for index in range(2):
+        sup.start(index)
+
+    started = dict(results.get(timeout=30) for _ in range(2))
+
+    # Worker 1 reports a component which has been placed on it
+    shard = Shard(1, sup.loads, sup.inboxes, sup.events)
+    shard.report('created', {'category': 'simulator', 'type': 'dummy',
+                             'uuid': 'deleted'})
+    shard.report('deleted', {'uuid': 'deleted'})
+    shard.report('created', {'category': 'simulator', 'type': 'dummy',
+                             'uuid': 'created'})
+
+    while 'created' not in sup.created:
+        sup.receive_events()
+
+    sup.processes[1].kill()
+    sup.processes[1].join()
+    sup.check()
+
+    index, restarted = results.get(timeout=30)
+
+    assert index == 1
+    assert set(restarted) == set(started[1]) | {'created'}
+
+    for p in sup.processes:
+        p.kill()
+        p.join()
+
+
+def exiting_worker(index, url, components, manager, shard, options):
+    pass
+
+
+class ExitingSupervisor(Supervisor):
+
+    target = staticmethod(exiting_worker)
+
+
+def test_restart_backoff():
+    sup = ExitingSupervisor('memory://', [], 1, backoff=60)
+    sup.start(0)
+    first = sup.processes[0]
+    first.join()
+
+    # The first restart is immediate
+    sup.check()
+
+    second = sup.processes[0]
+    assert second is not first
+    second.join()
+
+    # Workers which exit again are restarted later
+    sup.check()
+
+    assert sup.processes[0] is second
+    assert sup.restart_at[0] > time.monotonic() + 50
+
+    sup.restart_at[0] = time.monotonic()
+    sup.check()
+
+    assert sup.processes[0] is not second
+    sup.processes[0].join()
+
+
+def test_worker_interrupted(monkeypatch):
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(controller.ControllerMixin, '__init__', interrupt)
+
+    shard = Shard(0, multiprocessing.Array('i', 1), [multiprocessing.Queue()])
+
+    # An interrupted start does not fail the worker
+    worker_main(0, 'memory://', [], None, shard, {'log_level': 'INFO'})
+
+
+def test_report_created(tmp_path):
+    events = multiprocessing.Queue()
+    shard = Shard(0, multiprocessing.Array('i', 1),
+                  [multiprocessing.Queue()], events)
+
+    manager = GenericManager(category='manager', type='generic')
+    manager.set_mixin(types.SimpleNamespace(components={}, shard=shard,
+                                            connection=None, producers=None))
+
+    manager.create(types.SimpleNamespace(payload={'parameters': {
+        'category': 'simulator',
+        'type': 'dummy',
+        'workdir_root': str(tmp_path)
+    }}))
+
+    index, action, parameters = events.get(timeout=1)
+    uuid = parameters['uuid']
+
+    assert (index, action) == (0, 'created')
+    assert uuid in manager.components
+
+    manager.delete_component(uuid)
+
+    assert events.get(timeout=1) == (0, 'deleted', {'uuid': uuid})
+
+
+def test_workdir_quota():
+    sup = Supervisor('memory://', [], 4, workdir_quota=1000)
+
+    # The workers share the quota
+    assert sup.options['workdir_quota'] == 250
@@ -0,0 +1,145 @@
+import threading
+
+import kombu
+
+from villas.controller.controller import ControllerMixin
+from villas.controller.components.simulators.dummy import DummySimulator
+from villas.controller.components.simulators.generic import GenericSimulator
+from villas.controller.sweep import Sweep, expand_grid
+from tests.test_generic import wait_for
+from tests.test_uploader import server  # noqa: F401
+
+
+def test_expand_grid():
+    assert expand_grid({'a': [1, 2], 'b': ['x', 'y'], 'c': 0}) == [
+        {'a': 1, 'b': 'x', 'c': 0},
+        {'a': 1, 'b': 'y', 'c': 0},
+        {'a': 2, 'b': 'x', 'c': 0},
+        {'a': 2, 'b': 'y', 'c': 0}
+    ]
+
+
+def test_sweep(tmp_path, server):  # noqa: F811
+    server.release.set()
+
+    sims = [DummySimulator(category='simulator',
+                           type='dummy',
+                           realm='sweep',
+                           transition_delay=0.05,
+                           workdir_root=str(tmp_path))
+            for _ in range(3)]
+
+    # Simulators of other realms are not used
+    other = DummySimulator(category='simulator',
+                           type='dummy',
+                           realm='other',
+                           workdir_root=str(tmp_path))
+
+    # Poll the in-memory broker more often than by default
+    options = {'polling_interval': 0.01}
+
+    with kombu.Connection('memory://', transport_options=options) as conn:
+        mixin = ControllerMixin(conn, sims + [other])
+
+        thread = threading.Thread(target=mixin.run, daemon=True)
+        thread.start()
+
+        # Simulators which are not ready yet miss the discovery ping
+        wait_for(lambda: mixin.active_components.keys() ==
+                 mixin.components.keys())
+
+        variants = expand_grid({'duration': [0.2], 'gain': list(range(9))})
+
+        with kombu.Connection('memory://',
+                              transport_options=options) as client:
+            sweep = Sweep(client, variants,
+                          headers={'realm': 'sweep'},
+                          results={'url': server.url + '?run={index}'},
+                          timeout=10)
+
+            manifest = sweep.run()
+
+        mixin.should_stop = True
+        thread.join(5)
+
+    summary = manifest['summary']
+    assert summary['total'] == 9
+    assert summary['done'] == 9
+    assert summary['simulators'] == 3
+
+    # All simulators were saturated, but none got more than one run
+    assert summary['concurrency'] == 3
+
+    runs = manifest['variants']
+    assert {r['simulator'] for r in runs} == {s.uuid for s in sims}
+    assert [r['parameters']['gain'] for r in runs] == list(range(9))
+    assert [r['results'] for r in runs] == \
+        [server.url + f'?run={i}' for i in range(9)]
+
+    # The uploads of the results are tracked as well
+    assert all(r['upload'] for r in runs)
+
+    # Each simulator executed its runs one after another
+    for sim in sims:
+        own = sorted((r for r in runs if r['simulator'] == sim.uuid),
+                     key=lambda r: r['started'])
+        for prev, run in zip(own, own[1:]):
+            assert prev['finished'] <= run['started']
+
+
+def run_generic(tmp_path, variants, slots, **kwargs):
+    sim = GenericSimulator(category='simulator',
+                           type='generic',
+                           realm='sweep',
+                           slots=slots,
+                           whitelist=['^sh$'],
+                           workdir_root=str(tmp_path / 'workdirs'),
+                           model_cache_dir=str(tmp_path / 'models'))
+
+    options = {'polling_interval': 0.01}
+
+    with kombu.Connection('memory://', transport_options=options) as conn:
+        mixin = ControllerMixin(conn, [sim])
+
+        thread = threading.Thread(target=mixin.run, daemon=True)
+        thread.start()
+
+        wait_for(lambda: mixin.active_components.keys() ==
+                 mixin.components.keys())
+
+        with kombu.Connection('memory://',
+                              transport_options=options) as client:
+            sweep = Sweep(client, variants, headers={'realm': 'sweep'},
+                          **kwargs)
+
+            manifest = sweep.run()
+
+        mixin.should_stop = True
+        thread.join(5)
+
+    return {r['parameters']['executable']: r
+            for r in manifest['variants']}
+
+
+def test_sweep_rejected(tmp_path):
+    variants = [{'executable': 'sh', 'argv': ['-c', 'true']},
+                {'executable': 'false'}]
+
+    runs = run_generic(tmp_path, variants, slots=2)
+
+    # Rejected starts are not mistaken for finished runs
+    assert runs['sh']['state'] == 'done'
+    assert runs['false']['state'] == 'failed'
+    assert 'whitelisted' in runs['false']['error']
+
+
+def test_sweep_download_failed(tmp_path):
+    variants = [{'executable': 'sh', 'argv': ['-c', 'true']}]
+
+    for slots in [1, 2]:
+        runs = run_generic(tmp_path / str(slots), variants, slots=slots,
+                           model={'url': 'http://127.0.0.1:1/model.zip'})
+
+        # Failed runs do not wait for a timeout
+        assert runs['sh']['state'] == 'failed'
+        assert 'download' in runs['sh']['error']
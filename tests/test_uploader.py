@@ -0,0 +1,130 @@
+import io
+import threading
+import zipfile
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from villas.controller.uploader import ResultUploader, UploadJob
+
+
+def read_chunked(rfile):
+    body = b''
+
+    while True:
+        size = int(rfile.readline().split(b';')[0], 16)
+        body += rfile.read(size + 2)[:size]
+
+        if size == 0:
+            return body
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_PUT(self):
+        assert self.headers['Transfer-Encoding'] == 'chunked'
+        body = read_chunked(self.rfile)
+
+        self.server.release.wait(5)
+
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.send_response(500)
+        else:
+            self.server.uploads.append(body)
+            self.send_response(200)
+
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    srv.uploads = []
+    srv.failures = 0
+    srv.release = threading.Event()
+    srv.url = 'http://127.0.0.1:%d/results.zip' % srv.server_port
+
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+
+    yield srv
+
+    srv.shutdown()
+    srv.server_close()
+
+
+def make_job(server, tmp_path, **kwargs):
+    logs = tmp_path / 'Logs'
+    logs.mkdir()
+    (logs / 'output.log').write_text('Hello')
+
+    return UploadJob(server.url, str(logs), **kwargs)
+
+
+def test_retry(server, tmp_path):
+    server.failures = 2
+    server.release.set()
+
+    uploader = ResultUploader(retries=3, backoff=0.01)
+    job = uploader.submit(make_job(server, tmp_path))
+
+    assert job.done.wait(5)
+    assert job.state == 'done'
+    assert job.attempts == 3
+    assert job.sent == job.size
+    assert len(server.uploads) == 1
+
+    with zipfile.ZipFile(io.BytesIO(server.uploads[0])) as z:
+        assert z.read('output.log') == b'Hello'
+
+    uploader.shutdown()
+
+
+def test_give_up(server, tmp_path):
+    server.failures = 5
+    server.release.set()
+
+    uploader = ResultUploader(retries=1, backoff=0.01)
+    job = uploader.submit(make_job(server, tmp_path))
+
+    assert job.done.wait(5)
+    assert job.state == 'failed'
+    assert '500' in job.status['error']
+
+    uploader.shutdown()
+
+
+def test_background(server, tmp_path):
+    uploader = ResultUploader()
+    job = uploader.submit(make_job(server, tmp_path))
+
+    # The upload is blocked by the server but we are not
+    assert not job.done.wait(0.2)
+    assert job.status['state'] == 'uploading'
+
+    server.release.set()
+
+    assert job.done.wait(5)
+    assert job.state == 'done'
+
+    uploader.shutdown()
+
+
+def test_timeout(server, tmp_path):
+    uploader = ResultUploader(retries=1, backoff=0.01)
+    job = uploader.submit(make_job(server, tmp_path, timeout=0.2))
+
+    # A stalled server does not block the worker
+    assert job.done.wait(5)
+    assert job.state == 'failed'
+    assert job.attempts == 2
+    assert 'timed out' in job.status['error']
+
+    server.release.set()
+    uploader.shutdown()
@@ -0,0 +1,55 @@
+import os
+
+from villas.controller.workdir import WorkdirManager
+
+
+def make_run(mgr, name, size, mtime, release=True):
+    path = mgr.path(name)
+    os.makedirs(os.path.join(path, 'Logs'))
+
+    with open(os.path.join(path, 'Logs', 'output.log'), 'wb') as f:
+        f.write(b'x' * size)
+
+    if release:
+        mgr.release(name)
+
+    os.utime(path, (mtime, mtime))
+
+
+def names(runs):
+    return sorted(r.name for r in runs)
+
+
+def test_retention(tmp_path):
+    mgr = WorkdirManager(str(tmp_path), max_runs=3, max_age=1000)
+
+    make_run(mgr, 'old', 10, 0, release=False)
+    make_run(mgr, 'a', 10, 9000)
+    make_run(mgr, 'b', 10, 9100)
+    make_run(mgr, 'c', 10, 9200, release=False)
+    make_run(mgr, 'd', 10, 9300)
+    make_run(mgr, 'current', 10, 0, release=False)
+
+    removed = mgr.collect(keep={'current'}, now=10000)
+
+    # Unreleased runs are only removed by age
+    assert names(removed) == ['a', 'b', 'old']
+    assert names(mgr.runs()) == ['c', 'current', 'd']
+    assert mgr.status == {'usage': 30, 'runs': 3, 'quota': None}
+
+
+def test_quota(tmp_path):
+    mgrs = [WorkdirManager(str(tmp_path / str(i)), quota=250)
+            for i in range(2)]
+
+    make_run(mgrs[0], 'a', 100, 1000)
+    make_run(mgrs[0], 'b', 100, 3000)
+    make_run(mgrs[1], 'c', 100, 2000)
+
+    assert mgrs[0].collect() == []
+    assert mgrs[0].usage == 200
+
+    WorkdirManager.collect_global(mgrs, 150)
+
+    assert names(mgrs[0].runs()) == ['b']
+    assert names(mgrs[1].runs()) == []
@@ -0,0 +1,253 @@
+import os
+import struct
+import time
+import zlib
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Signatures of the ZIP records
+LOCAL_HEADER = b'PK\x03\x04'
+CENTRAL_HEADER = b'PK\x01\x02'
+DATA_DESCRIPTOR = b'PK\x07\x08'
+END_ZIP64 = b'PK\x06\x06'
+END_ZIP64_LOCATOR = b'PK\x06\x07'
+END = b'PK\x05\x06'
+
+STORED = 0
+DEFLATED = 8
+
+FLAG_DATA_DESCRIPTOR = 1 << 3
+FLAG_UTF8 = 1 << 11
+
+MAX_32 = 0xFFFFFFFF
+MAX_16 = 0xFFFF
+
+
+class Entry:
+
+    def __init__(self, name, mtime, mode):
+        self.name = name.encode()
+        self.flags = 0 if name.isascii() else FLAG_UTF8
+        self.method = STORED
+        self.mode = mode
+
+        self.crc = 0
+        self.compressed_size = 0
+        self.size = 0
+        self.offset = 0
+
+        t = time.localtime(mtime)
+        year = max(t.tm_year, 1980)
+        self.date = (year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+        self.time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+
+    @property
+    def zip64(self):
+        return (self.flags & FLAG_DATA_DESCRIPTOR or
+                self.size >= MAX_32 or
+                self.compressed_size >= MAX_32 or
+                self.offset >= MAX_32)
+
+    def local_header(self):
+        if self.flags & FLAG_DATA_DESCRIPTOR:
+            # Sizes follow in a ZIP64 data descriptor
+            extra = struct.pack('<HHQQ', 1, 16, 0, 0)
+            crc, csize, size = 0, MAX_32, MAX_32
+        else:
+            extra = b''
+            crc, csize, size = self.crc, self.compressed_size, self.size
+
+        return struct.pack('<4sHHHHHLLLHH', LOCAL_HEADER,
+                           45 if extra else 20, self.flags, self.method,
+                           self.time, self.date, crc, csize, size,
+                           len(self.name), len(extra)) + self.name + extra
+
+    def data_descriptor(self):
+        return struct.pack('<4sLQQ', DATA_DESCRIPTOR, self.crc,
+                           self.compressed_size, self.size)
+
+    def central_header(self):
+        if self.zip64:
+            extra = struct.pack('<HHQQQ', 1, 24, self.size,
+                                self.compressed_size, self.offset)
+            csize, size, offset = MAX_32, MAX_32, MAX_32
+            version = 45
+        else:
+            extra = b''
+            csize, size, offset = self.compressed_size, self.size, \
+                self.offset
+            version = 20
+
+        return struct.pack('<4sHHHHHHLLLHHHHHLL', CENTRAL_HEADER,
+                           3 << 8 | version, version, self.flags,
+                           self.method, self.time, self.date, self.crc,
+                           csize, size, len(self.name), len(extra), 0, 0,
+                           0, self.mode << 16, offset) + self.name + extra
+
+
+class ZipStream:
+    """ Produces a ZIP archive of a directory as a stream of chunks.
+
+    The archive is never written to disk. Small files are compressed
+    in parallel by a pool of threads, while larger files are compressed
+    sequentially in chunks. A compression level of 0 stores the files
+    without compression, e.g. for outputs which are already compressed.
+    """
+
+    def __init__(self, folder, level=6, workers=None, chunk_size=1 << 20,
+                 small_size=4 << 20):
+        self.folder = folder
+        self.level = level
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.small_size = small_size
+
+        # Number of bytes of the input files which have been archived
+        self.read = 0
+
+    def files(self):
+        for root, dirs, files in os.walk(self.folder):
+            dirs.sort()
+
+            for fn in sorted(files):
+                path = os.path.join(root, fn)
+                st = os.stat(path)
+
+                yield path, os.path.relpath(path, self.folder), st
+
+    @property
+    def size(self):
+        """ The total size of the input files. """
+        return sum(st.st_size for _, _, st in self.files())
+
+    def compress(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        crc = zlib.crc32(data)
+
+        if self.level > 0:
+            co = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+            compressed = co.compress(data) + co.flush()
+
+            # Do not inflate incompressible data
+            if len(compressed) < len(data):
+                return DEFLATED, crc, len(data), compressed
+
+        return STORED, crc, len(data), data
+
+    def __iter__(self):
+        # Coalesce the records of small files into larger chunks
+        buf = []
+        buffered = 0
+
+        for chunk in self.records():
+            buf.append(chunk)
+            buffered += len(chunk)
+
+            if buffered >= self.chunk_size:
+                yield b''.join(buf)
+                buf, buffered = [], 0
+
+        if buf:
+            yield b''.join(buf)
+
+    def records(self):
+        entries = []
+        offset = 0
+
+        with ThreadPoolExecutor(self.workers,
+                                thread_name_prefix='villas-zip') as pool:
+            # Compression of small files runs ahead by a bounded window
+            window = deque()
+            files = self.files()
+
+            def fill():
+                while len(window) < 2 * self.workers:
+                    item = next(files, None)
+                    if item is None:
+                        return
+
+                    path, name, st = item
+                    entry = Entry(name, st.st_mtime, st.st_mode & 0xFFFF)
+
+                    if st.st_size <= self.small_size:
+                        future = pool.submit(self.compress, path)
+                    else:
+                        future = None
+
+                    window.append((entry, path, future))
+
+            fill()
+            while window:
+                entry, path, future = window.popleft()
+                entry.offset = offset
+
+                if future is not None:
+                    entry.method, entry.crc, entry.size, data = \
+                        future.result()
+                    entry.compressed_size = len(data)
+
+                    chunks = [entry.local_header(), data]
+                else:
+                    chunks = self.stream(entry, path)
+
+                # Keep the workers busy while we send
+                fill()
+
+                for chunk in chunks:
+                    offset += len(chunk)
+                    yield chunk
+
+                self.read += entry.size
+                entries.append(entry)
+
+        yield from self.end(entries, offset)
+
+    def stream(self, entry, path):
+        entry.flags |= FLAG_DATA_DESCRIPTOR
+
+        if self.level > 0:
+            entry.method = DEFLATED
+            co = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        else:
+            co = None
+
+        yield entry.local_header()
+
+        with open(path, 'rb') as f:
+            while chunk := f.read(self.chunk_size):
+                entry.crc = zlib.crc32(chunk, entry.crc)
+                entry.size += len(chunk)
+
+                if co:
+                    chunk = co.compress(chunk)
+
+                entry.compressed_size += len(chunk)
+                if chunk:
+                    yield chunk
+
+        if co:
+            chunk = co.flush()
+            entry.compressed_size += len(chunk)
+            yield chunk
+
+        yield entry.data_descriptor()
+
+    @staticmethod
+    def end(entries, offset):
+        central = b''.join(e.central_header() for e in entries)
+        count = len(entries)
+
+        if count >= MAX_16 or offset >= MAX_32 or len(central) >= MAX_32:
+            yield central
+            yield struct.pack('<4sQHHLLQQQQ', END_ZIP64, 44, 45, 45, 0, 0,
+                              count, count, len(central), offset)
+            yield struct.pack('<4sLQL', END_ZIP64_LOCATOR, 0,
+                              offset + len(central), 1)
+            yield struct.pack('<4sHHHHLLH', END, 0, 0, MAX_16, MAX_16,
+                              MAX_32, MAX_32, 0)
+        else:
+            yield central + struct.pack('<4sHHHHLLH', END, 0, 0, count,
+                                        count, len(central), offset, 0)
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+
+import aio_pika
+
+from villas.controller.controller import Controller
+from villas.controller.dispatcher import Dispatcher
+from villas.controller.reaper import AsyncReaper
+from villas.controller.scheduler import AsyncScheduler
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncMessage:
+    """ Wraps an incoming aio-pika message for the components.
+
+    Provides the parts of kombu.Message which are used by the components.
+    """
+
+    def __init__(self, message, payload):
+        self.body = message.body
+        self.headers = message.headers or {}
+        self.properties = message.info()
+        self.payload = payload
+
+    def ack(self):
+        # Messages are consumed without acknowledgement
+        pass
+
+
+class AsyncProducer:
+    """ Publishes messages from any thread via the event loop.
+
+    Provides the parts of kombu's ProducerPool and Producer which are
+    used by the components.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    def acquire(self, block=False):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def publish(self, body, headers=None, exchange=None, **kwargs):
+        if not isinstance(body, str):
+            body = json.dumps(body)
+
+        message = aio_pika.Message(body.encode('utf-8'),
+                                   headers=headers,
+                                   content_type='application/json',
+                                   content_encoding='utf-8')
+
+        self.controller.publish(message, exchange.name)
+
+
+class AsyncController(Controller):
+    """ Controller engine based on a single asyncio event loop.
+
+    Consuming, publishing and the periodic status of all components are
+    handled by coroutines on one event loop. All components share a
+    single queue. Child processes, their output and the deadlines of
+    runs are watched by the loop as well.
+
+    This engine does not move all I/O onto the loop: actions are
+    synchronous code and still run on the bounded action pool, which
+    includes the download of models. Results are uploaded by the
+    bounded upload pool, as archiving them is CPU bound. The number of
+    threads is therefore bounded by these pools. Compared to the kombu
+    engine, only the thread of the reaper is saved.
+    """
+
+    def __init__(self, url, components, **kwargs):
+        self.url = url
+        self.loop = None
+        self.connection = None
+        self.channel = None
+        self.exchanges = {}
+        self.queue = None
+
+        # Tasks which have been spawned but not finished yet
+        self.tasks = set()
+
+        self.dispatcher = Dispatcher()
+        self.scheduler = AsyncScheduler()
+        self.reaper = AsyncReaper()
+        self.producers = AsyncProducer(self)
+
+        super().__init__(components, **kwargs)
+
+    def run(self):
+        asyncio.run(self.main())
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+
+        # A robust connection restores exchanges, queues, bindings
+        # and consumers after the connection to the broker has been lost
+        self.connection = await aio_pika.connect_robust(self.url)
+
+        async with self.connection:
+            self.channel = await self.connection.channel()
+
+            for name in ['villas', 'villas.status', 'villas.logs']:
+                self.exchanges[name] = await self.channel.declare_exchange(
+                    name, aio_pika.ExchangeType.HEADERS, durable=True)
+
+            self.queue = await self.channel.declare_queue(exclusive=True)
+            await self.queue.consume(self.on_message, no_ack=True)
+
+            LOGGER.info('Starting asyncio engine for %d components',
+                        len(self.components))
+
+            self.scheduler.start(self.loop)
+            self.reaper.start(self.loop)
+
+            try:
+                while True:
+                    self.update_components()
+
+                    await asyncio.sleep(1)
+            finally:
+                self.shutdown()
+
+                # Wait for pending publishes, e.g. the final 'gone' states
+                await asyncio.sleep(0)
+                await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def shutdown(self):
+        LOGGER.info('Shutdown controller')
+        for u, c in self.components.items():
+            c.on_shutdown()
+
+        self.scheduler.stop()
+        self.executor.shutdown(wait=False)
+        self.uploader.shutdown(wait=False)
+        self.reaper.stop()
+
+    def spawn(self, coro):
+        task = self.loop.create_task(coro)
+
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task):
+        self.tasks.discard(task)
+
+        if not task.cancelled() and task.exception():
+            LOGGER.error('Task failed: %s', task.exception())
+
+    def call_soon(self, func, *args):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self.loop:
+            func(*args)
+        else:
+            self.loop.call_soon_threadsafe(func, *args)
+
+    def publish(self, message, exchange):
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        self.call_soon(self.spawn,
+                       self.exchanges[exchange].publish(message,
+                                                        routing_key=''))
+
+    def _bind(self, pair, unbind=False):
+        key, value = pair
+        exchange = self.exchanges['villas']
+        arguments = {
+            'x-match': 'any',
+            key: value
+        }
+
+        if unbind:
+            return self.queue.unbind(exchange, arguments=arguments)
+        else:
+            return self.queue.bind(exchange, arguments=arguments)
+
+    def add_consumer(self, comp):
+        for pair in self.dispatcher.add(comp):
+            self.spawn(self._bind(pair))
+
+    def remove_consumer(self, comp):
+        for pair in self.dispatcher.remove(comp):
+            self.spawn(self._bind(pair, unbind=True))
+
+    async def on_message(self, message):
+        try:
+            payload = json.loads(message.body)
+        except ValueError:
+            LOGGER.error('Failed to decode message: %s', message.body)
+            return
+
+        msg = AsyncMessage(message, payload)
+
+        for comp in self.dispatcher.lookup(msg.headers):
+            comp.on_message(msg)
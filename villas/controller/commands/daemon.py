@@ -3,6 +3,7 @@ import logging
 
 from villas.controller.command import Command
 from villas.controller.controller import ControllerMixin
+from villas.controller.supervisor import Supervisor
 
 LOGGER = logging.getLogger(__name__)
 
@@ -13,16 +14,72 @@ class DaemonCommand(Command):
     def add_parser(subparsers):
         parser = subparsers.add_parser('daemon',
                                        help='Run VILLAScontroller as a daemon')
+        parser.add_argument('-s', '--single-queue', action='store_true',
+                            help='Use a single queue for all components')
+        parser.add_argument('-B', '--bulk-status', action='store_true',
+                            help='Publish the periodic status of all '
+                                 'components in a single message')
+        parser.add_argument('-a', '--action-workers', type=int, default=8,
+                            help='Number of threads executing actions')
+        parser.add_argument('-U', '--upload-workers', type=int, default=2,
+                            help='Number of concurrent result uploads')
+        parser.add_argument('-Q', '--workdir-quota', type=int,
+                            help='Quota in bytes for the working '
+                                 'directories of all simulators. With '
+                                 '--workers, each worker enforces an equal '
+                                 'share for its own simulators')
+        parser.add_argument('-e', '--engine', default='kombu',
+                            choices=['kombu', 'asyncio'],
+                            help='Engine for consuming and publishing')
+        parser.add_argument('-W', '--workers', type=int, default=1,
+                            help='Number of worker processes')
         parser.set_defaults(func=DaemonCommand.run)
 
     @staticmethod
     def run(connection, args):
+        if args.workers > 1:
+            return DaemonCommand.run_workers(connection, args)
+
         components = args.config.components
 
         try:
-            d = ControllerMixin(connection, components)
+            if args.engine == 'asyncio':
+                from villas.controller.async_controller import AsyncController
+
+                url = connection.as_uri(include_password=True)
+                d = AsyncController(url, components,
+                                    bulk_status=args.bulk_status,
+                                    action_workers=args.action_workers,
+                                    upload_workers=args.upload_workers,
+                                    workdir_quota=args.workdir_quota)
+            else:
+                d = ControllerMixin(connection, components,
+                                    single_queue=args.single_queue,
+                                    bulk_status=args.bulk_status,
+                                    action_workers=args.action_workers,
+                                    upload_workers=args.upload_workers,
+                                    workdir_quota=args.workdir_quota)
             d.run()
         except KeyboardInterrupt:
             d.shutdown()
         except ConnectionError:
             LOGGER.error('Failed to connect to broker.')
+
+    @staticmethod
+    def run_workers(connection, args):
+        components = args.config.dict.get('components', [])
+
+        url = connection.as_uri(include_password=True)
+        s = Supervisor(url, components, args.workers,
+                       engine=args.engine,
+                       single_queue=args.single_queue,
+                       bulk_status=args.bulk_status,
+                       action_workers=args.action_workers,
+                       upload_workers=args.upload_workers,
+                       workdir_quota=args.workdir_quota,
+                       log_level=args.log_level)
+
+        try:
+            s.run()
+        except KeyboardInterrupt:
+            s.shutdown()
@@ -2,6 +2,7 @@ import kombu
 import time
 import json
 import sys
+import functools
 
 from villas.controller.command import Command
 from villas.controller.commands.simulator import SimulatorCommand
@@ -12,6 +13,8 @@ class MonitorCommand(Command):
     @staticmethod
     def add_parser(subparsers):
         parser = subparsers.add_parser('monitor', help='Listen to events')
+        parser.add_argument('-l', '--logs', action='store_true',
+                            help='Only tail the output of simulation runs')
         parser.set_defaults(func=MonitorCommand.run)
 
         filt = parser.add_argument_group('Filter simulators')
@@ -22,18 +25,39 @@ class MonitorCommand(Command):
 
     @staticmethod
     def run(connection, args):
-        exchange = kombu.Exchange(name='villas', type='headers')
+        exchanges = [
+            kombu.Exchange(name='villas', type='headers', durable=True),
+            kombu.Exchange(name='villas.status', type='headers',
+                           durable=True),
+            kombu.Exchange(name='villas.logs', type='headers', durable=True)
+        ]
 
         headers = SimulatorCommand.get_headers(args)
         headers['x-match'] = 'any' if len(headers) > 0 else 'all'
 
-        queue = kombu.Queue(exchange=exchange,
-                            binding_arguments=headers,
-                            durable=False)
+        if args.logs:
+            exchanges = exchanges[2:]
+
+        # Listen to actions, status updates and output of simulation runs
+        bindings = [kombu.binding(exchange, arguments=headers)
+                    for exchange in exchanges]
+
+        # Bulk status frames are filtered after their expansion
+        if not args.logs:
+            bindings.append(kombu.binding(exchanges[1], arguments={
+                'x-match': 'all',
+                'bulk': True
+            }))
+
+        queue = kombu.Queue(bindings=bindings, durable=False)
+
+        filt = SimulatorCommand.get_headers(args)
 
         consumer = kombu.Consumer(connection,
                                   queues=queue,
-                                  on_message=MonitorCommand.on_message)
+                                  on_message=functools.partial(
+                                      MonitorCommand.on_message, filt=filt,
+                                      logs=args.logs))
 
         try:
             with consumer:
@@ -43,13 +67,54 @@ class MonitorCommand(Command):
             pass
 
     @staticmethod
-    def on_message(message):
+    def on_message(message, filt={}, logs=False):
+        if logs:
+            MonitorCommand.write_log(message.payload)
+        elif message.payload.get('bulk'):
+            MonitorCommand.on_bulk_status(message, filt)
+        else:
+            MonitorCommand.write(message.payload, message.properties)
+
+    @staticmethod
+    def on_bulk_status(message, filt={}):
+        # Expand bulk status frames into per-component records
+        frame = message.payload
+
+        for uuid, comp in frame['components'].items():
+            headers = comp['headers']
+
+            if filt and not any(headers.get(k) == v for k, v in filt.items()):
+                continue
+
+            payload = {
+                'status': {
+                    **frame['status'],
+                    **comp['status']
+                },
+                'seq': frame['seq']
+            }
+
+            MonitorCommand.write(payload, {
+                **message.properties,
+                'application_headers': headers
+            })
+
+    @staticmethod
+    def write_log(payload):
+        if payload.get('dropped'):
+            sys.stderr.write('[%d characters dropped]\n' % payload['dropped'])
+
+        sys.stdout.write(payload.get('log', ''))
+        sys.stdout.flush()
+
+    @staticmethod
+    def write(payload, properties):
         entry = {
             'time': time.time(),
-            'payload': message.payload,
+            'payload': payload,
         }
 
-        entry.update(message.properties)
+        entry.update(properties)
 
         sys.stdout.write('%s\n' % json.dumps(entry))
         sys.stdout.flush()
@@ -6,6 +6,7 @@ import sys
 import logging
 
 from villas.controller.command import Command
+from villas.controller.sweep import Sweep, expand_grid
 
 LOGGER = logging.getLogger(__name__)
 
@@ -15,8 +16,8 @@ def _get_parameters(params, params_file):
 
     try:
         if params is not None:
-            parameters.update(yaml.loads(params,
-                                         Loader=yaml.FullLoader))
+            parameters.update(yaml.load(params,
+                                        Loader=yaml.FullLoader))
         if params_file is not None:
             with open(params_file) as f:
                 parameters.update(yaml.load(f, Loader=yaml.FullLoader))
@@ -55,6 +56,7 @@ class SimulatorCommand(Command):
         sim_subparsers.dest = 'command'
 
         SimulatorStartCommand.add_parser(sim_subparsers)
+        SimulatorSweepCommand.add_parser(sim_subparsers)
         SimulatorStopCommand.add_parser(sim_subparsers)
         SimulatorPauseCommand.add_parser(sim_subparsers)
         SimulatorResumeCommand.add_parser(sim_subparsers)
@@ -97,10 +99,14 @@ class SimulatorPingCommand(Command):
                                   type='headers',
                                   durable=True)
 
+        status_exchange = kombu.Exchange('villas.status',
+                                         type='headers',
+                                         durable=True)
+
         producer = kombu.Producer(channel, exchange=exchange)
         consumer = kombu.Consumer(channel,
                                   queues=kombu.Queue(
-                                      exchange=exchange,
+                                      exchange=status_exchange,
                                       durable=False
                                   ),
                                   on_message=SimulatorPingCommand.on_message)
@@ -168,6 +174,87 @@ class SimulatorStartCommand(Command):
         producer.publish(message, headers=SimulatorCommand.get_headers(args))
 
 
+class SimulatorSweepCommand(Command):
+
+    @staticmethod
+    def add_parser(subparsers):
+        parser = subparsers.add_parser('sweep',
+                                       help='Run a parameter study on all '
+                                            'matching simulators')
+        parser.add_argument('-p', '--parameters', metavar='YAMLorJSON',
+                            help='Parameters common to all runs')
+        parser.add_argument('-P', '--parameters-file', metavar='FILE')
+        parser.add_argument('-g', '--grid', metavar='YAMLorJSON',
+                            help='Lists of values per parameter. '
+                                 'All combinations are run')
+        parser.add_argument('-G', '--grid-file', metavar='FILE')
+        parser.add_argument('-l', '--list-file', metavar='FILE',
+                            help='List of parameter sets to run')
+        parser.add_argument('-m', '--model', metavar='YAMLorJSON')
+        parser.add_argument('-M', '--model-file', metavar='FILE')
+        parser.add_argument('-r', '--results', metavar='YAMLorJSON',
+                            help='Results of each run. {index} and '
+                                 '{simuuid} are substituted')
+        parser.add_argument('-R', '--results-file', metavar='FILE')
+        parser.add_argument('-n', '--max-runs', type=int,
+                            help='Maximum number of concurrent runs '
+                                 'per simulator')
+        parser.add_argument('-T', '--timeout', type=float,
+                            help='Timeout in seconds for each run')
+        parser.add_argument('-o', '--output', metavar='FILE',
+                            help='Write the manifest to a file '
+                                 'instead of stdout')
+        parser.set_defaults(func=SimulatorSweepCommand.run)
+
+    @staticmethod
+    def get_variants(args):
+        base = _get_parameters(args.parameters, args.parameters_file) or {}
+
+        sets = [{}]
+        if args.list_file is not None:
+            with open(args.list_file) as f:
+                sets = yaml.load(f, Loader=yaml.FullLoader)
+
+        combinations = [{}]
+        if args.grid is not None or args.grid_file is not None:
+            combinations = expand_grid(_get_parameters(args.grid,
+                                                       args.grid_file))
+
+        return [{**base, **params, **combination}
+                for params in sets
+                for combination in combinations]
+
+    @staticmethod
+    def run(connection, args):
+        variants = SimulatorSweepCommand.get_variants(args)
+
+        model = None
+        if args.model is not None or args.model_file is not None:
+            model = _get_parameters(args.model, args.model_file)
+
+        results = None
+        if args.results is not None or args.results_file is not None:
+            results = _get_parameters(args.results, args.results_file)
+
+        LOGGER.info('Running %d variants', len(variants))
+
+        sweep = Sweep(connection, variants,
+                      headers=SimulatorCommand.get_headers(args),
+                      model=model,
+                      results=results,
+                      max_runs=args.max_runs,
+                      timeout=args.timeout)
+
+        manifest = sweep.run()
+
+        if args.output is not None:
+            with open(args.output, 'w') as f:
+                json.dump(manifest, f, indent=2)
+        else:
+            sys.stdout.write('%s\n' % json.dumps(manifest, indent=2))
+            sys.stdout.flush()
+
+
 class SimulatorStopCommand(Command):
 
     @staticmethod
@@ -1,4 +1,5 @@
 import logging
+import json
 import kombu
 import time
 import socket
@@ -28,32 +29,62 @@ class Component:
             self.uuid = str(uuid.uuid4())
 
         self.started = time.time()
-        self.properties = props
 
         self._state = 'idle'
         self._status_fields = {}
 
+        # Cached parts of the status which change only rarely
+        self._status_static = None
+        self._status_template = None
+        self._status_template_key = None
+
+        self.properties = props
+
         self.logger = logging.getLogger(
             f'villas.controller.{self.category}.{self.type}:{self.uuid}')
 
-        self.producer = None
+        # Pool of producers which is shared by all components of the mixin
+        self.producers = None
         self.exchange = kombu.Exchange(name='villas',
                                        type='headers',
                                        durable=True)
 
-        self.publish_status_interval = 2
-        self.publish_status_thread_stop = threading.Event()
-        self.publish_status_thread = threading.Thread(
-            target=self.publish_status_periodically)
+        # Status updates are published to a separate exchange so that
+        # they are not delivered to the action queues of other components
+        self.status_exchange = kombu.Exchange(name='villas.status',
+                                              type='headers',
+                                              durable=True)
+
+        # Output of simulation runs is published to its own exchange
+        self.log_exchange = kombu.Exchange(name='villas.logs',
+                                           type='headers',
+                                           durable=True)
+
+        # Status is published periodically by the scheduler of the mixin
+        self.mixin = None
+        self.publish_status_interval = props.get('publish_status_interval', 2)
+
+        # Optionally, only changed status fields are published
+        # periodically and a full snapshot only every N intervals
+        self.publish_status_delta = props.get('publish_status_delta', False)
+        self.publish_status_full_interval = props.get(
+            'publish_status_full_interval', 10)
+
+        self._status_lock = threading.Lock()
+        self._status_seq = 0
+        self._status_ticks = 0
+        self._status_last = None
 
     def on_ready(self):
-        self.publish_status_thread.start()
-        pass
+        # With bulk status, the mixin publishes the status of all components
+        if not self.mixin.bulk_status:
+            self.mixin.scheduler.add(self.uuid, self.publish_status_interval,
+                                     self.publish_status_periodically)
 
     def on_shutdown(self):
-        if self.publish_status_thread.is_alive():
-            self.publish_status_thread_stop.set()
-            self.publish_status_thread.join()
+        if self.mixin is not None:
+            self.mixin.scheduler.remove(self.uuid)
+
         self.change_state('gone')
         self.logger.info('Component shut down: state=gone')
 
@@ -63,9 +94,7 @@ class Component:
     def set_mixin(self, mixin):
         self.mixin = mixin
         self.connection = mixin.connection
-
-        self.producer = kombu.Producer(channel=self.connection.channel(),
-                                       exchange=self.exchange)
+        self.producers = mixin.producers
 
     def get_consumer(self, channel):
         self.channel = channel
@@ -95,32 +124,107 @@ class Component:
         }
 
     @property
-    def status(self):
+    def properties(self):
+        return self._properties
+
+    @properties.setter
+    def properties(self, properties):
+        self._properties = properties
+        self._status_static = None
+
+    @property
+    def static_status(self):
+        """ Status fields which do not change over the lifetime. """
+        if self._status_static is None:
+            self._status_static = {
+                'version': version,
+                'host': socket.gethostname(),
+                'kernel': os.uname(),
+            }, {
+                **self.properties,
+                **self.headers
+            }
+
+        return self._status_static
+
+    @property
+    def compact_status(self):
+        """ Status fields which change over the lifetime. """
         status = {
             'state': self._state,
-            'version': version,
             'uptime': time.time() - self.started,
-            'host': socket.gethostname(),
-            'kernel': os.uname(),
             **self._status_fields
         }
 
         if self.manager is not None:
             status['managed_by'] = self.manager.uuid
 
+        return status
+
+    @property
+    def status(self):
+        static, properties = self.static_status
+
         return {
-            'status': status,
-            'properties': {
-                **self.properties,
-                **self.headers
-            }
+            'status': {
+                **static,
+                **self.compact_status
+            },
+            'properties': properties
         }
 
+    # Placeholders for the serialized status template
+    _UPTIME = '__villas_controller_uptime__'
+    _SEQ = '__villas_controller_seq__'
+
+    def status_json(self, seq):
+        """ Return the full status serialized as JSON.
+
+        Only uptime and sequence number change between state transitions.
+        So we serialize the status once and only substitute those two.
+        """
+        static = self.static_status
+        compact = self.compact_status
+        uptime = compact.pop('uptime')
+
+        key = static, compact
+
+        if self._status_template is None or \
+           self._status_template_key != key:
+            status = {
+                'status': {
+                    **static[0],
+                    **compact,
+                    'uptime': self._UPTIME
+                },
+                'properties': static[1],
+                'seq': self._SEQ
+            }
+
+            body = json.dumps(status)
+            head, tail = body.split(json.dumps(self._UPTIME))
+            middle, end = tail.split(json.dumps(self._SEQ))
+
+            self._status_template = head, middle, end
+            self._status_template_key = key
+
+        head, middle, end = self._status_template
+
+        return f'{head}{uptime!r}{middle}{seq}{end}'
+
     def on_message(self, message):
         self.logger.debug('Received message: %s', message.payload)
 
         if 'action' in message.payload:
-            self.run_action(message.payload['action'], message)
+            action = message.payload['action']
+
+            # Actions are executed by the worker pool of the mixin
+            # so that slow actions do not block the consumer
+            if self.mixin is not None and self.mixin.executor is not None:
+                self.mixin.executor.submit(self.uuid, self.run_action,
+                                           action, message)
+            else:
+                self.run_action(action, message)
 
     def run_action(self, action, message):
         if action == 'ping':
@@ -168,7 +272,7 @@ class Component:
         self._state = state
         self._status_fields = kwargs
 
-        self.publish_status()
+        self.publish_status(full=False)
 
     # Actions
     def ping(self, message):
@@ -208,18 +312,82 @@ class Component:
         else:
             raise Exception(f'Unsupported category {category}')
 
-    def publish_status(self):
-        if self.producer is None:
+    @staticmethod
+    def status_delta(old, new):
+        """ Return the fields of a status which have changed.
+
+        Fields which have been removed are included with a value of None.
+        """
+        delta = {}
+
+        for section, fields in new.items():
+            prev = old.get(section, {})
+
+            changed = {k: v for k, v in fields.items()
+                       if k not in prev or prev[k] != v}
+            changed.update({k: None for k in prev.keys() - fields.keys()})
+
+            if changed:
+                delta[section] = changed
+
+        return delta
+
+    def publish_status(self, full=True):
+        if self.producers is None:
+            return
+
+        # The lock keeps sequence numbers in the order of publishing
+        with self._status_lock:
+            self._status_seq += 1
+
+            if self.publish_status_delta:
+                status = self.status
+                last = self._status_last
+
+                self._status_last = status
+
+                if not full and last is not None:
+                    payload = self.status_delta(last, status)
+                    payload['delta'] = True
+                    payload['seq'] = self._status_seq
+
+                    self._publish_status(payload)
+                    return
+
+            self._publish_status(self.status_json(self._status_seq),
+                                 content_type='application/json',
+                                 content_encoding='utf-8')
+
+    def _publish_status(self, payload, **kwargs):
+        self.publish(payload,
+                     headers=self.headers,
+                     exchange=self.status_exchange,
+                     declare=[self.status_exchange],
+                     **kwargs)
+
+    def publish_log(self, payload):
+        if self.producers is None:
             return
 
-        self.producer.publish(self.status, headers=self.headers)
+        self.publish(payload,
+                     headers=self.headers,
+                     exchange=self.log_exchange,
+                     declare=[self.log_exchange])
+
+    def publish(self, body, **kwargs):
+        # Producers are not thread-safe. Hence each publish
+        # acquires a producer from the pool for exclusive use
+        with self.producers.acquire(block=True) as producer:
+            producer.publish(body, **kwargs)
 
     def publish_status_periodically(self):
-        self.logger.info('Start state publish thread')
-        while not self.publish_status_thread_stop.wait(
-          self.publish_status_interval):
-            self.logger.info('Publish status: %s', self.status)
-            self.publish_status()
+        self._status_ticks += 1
+
+        full = self._status_ticks % self.publish_status_full_interval == 0
+
+        self.logger.debug('Publish status: seq=%d, full=%s',
+                          self._status_seq + 1, full)
+        self.publish_status(full=full)
 
     def __str__(self):
         return f'{self.type} {self.category} <{self.name}: {self.uuid}>'
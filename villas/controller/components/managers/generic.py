@@ -1,22 +1,66 @@
+import uuid
+
 from villas.controller.components.manager import Manager
 from villas.controller.component import Component
 
 
 class GenericManager(Manager):
 
+    @property
+    def compact_status(self):
+        status = super().compact_status
+
+        # The generic manager represents the controller itself
+        if self.mixin is not None:
+            status['actions'] = self.mixin.executor.stats
+
+        return status
+
     def create(self, message):
-        component = Component.from_dict(message.payload.get('parameters'))
+        parameters = message.payload.get('parameters')
+        shard = self.mixin.shard
+
+        # The supervisor identifies created components by their UUID
+        if shard is not None and not parameters.get('uuid'):
+            parameters = {**parameters, 'uuid': str(uuid.uuid4())}
+
+        # Place new components on the least loaded worker process
+        if shard is not None:
+            index = shard.least_loaded()
+            if index != shard.index:
+                self.logger.info('Placing new component on worker %d', index)
+                shard.send(index, 'create', parameters)
+                return
+
+        self.create_component(parameters)
+
+    def create_component(self, parameters):
+        component = Component.from_dict(parameters)
 
         try:
             self.add_component(component)
         except KeyError:
             self.logger.error('A component with the UUID %s already exists',
                               component.uuid)
+            return
+
+        # Allows the supervisor to restore the component after a restart
+        if self.mixin.shard is not None:
+            self.mixin.shard.report('created', parameters)
 
     def delete(self, message):
         parameters = message.payload.get('parameters')
         uuid = parameters.get('uuid')
+        shard = self.mixin.shard
 
+        # The component might be hosted by another worker process
+        if shard is not None and uuid not in self.components:
+            shard.broadcast('delete', parameters)
+            return
+
+        self.delete_component(uuid)
+
+    def delete_component(self, uuid):
         try:
             comp = self.components[uuid]
 
@@ -24,3 +68,7 @@ class GenericManager(Manager):
 
         except KeyError:
             self.logger.error('There is not component with UUID: %s', uuid)
+            return
+
+        if self.mixin.shard is not None:
+            self.mixin.shard.report('deleted', {'uuid': uuid})
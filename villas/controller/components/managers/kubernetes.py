@@ -1,9 +1,9 @@
 import os
-import threading
 import kubernetes as k8s
 
 from villas.controller.components.manager import Manager
 from villas.controller.components.simulators.kubernetes import KubernetesJob
+from villas.controller.informer import Informer
 
 
 class KubernetesManager(Manager):
@@ -11,15 +11,6 @@ class KubernetesManager(Manager):
     def __init__(self, **args):
         super().__init__(**args)
 
-        self.thread_stop = threading.Event()
-
-        self.pod_watcher_thread = threading.Thread(
-            target=self._run_pod_watcher)
-        self.job_watcher_thread = threading.Thread(
-            target=self._run_job_watcher)
-        self.event_watcher_thread = threading.Thread(
-            target=self._run_event_watcher)
-
         if os.environ.get('KUBECONFIG'):
             k8s.config.load_kube_config()
         else:
@@ -29,22 +20,45 @@ class KubernetesManager(Manager):
 
         self._check_namespace(self.namespace)
 
-        # self.pod_watcher_thread.start()
-        # self.job_watcher_thread.start()
-        # self.event_watcher_thread.start()
+        # Jobs, Pods and ConfigMaps of this manager are cached locally.
+        # Status queries are answered from these caches
+        core = k8s.client.CoreV1Api()
+        batch = k8s.client.BatchV1Api()
+        selector = f'controller-uuid={self.uuid}'
+        timeout = args.get('watch_timeout', 300)
+
+        self.jobs = Informer(batch.list_namespaced_job, self.namespace,
+                             selector, indexes=['uuid'],
+                             on_change=self._on_job_change,
+                             timeout=timeout, name='jobs')
+        self.pods = Informer(core.list_namespaced_pod, self.namespace,
+                             selector, indexes=['uuid', 'job-name'],
+                             on_change=self._on_pod_change,
+                             timeout=timeout, name='pods')
+        self.config_maps = Informer(core.list_namespaced_config_map,
+                                    self.namespace, selector,
+                                    indexes=['uuid'],
+                                    timeout=timeout, name='configmaps')
+
+        self.informers = [self.jobs, self.pods, self.config_maps]
+
+        self.logger.info('Starting Kubernetes informers')
+        for informer in self.informers:
+            informer.start()
 
     def __del__(self):
-        self.logger.info('Stopping Kubernetes watchers')
-        self.thread_stop.set()
+        self.stop_informers()
 
-        if self.pod_watcher_thread.is_alive():
-            self.pod_watcher_thread.join()
+    def stop_informers(self):
+        self.logger.info('Stopping Kubernetes informers')
 
-        if self.job_watcher_thread.is_alive():
-            self.job_watcher_thread.join()
+        for informer in getattr(self, 'informers', []):
+            informer.stop()
 
-        if self.event_watcher_thread.is_alive():
-            self.event_watcher_thread.join()
+    def on_shutdown(self):
+        self.stop_informers()
+
+        super().on_shutdown()
 
     def _check_namespace(self, ns):
         c = k8s.client.CoreV1Api()
@@ -56,37 +70,25 @@ class KubernetesManager(Manager):
 
         raise RuntimeError(f'Namespace {ns} does not exist')
 
-    def _run_event_watcher(self):
-        w = k8s.watch.Watch()
-        c = k8s.client.CoreV1Api()
-
-        for e in w.stream(c.list_namespaced_event,
-                          namespace=self.namespace):
-            eo = e.get('object')
-
-            self.logger.info('Event: %s (reason=%s)', eo.message, eo.reason)
-
-    def _run_pod_watcher(self):
-        w = k8s.watch.Watch()
-        c = k8s.client.CoreV1Api()
+    def _component(self, obj):
+        uuid = (obj.metadata.labels or {}).get('uuid')
 
-        for sts in w.stream(c.list_namespaced_pod,
-                            namespace=self.namespace):
-            stso = sts.get('object')
-            typ = sts.get('type')
+        return self.components.get(uuid)
 
-            self.logger.info('%s Pod: %s', typ, stso.metadata.name)
+    def _on_job_change(self, typ, job):
+        self.logger.info('%s Job: %s', typ, job.metadata.name)
 
-    def _run_job_watcher(self):
-        w = k8s.watch.Watch()
-        b = k8s.client.BatchV1Api()
+        comp = self._component(job)
+        if comp is not None:
+            comp.on_job_change(typ, job)
 
-        for sts in w.stream(b.list_namespaced_job,
-                            namespace=self.namespace):
-            stso = sts.get('object')
-            typ = sts.get('type')
+    def _on_pod_change(self, typ, pod):
+        self.logger.info('%s Pod: %s (%s)', typ, pod.metadata.name,
+                         pod.status.phase if pod.status else None)
 
-            self.logger.info('%s Job: %s', typ, stso.metadata.name)
+        comp = self._component(pod)
+        if comp is not None:
+            comp.on_pod_change(typ, pod)
 
     def create(self, message):
         parameters = message.payload.get('parameters', {})
@@ -2,11 +2,34 @@ import uuid
 import time
 import os
 import requests
-import tempfile
-import zipfile
+
+from xdg import xdg_cache_home
 
 from villas.controller.component import Component
 from villas.controller.exceptions import SimulationException
+from villas.controller.model_cache import ModelCache
+from villas.controller.reaper import Reaper
+from villas.controller.uploader import UploadJob
+from villas.controller.workdir import WorkdirManager
+
+
+class Run:
+    """ The context of a single simulation run. """
+
+    def __init__(self, simuuid, workdir, params, model, results):
+        self.simuuid = simuuid
+        self.workdir = workdir
+        self.logdir = workdir + '/Logs/'
+        self.params = params
+        self.model = model
+        self.results = results
+        self.started = time.time()
+
+        # The digest of the cached model which is pinned by this run
+        self.model_digest = None
+
+        # Set once the run has ended and its results are handled
+        self.finished = False
 
 
 class Simulator(Component):
@@ -16,6 +39,55 @@ class Simulator(Component):
 
         self.model = None
         self.results = None
+        self.params = None
+
+        # The most recently started run
+        self.run = None
+
+        # Dict (simulation uuid -> UploadJob) of recent result uploads
+        self.uploads = {}
+        self.max_uploads = 10
+
+        self.results_compression_level = args.get(
+            'results_compression_level', 6)
+        self.results_compression_workers = args.get(
+            'results_compression_workers')
+        self.results_upload_timeout = args.get('results_upload_timeout', 60)
+
+        # Working directories of the runs and their retention policy.
+        # By default, runs are kept for a week and at most 100 runs
+        root = args.get('workdir_root', '/var/villas/controller/simulators')
+        self.workdirs = WorkdirManager(
+            os.path.join(root, self.uuid, 'simulation'),
+            quota=args.get('workdir_quota'),
+            max_age=args.get('workdir_max_age', 7 * 24 * 3600),
+            max_runs=args.get('workdir_max_runs', 100))
+        self.workdirs_interval = args.get('workdir_gc_interval', 60)
+
+        cache_dir = args.get('model_cache_dir',
+                             os.path.join(xdg_cache_home(), 'villas',
+                                          'controller', 'models'))
+        self.model_cache = ModelCache(
+            cache_dir,
+            max_size=args.get('model_cache_size', 4 << 30),
+            chunk_size=args.get('model_download_chunk_size', 1 << 20),
+            extract_workers=args.get('model_extract_workers'))
+
+        # Dict (simulation uuid -> Run) of runs which pin a cached model
+        self.pinned_runs = {}
+
+        # Child processes are watched by the reaper of the mixin
+        self._reaper = None
+
+    @property
+    def reaper(self):
+        if self.mixin is not None and self.mixin.reaper is not None:
+            return self.mixin.reaper
+
+        if self._reaper is None:
+            self._reaper = Reaper()
+
+        return self._reaper
 
     @property
     def state(self):
@@ -26,6 +98,64 @@ class Simulator(Component):
             **super().state
         }
 
+    @property
+    def compact_status(self):
+        status = super().compact_status
+
+        status['workdirs'] = self.workdirs.status
+
+        # Allows clients to track the completion of their runs
+        if self.run is not None:
+            status['simuuid'] = self.run.simuuid
+
+        if self.uploads:
+            status['uploads'] = {k: j.status
+                                 for k, j in list(self.uploads.items())}
+
+        return status
+
+    def on_ready(self):
+        super().on_ready()
+
+        self.mixin.scheduler.add(self.uuid + '/workdirs',
+                                 self.workdirs_interval,
+                                 self.collect_workdirs)
+        self.collect_workdirs()
+
+    def on_shutdown(self):
+        if self.mixin is not None:
+            self.mixin.scheduler.remove(self.uuid + '/workdirs')
+
+        super().on_shutdown()
+
+    def collect_workdirs(self):
+        # Collection is serialized with the actions of the simulator
+        if self.mixin is not None and self.mixin.executor is not None:
+            self.mixin.executor.submit(self.uuid, self._collect_workdirs)
+        else:
+            self._collect_workdirs()
+
+    @property
+    def active_runs(self):
+        """ UUIDs of the runs which are currently executed. """
+        if self.run is None or self._state in ['idle', 'error']:
+            return set()
+
+        return {self.run.simuuid}
+
+    def _collect_workdirs(self):
+        # Active runs and runs which are still uploading are kept
+        keep = {k for k, j in list(self.uploads.items())
+                if not j.done.is_set()}
+        active = self.active_runs
+
+        self.workdirs.collect(keep | active)
+
+        # Runs which ended without stopping, e.g. in an error
+        for simuuid, run in list(self.pinned_runs.items()):
+            if simuuid not in active:
+                self.release_model(run)
+
     @staticmethod
     def from_dict(dict):
         type = dict.get('type')
@@ -84,7 +214,8 @@ class Simulator(Component):
         if 'msg' in kwargs:
             self.logger.info('Message is: %s', kwargs['msg'])
 
-        if state == 'stopping':
+        # The results of failed runs are uploaded as well
+        if state in ['stopping', 'error']:
             self.upload_results()
 
         super().change_state(state, **kwargs)
@@ -92,8 +223,9 @@ class Simulator(Component):
     # Actions
     def start(self, message):
         self.started = time.time()
-        self.simuuid = uuid.uuid4()
 
+        # Model, results and parameters are kept from previous runs
+        # if they are not provided again
         if 'parameters' in message.payload:
             self.params = message.payload['parameters']
 
@@ -103,74 +235,124 @@ class Simulator(Component):
         if 'results' in message.payload:
             self.results = message.payload['results']
 
-        self.workdir = '/var/villas/controller/simulators/' + \
-            str(self.uuid) + '/simulation/' + str(self.simuuid)
+        # Clients may choose the UUID of the run to track its status
+        try:
+            simuuid = str(uuid.UUID(message.payload['simuuid']))
+        except KeyError:
+            simuuid = str(uuid.uuid4())
+        except (TypeError, ValueError):
+            raise SimulationException(self, 'Invalid simulation UUID')
+
+        run = Run(simuuid, self.workdirs.path(simuuid), self.params,
+                  self.model, self.results)
 
-        self.logdir = self.workdir + '/Logs/'
-        self.logger.info('Target working directory: %s' % self.workdir)
+        self.logger.info('Target working directory: %s' % run.workdir)
 
+        # The working directory is passed to the child processes.
+        # We do not change the working directory of the whole process
         try:
-            os.makedirs(self.logdir)
-            os.chdir(self.logdir)
+            os.makedirs(run.logdir)
         except Exception as e:
-            raise SimulationException(self, 'Failed to create and change to '
-                                            'working directory: %s ( %s )' %
-                                            (self.logdir, e))
-
-    def _upload(self, filename):
-        url = self.results['url']
-        with open(filename, 'rb') as f:
-            r = requests.put(url, body=f)
-            r.raise_for_status()
-
-            self.logger.info(f'Uploaded file {filename} to {url}')
-
-    def _download(self, url):
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xml') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-
-                return f.name
-
-    def _zip_files(self, folder):
-        pass
-
-    def _unzip_files(self, filename):
-        if filename is not None:
-            if zipfile.is_zipfile(filename):
-                with zipfile.ZipFile(filename, 'r') as zip_ref:
-                    zipdir = tempfile.mkdtemp()
-                    zip_ref.extractall(zipdir)
-                    return zipdir
-            else:
-                return filename
+            raise SimulationException(self, 'Failed to create working '
+                                            'directory: %s ( %s )' %
+                                            (run.logdir, e))
+
+        self.run = run
+        self.simuuid = run.simuuid
+        self.workdir = run.workdir
+        self.logdir = run.logdir
 
-    def upload_results(self):
+        return run
+
+    def _download(self, url, digest=None, pin=False):
         try:
-            filename = self.workdir + '/results.zip'
-            with zipfile.ZipFile(filename, 'w') as results_zip:
-                for sub in os.scandir(self.logdir):
-                    results_zip.write(sub)
+            return self.model_cache.fetch(url, digest, pin)
+        except (requests.RequestException, OSError, ValueError) as e:
+            raise SimulationException(self, 'Failed to download model',
+                                      url=url, error=str(e))
 
-                results_zip.close()
+    def upload_results(self, run=None):
+        if run is None:
+            run = self.run
 
-        except Exception as e:
-            self.logger.error('Zip failed: %s', e)
+        if run is None or run.finished:
+            return
 
-        if 'url' in self.results:
-            self._upload(filename)
-        else:
+        run.finished = True
+
+        # The simulation does not read its model anymore
+        self.release_model(run)
+
+        results = run.results
+        if not results or 'url' not in results:
             self.logger.info('No URL provided for result upload. '
                              'Skipping upload.')
+            self.workdirs.release(run.simuuid)
+            return
+
+        # Already compressed outputs can be stored with level 0
+        level = results.get('compression_level',
+                            self.results_compression_level)
+
+        job = UploadJob(results['url'], run.logdir, level,
+                        self.results_compression_workers,
+                        self.results_upload_timeout)
+
+        self.uploads[run.simuuid] = job
+
+        # The working directory may be removed after a successful upload
+        job.callbacks.append(lambda job: self.on_upload_done(run, job))
+
+        # Only keep the most recent finished uploads for the status
+        finished = [k for k, j in self.uploads.items() if j.done.is_set()]
+        for key in finished[:max(0, len(self.uploads) - self.max_uploads)]:
+            del self.uploads[key]
+
+        # Results are uploaded in the background by the uploader of the
+        # mixin so that the simulator can already accept the next run
+        if self.mixin is not None and self.mixin.uploader is not None:
+            self.mixin.uploader.submit(job)
+        else:
+            try:
+                job.upload()
+            except (requests.RequestException, OSError) as e:
+                job.state = 'failed'
+                job.error = str(e)
+                self.logger.error('Upload failed: %s', e)
+            finally:
+                job.finish()
+
+    def on_upload_done(self, run, job):
+        # Results which could not be uploaded are only kept until
+        # the retention policy removes them
+        if job.state != 'done':
+            self.logger.warning('Results of run %s were not uploaded',
+                                run.simuuid)
+
+        self.workdirs.release(run.simuuid)
+
+    def release_model(self, run):
+        """ Release the cached model pinned by download_model(). """
+        if self.pinned_runs.pop(run.simuuid, None) is None:
+            return
+
+        self.model_cache.release(run.model_digest)
+        run.model_digest = None
+
+    def download_model(self, run=None):
+        model = run.model if run is not None else self.model
 
-    def download_model(self):
-        if self.model:
-            if 'url' in self.model:
-                filename = self._download(self.model['url'])
+        if model:
+            if 'url' in model:
+                # The cache extracts ZIP archives and returns the tree.
+                # It is pinned so that it is not evicted during the run
+                path = self._download(model['url'], model.get('sha256'),
+                                      pin=run is not None)
+                if run is not None:
+                    run.model_digest = ModelCache.digest(path)
+                    self.pinned_runs[run.simuuid] = run
 
-                return self._unzip_files(filename)
+                return path
             else:
                 self.logger.info('No URL provided for model download. '
                                  'Skipping download.')
@@ -1,9 +1,11 @@
-import dpsim
 import time
 import socket
 import os
 
 from villas.controller.components.simulator import Simulator
+from villas.controller.components.simulators.dpsim_runner import DPsimRunner
+from villas.controller.exceptions import SimulationException
+from villas.controller.remote import RemoteError, RemoteProcess
 
 
 class DPsimSimulator(Simulator):
@@ -12,10 +14,21 @@ class DPsimSimulator(Simulator):
         args['type'] = 'dpsim'
 
         self.started = time.time()
-        self.sim = None
+        self.runner = None
 
         super().__init__(**args)
 
+        self.cim_cache_size = args.get('cim_cache_size', 1 << 30)
+
+        # Models are parsed for this domain and system frequency
+        self.frequency = args.get('frequency', 50)
+        self.domain = args.get('domain', 'SP')
+        self.runner_status = {}
+
+        # Optionally, simulations are executed by a dedicated worker
+        # process. A crash of DPsim then leaves the controller intact
+        self.worker_process = args.get('worker_process', False)
+
     @property
     def headers(self):
         headers = super().headers
@@ -36,36 +49,92 @@ class DPsimSimulator(Simulator):
 
         return state
 
-    def load_cim(self, fp):
-        if fp is not None:
-            self.sim = dpsim.load_cim(fp.name)
-            self.logger.info(self.sim)
-            os.unlink(fp.name)
+    @property
+    def compact_status(self):
+        status = super().compact_status
+
+        # The status of the runner is updated by each start. We do not
+        # want to wait for a busy worker process here
+        status.update(self.runner_status)
+
+        if isinstance(self.runner, RemoteProcess):
+            status['worker'] = {
+                'pid': self.runner.pid,
+                'alive': self.runner.alive
+            }
+
+        return status
+
+    def get_runner(self):
+        if self.runner is None:
+            if self.worker_process:
+                self.runner = RemoteProcess(DPsimRunner,
+                                            self.cim_cache_size, True,
+                                            self.frequency, self.domain,
+                                            name=f'villas-dpsim-{self.uuid}',
+                                            reaper=self.reaper,
+                                            on_exit=self.on_worker_exit)
+            else:
+                self.runner = DPsimRunner(self.cim_cache_size, False,
+                                          self.frequency, self.domain)
+
+        return self.runner
+
+    def call(self, method, *args):
+        """ Call a method of the runner. """
+        try:
+            return getattr(self.get_runner(), method)(*args)
+        except RemoteError as e:
+            # Keep the semantics of the native module
+            if e.type == 'SystemError':
+                raise SystemError(e.msg)
+
+            raise SimulationException(self, 'DPsim worker failed',
+                                      error=str(e))
+        except ValueError as e:
+            raise SimulationException(self, str(e))
+
+    def on_worker_exit(self, code):
+        # Called by the reaper thread. The next start spawns a new worker
+        self.runner = None
+        self.runner_status = {}
+
+        self.logger.error('DPsim worker process exited with code %s', code)
+
+        if self._state not in ['shutdown', 'gone']:
+            self.change_state('error', msg='DPsim worker process exited',
+                              code=code)
+
+    def on_shutdown(self):
+        if isinstance(self.runner, RemoteProcess):
+            self.runner.stop()
+            self.runner = None
+
+        super().on_shutdown()
 
     def start(self, message):
-        fp = self.download_model(message)
-        if fp:
-            self.load_cim(fp)
+        run = super().start(message)
 
-        if self.change_state('starting'):
-            self.logger.info('Starting simulation...')
+        path = self.download_model(run)
+        if path is not None:
+            self.logger.info(self.call('load', path))
 
-            self.logger.info(self.sim)
-            if self.sim.start() is None:
-                self.change_state('running')
-            else:
-                self.change_state('error')
-                self.logger.warn('Attempt to start simulator failed.'
-                                 'State is %s', self._state)
+        self.runner_status = self.call('status')
+
+        self.logger.info('Starting simulation...')
+
+        if self.call('start', run.params or {}, run.logdir) is None:
+            self.change_state('running')
         else:
-            self.logger.warn('Attempted to start non-stopped simulator.'
+            self.change_state('error')
+            self.logger.warn('Attempt to start simulator failed.'
                              'State is %s', self._state)
 
     def stop(self, message):
         if self._state == 'running':
             self.logger.info('Stopping simulation...')
 
-            if self.sim and self.sim.stop() is None:
+            if self.call('stop') is None:
                 self.change_state('stopped')
                 self.logger.warn('State changed to ' + self._state)
             else:
@@ -83,7 +152,7 @@ class DPsimSimulator(Simulator):
             self._state = 'pausing'
 
             try:
-                if self.sim and self.sim.pause() is None:
+                if self.call('pause') is None:
                     self.change_state('paused')
                     self.logger.warn('State changed to ' + self._state)
                 else:
@@ -106,7 +175,7 @@ class DPsimSimulator(Simulator):
             self._state = 'resuming'
 
             try:
-                if self.sim and self.sim.start() is None:
+                if self.call('resume') is None:
                     self.change_state('running')
                     self.logger.warn('State changed to %s', self._state)
                 else:
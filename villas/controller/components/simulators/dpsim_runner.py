@@ -0,0 +1,190 @@
+import os
+import threading
+
+import dpsimpy
+
+from villas.controller.model_cache import ModelCache
+from villas.controller.parse_cache import ParseCache
+
+
+class DPsimRunner:
+    """ Loads and executes the simulations of a DPsim simulator.
+
+    The runner is either used directly by the controller or hosted by
+    a dedicated worker process. In the latter case, the worker changes
+    into the log directory of each run so that the outputs of DPsim
+    are part of the results.
+
+    The CIM topology of a model is parsed once for the domain and
+    frequency of the runner. Each run simulates it with a new
+    dpsimpy.Simulation, which is stepped by a thread of the runner so
+    that runs can be paused, resumed and stopped.
+    """
+
+    # Parameters of a run and the setters of dpsimpy.Simulation
+    PARAMETERS = {
+        'time_step': 'set_time_step',
+        'final_time': 'set_final_time',
+        'solver': 'set_solver'
+    }
+
+    DEFAULTS = {
+        'time_step': 1e-3,
+        'final_time': 1.0
+    }
+
+    def __init__(self, cim_cache_size=1 << 30, chdir=False, frequency=50,
+                 domain='SP'):
+        self.chdir = chdir
+        self.frequency = frequency
+        self.domain = getattr(dpsimpy.Domain, domain)
+
+        self.name = None
+        self.system = None
+        self.sim = None
+
+        self.thread = None
+        self.time = 0
+        self.error = None
+        self.stopped = threading.Event()
+        self.resumed = threading.Event()
+
+        # Parsed CIM topologies are reused by runs with an unchanged model
+        self.cim_cache = ParseCache(cim_cache_size)
+
+    @staticmethod
+    def cim_files(path):
+        """ Return the CIM files of a model file or extracted archive. """
+        if not os.path.isdir(path):
+            return [path]
+
+        files = []
+        for root, _, fns in os.walk(path):
+            files += [os.path.join(root, fn) for fn in fns
+                      if fn.lower().endswith('.xml')]
+
+        return sorted(files)
+
+    def load(self, path):
+        """ Load the model at path.
+
+        Models are cached by the digest of their content. The parsed
+        topology is therefore shared by all runs with the same model.
+        """
+        files = self.cim_files(path)
+        if not files:
+            raise ValueError('Model contains no CIM files')
+
+        name = ModelCache.digest(path)
+
+        def parse():
+            phase = dpsimpy.PhaseType.ABC \
+                if self.domain == dpsimpy.Domain.EMT \
+                else dpsimpy.PhaseType.Single
+
+            reader = dpsimpy.CIMReader(name)
+            return reader.loadCIM(self.frequency, files, self.domain, phase)
+
+        size = sum(os.path.getsize(f) for f in files)
+
+        self.name = name
+        self.system = self.cim_cache.get(name, parse, size)
+
+        return str(self.system)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def status(self):
+        status = {
+            'cim_cache': self.cim_cache.status
+        }
+
+        if self.sim is not None:
+            status['simulation'] = {
+                'time': self.time,
+                'running': self.running,
+                'paused': self.running and not self.resumed.is_set()
+            }
+
+            if self.error:
+                status['simulation']['error'] = self.error
+
+        return status
+
+    def apply_parameters(self, params):
+        unsupported = sorted(set(params) - set(self.PARAMETERS))
+        if unsupported:
+            raise ValueError('Unsupported parameters: %s'
+                             % ', '.join(unsupported))
+
+        for key, value in {**self.DEFAULTS, **params}.items():
+            if key == 'solver':
+                try:
+                    value = getattr(dpsimpy.Solver, value)
+                except (AttributeError, TypeError):
+                    raise ValueError(f'Unknown solver: {value}')
+
+            getattr(self.sim, self.PARAMETERS[key])(value)
+
+    def start(self, params, logdir=None):
+        if self.system is None:
+            raise ValueError('No model loaded')
+
+        if self.running:
+            raise ValueError('Simulation is already running')
+
+        if self.chdir and logdir is not None:
+            os.chdir(logdir)
+
+        # Parameters of previous runs must not carry over
+        self.sim = dpsimpy.Simulation(self.name)
+        self.sim.set_system(self.system)
+        self.sim.set_domain(self.domain)
+        self.apply_parameters(params)
+
+        final_time = params.get('final_time', self.DEFAULTS['final_time'])
+
+        self.time = 0
+        self.error = None
+        self.stopped.clear()
+        self.resumed.set()
+
+        self.thread = threading.Thread(target=self.run,
+                                       args=(self.sim, final_time),
+                                       name='villas-dpsim', daemon=True)
+        self.thread.start()
+
+    def run(self, sim, final_time):
+        try:
+            sim.start()
+
+            while self.time < final_time and not self.stopped.is_set():
+                self.resumed.wait()
+                if self.stopped.is_set():
+                    break
+
+                self.time = sim.next()
+        except Exception as e:
+            self.error = str(e)
+
+    def stop(self):
+        if not self.running:
+            return False
+
+        self.stopped.set()
+        self.resumed.set()
+        self.thread.join()
+
+    def pause(self):
+        if not self.running:
+            return False
+
+        self.resumed.clear()
+
+    def resume(self):
+        if not self.running:
+            return False
+
+        self.resumed.set()
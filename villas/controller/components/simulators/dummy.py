@@ -1,3 +1,5 @@
+import os
+import tempfile
 import threading
 
 from villas.controller.components.simulator import Simulator
@@ -6,20 +8,56 @@ from villas.controller.components.simulator import Simulator
 class DummySimulator(Simulator):
 
     def __init__(self, **args):
+        # Dummy runs have no outputs worth keeping
+        args.setdefault('workdir_root',
+                        os.path.join(tempfile.gettempdir(), 'villas',
+                                     'controller', 'simulators'))
+
         super().__init__(**args)
 
         self.timer = None
+        self.finish_timer = None
+
+        # Delay of the simulated state transitions
+        self.transition_delay = args.get('transition_delay', 1.0)
 
     def __del__(self):
         if self.timer:
             self.timer.cancel()
 
-    def _schedule_state_transition(self, state, time=1.0):
+        if self.finish_timer:
+            self.finish_timer.cancel()
+
+    def _schedule_state_transition(self, state, time=None):
+        if time is None:
+            time = self.transition_delay
+
         self.timer = threading.Timer(time, self.change_state, args=[state])
         self.timer.start()
 
+    def _running(self, run):
+        self.change_state('running')
+
+        # Optionally, the run finishes by itself after the
+        # duration given in its parameters
+        duration = (run.params or {}).get('duration')
+        if duration is not None:
+            self.finish_timer = threading.Timer(duration, self._finish,
+                                                args=[run])
+            self.finish_timer.start()
+
+    def _finish(self, run):
+        # The simulator might already execute another run
+        if self.run is run and self._state == 'running':
+            self.change_state('stopping')
+            self.change_state('idle')
+
     def start(self, message):
-        self._schedule_state_transition('running')
+        run = super().start(message)
+
+        self.timer = threading.Timer(self.transition_delay, self._running,
+                                     args=[run])
+        self.timer.start()
 
     def stop(self, message):
         self._schedule_state_transition('idle')
@@ -1,5 +1,6 @@
 import os
-import sys
+import json
+import functools
 import threading
 import re
 import psutil
@@ -8,152 +9,250 @@ import signal
 
 from villas.controller.exceptions import SimulationException
 from villas.controller.components.simulator import Simulator
+from villas.controller.logstream import LogStream
+from villas.controller.realtime import RealtimeOptions
+from villas.controller.telemetry import ProcessTelemetry
 
 
-class GenericSimulator(Simulator):
+class Slot:
+    """ A slot executes one run of a GenericSimulator at a time. """
 
-    def __init__(self, **args):
-        super().__init__(**args)
+    def __init__(self, simulator, index):
+        self.simulator = simulator
+        self.index = index
+        self.logger = simulator.logger
 
+        self.run = None
         self.child = None
+        self.logstream = None
+        self.telemetry = None
+        self.sampler = None
+        self.summary = None
         self.return_code = None
         self.timer = None
-        self.thread = None
 
-    def __del__(self):
-        if self.timer:
-            self.timer.cancel()
+        self.state = 'idle'
+        self.fields = {}
 
-        if self.thread:
-            self
+    @property
+    def busy(self):
+        return self.state not in ['idle', 'error']
 
     @property
-    def state(self):
-        state = super().state
+    def status(self):
+        return {
+            'state': self.state,
+            'simuuid': self.run.simuuid if self.run else None,
+            'return_code': self.return_code,
+            'telemetry': self.summary or (self.telemetry.last
+                                          if self.telemetry else None),
+            **self.fields
+        }
+
+    def change_state(self, state, **kwargs):
+        self.state = state
+        self.fields = kwargs
+
+        self.simulator.on_slot_state(self, state, **kwargs)
+
+    def check_state(self, state, run):
+        # The slot might already execute the next run
+        if self.run is run and self.state != state:
+            self.change_state('error',
+                              msg=f'Failed to transition to state "{state}"!')
 
-        state['return_code'] = self.return_code
+    def check_state_deferred(self, state, timeout=5):
+        self.timer = self.simulator.reaper.call_later(
+            timeout, self.check_state, state, self.run)
 
-        return state
+    def start(self, run, path):
+        self.run = run
+        self.return_code = None
 
-    def start(self, message):
-        super().start(message)
-        self.logger.info('Working directory: %s', os.getcwd())
-        path = self.download_model()
+        params = run.params
+        args = {}
+        argv0 = params['executable']
+        argv = [argv0]
+
+        if 'argv' in params:
+            # Substitute the path location into the command if necessary
+            if path is not None:
+                argv += [str(x).replace('%PATH%', path) for
+                         x in params['argv']]
+            else:
+                argv += [str(x) for x in params['argv']]
+
+        properties = self.simulator.properties
+
+        if 'shell' in params:
+            if ('shell' not in properties or
+                    not properties['shell']):
+                raise SimulationException(self.simulator,
+                                          'Shell execution '
+                                          'is not allowed!')
+            args['shell'] = params['shell']
+
+        # Each run is executed in its own working directory
+        args['cwd'] = params.get('working_directory', run.logdir)
+
+        if 'environment' in params:
+            args['env'] = params['environment']
+
+        valid = False
+        if 'whitelist' in properties:
+            for regex in properties['whitelist']:
+                self.logger.info('Checking for match: %s', regex)
+                if re.match(regex, argv0) is not None:
+                    valid = True
+                    break
+
+        if not valid:
+            raise SimulationException(self.simulator,
+                                      'Executable is not whitelisted'
+                                      ' for this simulator',
+                                      executable=argv0)
+
+        # Options which the host can not grant are rejected
+        # before the child is started
+        try:
+            realtime = self.simulator.realtime.override(params)
+            realtime.check()
+        except ValueError as e:
+            raise SimulationException(self.simulator,
+                                      'Invalid real-time options: '
+                                      + str(e))
+
+        if realtime:
+            if args.pop('shell', False):
+                argv = ['/bin/sh', '-c'] + argv
+
+            if realtime.mlock:
+                argv = self.simulator.mlock_wrapper + argv
+
+            argv = realtime.wrap(argv)
 
-        # Start an external command
-        if self.child is not None:
-            raise SimulationException(self, 'Child process is already running')
+            self.logger.info('Real-time options: %s', realtime.as_dict())
+
+        self.logger.info('Execute in slot %d: %s', self.index, argv)
+
+        # The output of the child is teed into the log directory
+        # and published in batches while the child is running
+        logfile = params.get('stdout_logfile', 'stdout.log')
+        rfd, wfd = os.pipe()
+        tee = None
 
         try:
-            params = message.payload['parameters']
+            tee = open(os.path.join(run.logdir, logfile), 'wb')
 
-            self.thread = threading.Thread(target=GenericSimulator.run,
-                                           args=(self, params, path))
-            self.thread.start()
-        except Exception as e:
-            raise SimulationException(self,
+            self.child = subprocess.Popen(argv, **args,
+                                          stdout=wfd,
+                                          stderr=subprocess.STDOUT)
+        except OSError as e:
+            os.close(rfd)
+            if tee is not None:
+                tee.close()
+
+            raise SimulationException(self.simulator,
                                       msg='Failed to start child process: '
-                                      + e)
+                                      + str(e))
+        finally:
+            os.close(wfd)
 
-    def check_state(self, state):
-        if self._state != state:
-            self.change_state('error',
-                              msg=f'Failed to transition to state "{state}"!')
+        self.logstream = LogStream(rfd, self.simulator.reaper,
+                                   functools.partial(self.publish_log, run),
+                                   tee=tee, **self.simulator.log_options)
 
-    def check_state_deferred(self, state, timeout=5):
-        self.timer = threading.Timer(timeout, self.check_state, args=[state])
-        self.timer.start()
+        self.telemetry = ProcessTelemetry(self.child.pid)
+        self.summary = None
+        self.sample(self.telemetry)
 
-    def run(self, params, path):
-        try:
-            args = {}
-            argv0 = params['executable']
-            argv = [argv0]
-
-            if 'argv' in params:
-                # Substitute the path location into the command if necessary
-                if path is not None:
-                    argv += [str(x).replace('%PATH%', path) for
-                             x in params['argv']]
-                else:
-                    argv += [str(x) for x in params['argv']]
-
-            if 'shell' in params:
-                if ('shell' not in self.properties or
-                        not self.properties['shell']):
-                    raise SimulationException(self, 'Shell execution '
-                                              'is not allowed!')
-                args['shell'] = params['shell']
-
-            if 'working_directory' in params:
-                args['cwd'] = params['working_directory']
-
-            if 'environment' in params:
-                args['env'] = params['shell']
-
-            valid = False
-            if 'whitelist' in self.properties:
-                for regex in self.properties['whitelist']:
-                    self.logger.info('Checking for match: %s', regex)
-                    if re.match(regex, argv0) is not None:
-                        valid = True
-                        break
-
-            if not valid:
-                raise SimulationException(self, 'Executable is not whitelisted'
-                                          ' for this simulator',
-                                          executable=argv0)
-
-            self.logger.info('Execute: %s', argv)
-            logfile = None
-            if 'stdout_logfile' in params:
-                logfile = open(self.params['stdout_logfile'], 'w')
-                self.child = subprocess.Popen(argv, **args,
-                                              stdout=logfile,
-                                              stderr=subprocess.STDOUT)
-            else:
-                self.child = subprocess.Popen(argv, **args,
-                                              stdout=sys.stdout,
-                                              stderr=subprocess.STDOUT)
+        self.change_state('running')
+
+        # The exit of the child is handled by the reaper of the simulator
+        self.simulator.reaper.watch(self.child, self.on_exit)
 
-            self.change_state('running')
+    def sample(self, telemetry):
+        # The slot might already execute the next run
+        if telemetry is not self.telemetry or self.child is None:
+            return
+
+        telemetry.sample()
+
+        interval = self.simulator.telemetry_interval
+        if interval:
+            self.sampler = self.simulator.reaper.call_later(
+                interval, self.sample, telemetry)
+
+    def write_summary(self, child):
+        if self.sampler is not None:
+            self.sampler.cancel()
+            self.sampler = None
+
+        self.summary = self.telemetry.summary(getattr(child, 'rusage', None))
+
+        # The summary is included in the uploaded results
+        try:
+            with open(os.path.join(self.run.logdir, 'telemetry.json'),
+                      'w') as f:
+                json.dump(self.summary, f, indent=2)
+        except OSError as e:
+            self.logger.warning('Failed to write telemetry summary: %s', e)
+
+    def publish_log(self, run, batch):
+        self.simulator.publish_log({
+            **batch,
+            'simuuid': run.simuuid,
+            'slot': self.index
+        })
+
+    def on_exit(self, child):
+        # Read the remaining output before the results are uploaded
+        if self.logstream is not None:
+            self.logstream.drain()
+
+        self.write_summary(child)
+
+        # The slot may be reused as soon as it reaches a final state
+        returncode = child.returncode
+        self.child = None
 
-            self.child.wait()
-            if logfile is not None:
-                logfile.close()
-            if self.child.returncode == 0:
+        try:
+            if returncode == 0:
                 self.logger.info('Child process has finished.')
                 self.change_state('stopping')
                 self.change_state('idle')
-            elif self.child.returncode > 0:
-                self.return_code = self.child.returncode
-                raise SimulationException(self, 'Child process exited',
+            elif returncode > 0:
+                self.return_code = returncode
+                raise SimulationException(self.simulator,
+                                          'Child process exited',
                                           code=self.return_code)
-            elif self.child.returncode == -signal.SIGTERM:
+            elif returncode == -signal.SIGTERM:
                 self.logger.info('Child process was terminated successfully')
+                self.change_state('stopping')
                 self.change_state('idle')
-            elif (self.child.returncode == -signal.SIGKILL and
-                  self._state == 'resetting'):
+            elif (returncode == -signal.SIGKILL and
+                  self.state == 'resetting'):
                 self.logger.info('Child process was resetted successfully')
                 self.change_state('idle')
             else:
-                sig = signal.Signals(-self.child.returncode)
-                raise SimulationException(self, 'Child process caught signal',
-                                          signal=-self.child.returncode,
+                sig = signal.Signals(-returncode)
+                raise SimulationException(self.simulator,
+                                          'Child process caught signal',
+                                          signal=-returncode,
                                           signal_name=sig.name)
 
-        # GenericSimulator.run() is executed in a separate thread.
+        # Slot.on_exit() is called by the reaper thread.
         # We therefore want to catch exceptions here.
         except SimulationException as se:
             self.change_state('error', msg=se.msg, **se.info)
 
-        self.child = None
-
-    def reset(self, message):
+    def reset(self):
         # Don't send a signal if the child does not exist
         if self.child is None:
             return
 
+        self.change_state('resetting')
+
         # Kill all childs of the simulation process
         parent = psutil.Process(self.child.pid)
         children = parent.children(recursive=True)
@@ -167,19 +266,13 @@ class GenericSimulator(Simulator):
         # This is a hard reset!
         self.child.send_signal(signal.SIGKILL)
 
-        # Final transition to idle state occurs in run thread
+        # Final transition to idle state occurs in on_exit()
         # If this transition does not occur within 5 seconds,
         # we will transition into the error state
         self.check_state_deferred('idle', 5)
 
-    def stop(self, message):
-        send_cont = False
-
-        if self.child is None:
-            raise SimulationException(self, 'No child process is running')
-
-        if self._state == 'paused':
-            send_cont = True
+    def stop(self):
+        send_cont = self.state == 'paused'
 
         # Stop the external command (SIGTERM)
         self.child.terminate()
@@ -190,27 +283,207 @@ class GenericSimulator(Simulator):
         if send_cont:
             self.child.send_signal(signal.SIGCONT)
 
-        # Final transition to idle state occurs in run thread
+        # Final transition to idle state occurs in on_exit()
         # If this transition does not occur within 5 seconds,
         # we will transition into the error state
-        self.check_state_deferred('stopped', 5)
+        self.check_state_deferred('idle', 5)
 
-    def pause(self, message):
+    def pause(self):
         # Suspend command
-        if self.child is None:
-            raise SimulationException(self, 'No child process is running')
-
         self.child.send_signal(signal.SIGTSTP)
 
         self.change_state('paused')
         self.logger.info('Child process has been paused')
 
-    def resume(self, message):
+    def resume(self):
         # Let process run
-        if self.child is None:
-            raise SimulationException(self, 'No child process is running')
-
         self.child.send_signal(signal.SIGCONT)
 
         self.change_state('running')
         self.logger.info('Child process has resumed')
+
+
+class GenericSimulator(Simulator):
+
+    def __init__(self, **args):
+        super().__init__(**args)
+
+        # Batching and rate limiting of the published output
+        self.log_options = {
+            'batch_size': args.get('log_batch_size', 16 << 10),
+            'interval': args.get('log_flush_interval', 0.5),
+            'rate': args.get('log_rate', 64 << 10),
+            'buffer_size': args.get('log_buffer_size', 256 << 10)
+        }
+
+        # Resource usage of the children is sampled periodically
+        self.telemetry_interval = args.get('telemetry_interval', 2)
+
+        # CPU affinity, scheduling and memory locking of the children
+        self.realtime = RealtimeOptions.from_dict(args)
+
+        # Memory locks are not inherited by execve(). The children
+        # lock their memory themselves or are started by this wrapper
+        self.mlock_wrapper = list(args.get('mlock_wrapper', []))
+        if self.realtime.mlock and not self.mlock_wrapper:
+            self.logger.warning('Without an mlock_wrapper, mlock only lifts '
+                                'RLIMIT_MEMLOCK. The children must call '
+                                'mlockall() themselves')
+
+        # Each slot executes one run at a time
+        self.slots = [Slot(self, i) for i in range(args.get('slots', 1))]
+        self.slots_lock = threading.RLock()
+
+    def __del__(self):
+        for slot in self.slots:
+            if slot.timer:
+                slot.timer.cancel()
+
+    @property
+    def state(self):
+        state = super().state
+
+        state['return_code'] = self.slots[0].return_code
+
+        return state
+
+    @property
+    def compact_status(self):
+        status = super().compact_status
+
+        # Allows schedulers to pack runs onto simulators with free slots
+        slots = [slot.status for slot in self.slots]
+        status['slots'] = {
+            'total': len(slots),
+            'busy': sum(s['state'] not in ['idle', 'error'] for s in slots),
+            'runs': slots
+        }
+
+        return status
+
+    @property
+    def active_runs(self):
+        return {slot.run.simuuid for slot in self.slots
+                if slot.busy and slot.run}
+
+    def on_slot_state(self, slot, state, **kwargs):
+        # With a single slot, the simulator has the state of the slot
+        if len(self.slots) == 1:
+            self.change_state(state, **kwargs)
+            return
+
+        if state in ['stopping', 'error']:
+            self.upload_results(slot.run)
+
+        self.update_state()
+
+    def update_state(self):
+        # With several slots, the simulator is running
+        # as long as any slot is busy
+        with self.slots_lock:
+            busy = any(s.busy for s in self.slots)
+            new_state = 'running' if busy else 'idle'
+
+            if new_state != self._state:
+                self.change_state(new_state, force=True)
+            else:
+                self.publish_status(full=False)
+
+    def run_action(self, action, message):
+        # With several slots, actions only change the state of slots
+        if len(self.slots) == 1 or \
+           action not in ['start', 'stop', 'pause', 'resume', 'reset']:
+            return super().run_action(action, message)
+
+        self.logger.info('Received action: %s', action)
+
+        try:
+            getattr(self, action)(message)
+        except SimulationException as se:
+            self.logger.error('Action %s failed: %s', action, se.msg)
+
+            self._status_fields = {'msg': se.msg, **se.info}
+            self.publish_status(full=False)
+        finally:
+            message.ack()
+
+    def select_slots(self, message):
+        """ Return the busy slots which are addressed by a message.
+
+        A message can address a single run by its 'simuuid' or a slot by
+        its index. Otherwise, all busy slots are addressed.
+        """
+        payload = message.payload
+
+        if 'simuuid' in payload:
+            slots = [s for s in self.slots
+                     if s.run and s.run.simuuid == payload['simuuid']]
+        elif 'slot' in payload:
+            slots = [s for s in self.slots if s.index == payload['slot']]
+        else:
+            slots = self.slots
+
+        slots = [s for s in slots if s.child is not None]
+        if not slots:
+            raise SimulationException(self, 'No child process is running')
+
+        return slots
+
+    def start(self, message):
+        with self.slots_lock:
+            free = [s for s in self.slots if not s.busy]
+            if not free:
+                raise SimulationException(self, 'No free slot',
+                                          slots=len(self.slots))
+
+            slot = free[0]
+            slot.state = 'starting'
+
+        if len(self.slots) > 1:
+            self.update_state()
+
+        run = None
+        try:
+            run = super().start(message)
+            path = self.download_model(run)
+
+            if run.params is None:
+                raise SimulationException(self, 'Missing parameters')
+
+            slot.start(run, path)
+        except Exception as e:
+            if run is None:
+                slot.state = 'idle'
+
+                if len(self.slots) > 1:
+                    self.update_state()
+
+                raise
+
+            self.release_model(run)
+
+            # The failed run is reported by its slot so that clients
+            # can tell it from a finished one
+            slot.run = run
+            slot.change_state('error', msg=e.msg
+                              if isinstance(e, SimulationException)
+                              else str(e))
+
+            raise
+
+    def reset(self, message):
+        # Don't send a signal if no child exists
+        for slot in self.slots:
+            slot.reset()
+
+    def stop(self, message):
+        for slot in self.select_slots(message):
+            slot.stop()
+
+    def pause(self, message):
+        for slot in self.select_slots(message):
+            slot.pause()
+
+    def resume(self, message):
+        for slot in self.select_slots(message):
+            slot.resume()
@@ -1,11 +1,12 @@
 import json
 import signal
 from copy import deepcopy
-import collections
+import collections.abc
 
 import kubernetes as k8s
 
 from villas.controller.components.simulator import Simulator
+from villas.controller.exceptions import SimulationException
 
 
 def merge(dict1, dict2):
@@ -14,10 +15,10 @@ def merge(dict1, dict2):
     result = deepcopy(dict1)
 
     for key, value in dict2.items():
-        if isinstance(value, collections.Mapping):
+        if isinstance(value, collections.abc.Mapping):
             result[key] = merge(result.get(key, {}), value)
         elif value is None:
-            del result[key]
+            result.pop(key, None)
         else:
             result[key] = deepcopy(dict2[key])
 
@@ -26,6 +27,10 @@ def merge(dict1, dict2):
 
 class KubernetesJob(Simulator):
 
+    # Pods waiting for these reasons do not start without intervention
+    POD_ERRORS = ['ErrImagePull', 'ImagePullBackOff', 'InvalidImageName',
+                  'CreateContainerConfigError', 'CreateContainerError']
+
     def __init__(self, manager, **args):
         super().__init__(**args)
 
@@ -34,54 +39,94 @@ class KubernetesJob(Simulator):
         # Job template which can be overwritten via start parameter
         self.job = args.get('job')
 
+        # Names of the Job and ConfigMap of the current run
+        self.job_name = None
+        self.config_map_name = None
+
     def __del__(self):
         pass
 
-    def _prepare_job(self, job, parameters):
-        c = k8s.client.CoreV1Api()
+    @property
+    def labels(self):
+        return {
+            'controller': 'villas',
+            'controller-uuid': self.manager.uuid,
+            'uuid': self.uuid
+        }
 
-        cm = self._create_config_map(parameters)
+    @property
+    def compact_status(self):
+        status = super().compact_status
 
-        v = k8s.client.V1Volume(
-            name='parameters',
-            config_map=c.V1ConfigMapVolumeSource(
-                name=cm.metadata.name
-            )
-        )
+        # Answered from the caches of the manager
+        if self.job_name is not None:
+            status['job'] = self.job_status
 
-        vm = k8s.client.V1VolumeMount(
-            name='parameters',
-            mount_path='/config/',
-            read_only=True
-        )
+        return status
+
+    @property
+    def job_status(self):
+        job = self.manager.jobs.get(self.job_name)
+        pods = self.manager.pods.by_index('job-name', self.job_name)
 
-        job.spec.template.spec.volumes.append(v)
+        status = job.status if job is not None else None
 
-        for c in job.spec.template.spec.containers:
-            c.volume_mounts.append(vm)
-            c.env.append(c.V1EnvVar(
-                name='VILLAS_PARAMETERS_FILE',
-                value='/config/parameters.json'
-            ))
+        return {
+            'name': self.job_name,
+            'active': status.active or 0 if status else 0,
+            'succeeded': status.succeeded or 0 if status else 0,
+            'failed': status.failed or 0 if status else 0,
+            'pods': [{
+                'name': pod.metadata.name,
+                'phase': pod.status.phase if pod.status else None
+            } for pod in pods]
+        }
 
-        return merge(job, {
+    def _prepare_job(self, job, config_map):
+        job = merge(job, {
             'metadata': {
                 'name': None,
-                'generateName': job.get('metadata').get('name') + '-',
-                'labels': {
-                    'controller': 'villas',
-                    'controller-uuid': self.manager.uuid,
-                    'uuid': self.uuid
+                'generateName': job['metadata']['name'] + '-',
+                'labels': self.labels
+            },
+            'spec': {
+                'template': {
+                    'metadata': {
+                        'labels': self.labels
+                    }
                 }
             }
         })
 
+        spec = job['spec']['template']['spec']
+
+        spec.setdefault('volumes', []).append({
+            'name': 'parameters',
+            'configMap': {
+                'name': config_map
+            }
+        })
+
+        for c in spec['containers']:
+            c.setdefault('volumeMounts', []).append({
+                'name': 'parameters',
+                'mountPath': '/config/',
+                'readOnly': True
+            })
+            c.setdefault('env', []).append({
+                'name': 'VILLAS_PARAMETERS_FILE',
+                'value': '/config/parameters.json'
+            })
+
+        return job
+
     def _create_config_map(self, parameters):
         c = k8s.client.CoreV1Api()
 
-        self.cm = c.V1ConfigMap(
-            metadata=c.V1ObjectMeta(
-                generate_name='job-parameters-'
+        cm = k8s.client.V1ConfigMap(
+            metadata=k8s.client.V1ObjectMeta(
+                generate_name='job-parameters-',
+                labels=self.labels
             ),
             data={
                 'parameters.json': json.dumps(parameters)
@@ -90,39 +135,185 @@ class KubernetesJob(Simulator):
 
         return c.create_namespaced_config_map(
             namespace=self.manager.namespace,
-            body=self.cm
+            body=cm
         )
 
+    def _delete_config_map(self):
+        name = self.config_map_name
+        if name is None:
+            return
+
+        # The cache may not have seen the ConfigMap yet
+        self.config_map_name = None
+
+        c = k8s.client.CoreV1Api()
+
+        try:
+            c.delete_namespaced_config_map(
+                namespace=self.manager.namespace,
+                name=name)
+        except k8s.client.ApiException as e:
+            if e.status != 404:
+                self.logger.error('Failed to delete ConfigMap %s: %s',
+                                  name, e)
+
+    def _delete_job(self):
+        b = k8s.client.BatchV1Api()
+
+        try:
+            b.delete_namespaced_job(
+                namespace=self.manager.namespace,
+                name=self.job_name,
+                propagation_policy='Background')
+        except k8s.client.ApiException as e:
+            if e.status != 404:
+                raise SimulationException(self, 'Failed to delete job',
+                                          job=self.job_name, error=str(e))
+
+    def _submit(self, func, *args):
+        # State changes are serialized with the actions of the simulator
+        if self.mixin is not None and self.mixin.executor is not None:
+            self.mixin.executor.submit(self.uuid, func, *args)
+        else:
+            func(*args)
+
+    def on_job_change(self, typ, job):
+        self._submit(self._on_job_change, typ, job)
+
+    def on_pod_change(self, typ, pod):
+        self._submit(self._on_pod_change, typ, pod)
+
+    def _on_job_change(self, typ, job):
+        if job.metadata.name != self.job_name:
+            return
+
+        if typ == 'DELETED':
+            self._finish('idle')
+            self._delete_config_map()
+            return
+
+        status = job.status
+        if status is None:
+            return
+
+        conditions = {c.type: c for c in status.conditions or []
+                      if c.status == 'True'}
+
+        if 'Failed' in conditions:
+            cond = conditions['Failed']
+            self._finish('error', msg=cond.message or cond.reason)
+            self._delete_config_map()
+        elif 'Complete' in conditions:
+            self._finish('idle')
+            self._delete_config_map()
+        elif status.active:
+            self._running()
+
+    def _on_pod_change(self, typ, pod):
+        labels = pod.metadata.labels or {}
+        if labels.get('job-name') != self.job_name or typ == 'DELETED':
+            return
+
+        phase = pod.status.phase if pod.status else None
+
+        if phase == 'Running':
+            self._running()
+        elif phase == 'Pending':
+            for cs in pod.status.container_statuses or []:
+                waiting = cs.state.waiting if cs.state else None
+                if waiting is not None and waiting.reason in self.POD_ERRORS:
+                    self._finish('error', msg=waiting.message or
+                                 waiting.reason)
+
+    def _running(self):
+        if self._state in ['starting', 'resuming']:
+            self.change_state('running')
+
+    def _finish(self, state, **kwargs):
+        if self._state in ['idle', 'error']:
+            return
+
+        if state == 'error':
+            self.change_state('error', **kwargs)
+            return
+
+        if self._state in ['starting', 'resuming']:
+            self.change_state('running')
+
+        if self._state in ['running', 'paused']:
+            self.change_state('stopping')
+
+        if self._state in ['stopping', 'resetting']:
+            self.change_state('idle')
+
     def start(self, message):
-        job = message.payload.get('job', {})
+        job = merge(self.job, message.payload.get('job', {}))
         parameters = message.payload.get('parameters', {})
 
-        job = merge(self.job, job)
-        job = self._prepare_job(self.job, parameters)
+        try:
+            cm = self._create_config_map(parameters)
+            self.config_map_name = cm.metadata.name
 
-        b = k8s.client.BatchV1Api()
-        self.job = b.create_namespaced_job(
-            namespace=self.manager.namespace,
-            body=job)
+            job = self._prepare_job(job, self.config_map_name)
+
+            b = k8s.client.BatchV1Api()
+            job = b.create_namespaced_job(
+                namespace=self.manager.namespace,
+                body=job)
+        except k8s.client.ApiException as e:
+            self._delete_config_map()
+            raise SimulationException(self, 'Failed to create job',
+                                      error=str(e))
+
+        self.job_name = job.metadata.name
+
+        # The informers may have seen the Job before we knew its name
+        cached = self.manager.jobs.get(self.job_name)
+        if cached is not None:
+            self._on_job_change('MODIFIED', cached)
+
+        for pod in self.manager.pods.by_index('job-name', self.job_name):
+            self._on_pod_change('MODIFIED', pod)
 
     def stop(self, message):
-        b = k8s.client.BatchV1Api()
-        self.job = b.delete_namespaced_job(
-            namespace=self.manager.namespace,
-            name=self.job.metadata.name)
+        if self.job_name is None:
+            raise SimulationException(self, 'No job to stop')
+
+        # The simulator becomes idle once the Job has been deleted
+        self._delete_job()
+
+    def reset(self, message):
+        if self.job_name is not None and \
+           self.manager.jobs.get(self.job_name) is not None:
+            self._delete_job()
+
+        self.change_state('idle')
+
+        super().reset(message)
 
     def _send_signal(self, sig):
-        c = k8s.client.api.CoreV1Api()
-        resp = k8s.stream.stream(c.connect_get_namespaced_pod_exec,
-                                 self.job.metadata.name, self.namespace,
-                                 command=['kill', f'-{sig}', '1'],
-                                 stderr=False, stdin=False,
-                                 stdout=False, tty=False)
+        c = k8s.client.CoreV1Api()
+
+        pods = self.manager.pods.by_index('job-name', self.job_name)
+        for pod in pods:
+            if pod.status is None or pod.status.phase != 'Running':
+                continue
 
-        self.logger.debug('Send signal %d to container: %s', sig, resp)
+            resp = k8s.stream.stream(c.connect_get_namespaced_pod_exec,
+                                     pod.metadata.name,
+                                     self.manager.namespace,
+                                     command=['kill', f'-{sig}', '1'],
+                                     stderr=False, stdin=False,
+                                     stdout=False, tty=False)
+
+            self.logger.debug('Send signal %d to container: %s', sig, resp)
 
     def pause(self, message):
         self._send_signal(signal.SIGSTOP)
 
+        self.change_state('paused')
+
     def resume(self, message):
         self._send_signal(signal.SIGCONT)
+
+        self.change_state('running')
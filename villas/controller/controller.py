@@ -1,30 +1,77 @@
 import logging
 import socket
+import kombu
 import kombu.mixins
+import kombu.pools
 
+from villas.controller.dispatcher import Dispatcher
+from villas.controller.executor import ActionExecutor
+from villas.controller.realtime import isolate
+from villas.controller.reaper import Reaper
+from villas.controller.scheduler import Scheduler
+from villas.controller.uploader import ResultUploader
+from villas.controller.workdir import WorkdirManager
 from villas.controller.components.managers.generic import GenericManager
 
 LOGGER = logging.getLogger(__name__)
 
 
-class ControllerMixin(kombu.mixins.ConsumerMixin):
+class Controller:
+    """ Common parts of the controller engines. """
 
-    def __init__(self, connection, components):
+    def __init__(self, components, bulk_status=False, bulk_status_interval=2,
+                 action_workers=8, upload_workers=2, workdir_quota=None,
+                 shard=None, manager=None):
         self.components = {c.uuid: c for c in components if c.enabled}
-        self.connection = connection
 
-        manager = self.add_managers()
+        # When running as one of several worker processes, the shard
+        # identifies this worker and allows to place components on others
+        self.shard = shard
+
+        if manager is None:
+            self.manager = self.add_managers()
+        else:
+            # A replica of the generic manager which is hosted by another
+            # worker. It only manages the components of this worker
+            self.manager = manager
+            self.manager.set_mixin(self)
 
         for uuid, comp in self.components.items():
             LOGGER.info('Adding %s', comp)
-            comp.set_manager(manager)
+            comp.set_manager(self.manager)
 
-        # Components are activated by first call to on_iteration()
+        # Components are activated by first call to update_components()
         self.active_components = {}
 
-    def get_consumers(self, Consumer, channel):
-        return map(lambda comp: comp.get_consumer(channel),
-                   self.active_components.values())
+        # Actions are executed by a bounded pool of worker threads
+        self.executor = ActionExecutor(action_workers)
+
+        # Simulation results are uploaded by a separate bounded pool
+        self.uploader = ResultUploader(upload_workers)
+
+        # Optionally, the periodic status of all components is
+        # aggregated into a single message per interval
+        self.bulk_status = bulk_status
+        self.bulk_status_seq = 0
+        self.status_exchange = kombu.Exchange(name='villas.status',
+                                              type='headers',
+                                              durable=True)
+
+        if self.bulk_status:
+            self.scheduler.add('bulk-status', bulk_status_interval,
+                               self.publish_bulk_status)
+
+        # Optionally, the working directories of all simulators
+        # share a global quota
+        self.workdir_quota = workdir_quota
+        if self.workdir_quota is not None:
+            self.scheduler.add('workdirs', 60, self.collect_workdirs)
+
+    def add_consumer(self, comp):
+        raise NotImplementedError()
+
+    def remove_consumer(self, comp):
+        raise NotImplementedError()
 
     def add_managers(self):
         mgrs = [c for c in self.components.values()
@@ -50,42 +97,244 @@ class ControllerMixin(kombu.mixins.ConsumerMixin):
 
         return mgr
 
-    def on_iteration(self):
+    def update_components(self):
+        if self.shard is not None:
+            self.process_inbox()
+
         added = self.components.keys() - self.active_components.keys()
         removed = self.active_components.keys() - self.components.keys()
         if added or removed:
-            LOGGER.info('Components changed. Restarting mixin')
-
-            # We need to re-enter the contextmanager of the mixin
-            # in order to consume messages for the new components
-            self.should_stop = True
+            LOGGER.info('Components changed: %d added, %d removed',
+                        len(added), len(removed))
 
+            # Only the queues of added or removed components are
+            # declared or deleted. All other consumers keep running
             for uuid in added:
                 comp = self.components[uuid]
 
                 LOGGER.info('Adding %s', comp)
                 comp.set_mixin(self)
+                self.add_consumer(comp)
                 comp.on_ready()
 
+            if added:
+                self.isolate_cpus()
+
             for uuid in removed:
                 comp = self.active_components[uuid]
 
                 LOGGER.info('Removing %s', comp)
+                self.remove_consumer(comp)
+
+                # Stops the periodic jobs of the component
+                comp.on_shutdown()
 
             self.active_components = self.components.copy()
 
+            if self.shard is not None:
+                self.shard.update_load(len(self.active_components))
+
+    def process_inbox(self):
+        # Requests from the generic managers of other workers
+        for action, parameters in self.shard.receive():
+            uuid = parameters.get('uuid')
+
+            if action == 'create':
+                self.manager.create_component(parameters)
+            elif action == 'delete' and uuid in self.manager.components:
+                self.manager.delete_component(uuid)
+
+    def isolate_cpus(self):
+        # The threads of the controller are kept off the CPUs
+        # which are reserved for the children of simulators
+        reserved = set()
+        for comp in self.components.values():
+            realtime = getattr(comp, 'realtime', None)
+            if realtime is not None and realtime.cpus:
+                reserved |= realtime.cpus
+
+        if not reserved:
+            return
+
+        allowed = isolate(reserved)
+        if allowed is None:
+            LOGGER.warning('No CPUs left for the controller. '
+                           'Not isolating CPUs %s', sorted(reserved))
+        else:
+            LOGGER.info('Controller uses CPUs %s', sorted(allowed))
+
+    def collect_workdirs(self):
+        managers = [c.workdirs for c in list(self.components.values())
+                    if hasattr(c, 'workdirs')]
+
+        self.executor.submit('workdirs', WorkdirManager.collect_global,
+                             managers, self.workdir_quota)
+
+    @property
+    def bulk_status_frame(self):
+        comps = list(self.active_components.values())
+        static, _ = self.manager.static_status
+
+        return {
+            'bulk': True,
+            'status': static,
+            'components': {
+                comp.uuid: {
+                    'status': comp.compact_status,
+                    'headers': comp.headers
+                } for comp in comps
+            }
+        }
+
+    def publish_bulk_status(self):
+        frame = self.bulk_status_frame
+
+        self.bulk_status_seq += 1
+        frame['seq'] = self.bulk_status_seq
+
+        with self.producers.acquire(block=True) as producer:
+            producer.publish(frame,
+                             headers={
+                                 **self.manager.headers,
+                                 'bulk': True
+                             },
+                             exchange=self.status_exchange,
+                             declare=[self.status_exchange])
+
+
+class ControllerMixin(Controller, kombu.mixins.ConsumerMixin):
+
+    def __init__(self, connection, components, single_queue=False,
+                 bulk_status=False, bulk_status_interval=2,
+                 producer_pool_limit=4, action_workers=8, upload_workers=2,
+                 workdir_quota=None, shard=None, manager=None):
+        self.connection = connection
+
+        # A bounded pool of producers which is shared by all components.
+        # Each producer uses its own connection from the connection pool
+        self.producers = kombu.pools.ProducerPool(
+            connection.Pool(producer_pool_limit),
+            limit=producer_pool_limit)
+
+        # Dict (uuid -> consumer) of consumers for the active components
+        self.consumers = {}
+        self.channel = None
+
+        # Optionally, all components share a single queue and incoming
+        # messages are routed to them by a local index of their headers
+        self.exchange = kombu.Exchange(name='villas',
+                                       type='headers',
+                                       durable=True)
+        self.dispatcher = Dispatcher() if single_queue else None
+        self.queue = None
+
+        # A single scheduler publishes the status of all components
+        self.scheduler = Scheduler()
+
+        # A single thread watches the child processes of all simulators
+        self.reaper = Reaper()
+
+        super().__init__(components,
+                         bulk_status=bulk_status,
+                         bulk_status_interval=bulk_status_interval,
+                         action_workers=action_workers,
+                         upload_workers=upload_workers,
+                         workdir_quota=workdir_quota,
+                         shard=shard,
+                         manager=manager)
+
+    def get_consumers(self, Consumer, channel):
+        # Called by the mixin whenever the connection has been
+        # (re-)established. All consumers are (re-)created on the new channel
+        self.channel = channel
+
+        if self.dispatcher:
+            return [self.get_shared_consumer(Consumer)]
+
+        self.consumers = {uuid: comp.get_consumer(channel)
+                          for uuid, comp in self.active_components.items()}
+
+        return list(self.consumers.values())
+
+    def get_shared_consumer(self, Consumer):
+        self.exchange.declare(channel=self.channel)
+
+        bindings = [self._binding(pair) for pair in self.dispatcher.bindings]
+
+        consumer = Consumer(
+            on_message=self.dispatcher.on_message,
+            queues=kombu.Queue(
+                bindings=bindings,
+                durable=False
+            ),
+            no_ack=True,
+            accept={'application/json'}
+        )
+
+        self.queue = consumer.queues[0]
+
+        return consumer
+
+    def _binding(self, pair):
+        key, value = pair
+
+        arguments = {
+            'x-match': 'any',
+            key: value
+        }
+
+        return kombu.binding(self.exchange,
+                             arguments=arguments,
+                             unbind_arguments=arguments)
+
+    def add_consumer(self, comp):
+        if self.dispatcher:
+            for pair in self.dispatcher.add(comp):
+                self._binding(pair).bind(self.queue)
+
+            return
+
+        consumer = comp.get_consumer(self.channel)
+        consumer.consume()
+
+        self.consumers[comp.uuid] = consumer
+
+    def remove_consumer(self, comp):
+        if self.dispatcher:
+            for pair in self.dispatcher.remove(comp):
+                self._binding(pair).unbind(self.queue)
+
+            return
+
+        consumer = self.consumers.pop(comp.uuid, None)
+        if consumer is None:
+            return
+
+        consumer.cancel()
+
+        for queue in consumer.queues:
+            queue.delete()
+
+    def on_iteration(self):
+        self.update_components()
+
     def run(self):
-        while True:
-            self.should_stop = False
+        LOGGER.info('Starting mixin for %d components',
+                    len(self.components))
 
-            LOGGER.info('Startig mixing for %d components',
-                        len(self.active_components))
+        self.scheduler.start()
 
-            super().run()
+        super().run()
 
     def shutdown(self):
         LOGGER.info('Shutdown controller')
         for u, c in self.components.items():
             c.on_shutdown()
 
+        self.scheduler.stop()
+        self.executor.shutdown(wait=False)
+        self.uploader.shutdown(wait=False)
+        self.reaper.stop()
+        self.producers.force_close_all()
+
         self.connection.drain_events(timeout=3)
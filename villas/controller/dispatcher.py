@@ -0,0 +1,76 @@
+import logging
+
+from collections import defaultdict
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Dispatcher:
+    """ Routes messages received on a single shared queue to components.
+
+    The index maps each (header, value) pair to the UUIDs of the components
+    which carry it. This mirrors the 'x-match: any' bindings which each
+    component would otherwise declare on its own queue.
+    """
+
+    def __init__(self):
+        self.components = {}
+
+        # Dict ((header, value) -> set of UUIDs)
+        self.index = defaultdict(set)
+
+    @staticmethod
+    def _pairs(comp):
+        return {(k, v) for k, v in comp.headers.items() if v is not None}
+
+    @property
+    def bindings(self):
+        return list(self.index.keys())
+
+    def add(self, comp):
+        """ Add a component and return header pairs which need a binding. """
+        self.components[comp.uuid] = comp
+
+        added = []
+        for pair in self._pairs(comp):
+            if pair not in self.index:
+                added.append(pair)
+
+            self.index[pair].add(comp.uuid)
+
+        return added
+
+    def remove(self, comp):
+        """ Remove a component and return header pairs without users. """
+        self.components.pop(comp.uuid, None)
+
+        removed = []
+        for pair in self._pairs(comp):
+            uuids = self.index.get(pair)
+            if uuids is None:
+                continue
+
+            uuids.discard(comp.uuid)
+            if not uuids:
+                del self.index[pair]
+                removed.append(pair)
+
+        return removed
+
+    def lookup(self, headers):
+        uuids = set()
+        for pair in headers.items():
+            try:
+                uuids |= self.index.get(pair, set())
+            except TypeError:  # unhashable header value
+                continue
+
+        return [self.components[uuid] for uuid in uuids]
+
+    def on_message(self, message):
+        comps = self.lookup(message.headers or {})
+        if not comps:
+            LOGGER.debug('No component for message: %s', message.headers)
+
+        for comp in comps:
+            comp.on_message(message)
@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ActionExecutor:
+    """ Executes actions on a bounded pool of worker threads.
+
+    Actions for the same key (component UUID) are executed one after
+    another in the order of their arrival. Actions for different keys
+    run in parallel.
+    """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.pool = ThreadPoolExecutor(max_workers,
+                                       thread_name_prefix='villas-action')
+
+        # Dict (key -> deque of pending actions)
+        # A key is present as long as one of its actions is pending or busy
+        self.queues = {}
+        self.lock = threading.Lock()
+
+        self.busy = 0
+        self.wait_avg = 0.0
+        self.wait_max = 0.0
+
+    def submit(self, key, func, *args):
+        action = time.monotonic(), func, args
+
+        with self.lock:
+            queue = self.queues.get(key)
+            if queue is not None:
+                queue.append(action)
+                return
+
+            self.queues[key] = deque([action])
+
+        self.pool.submit(self._run, key)
+
+    def depth(self, key):
+        with self.lock:
+            queue = self.queues.get(key)
+
+            return len(queue) if queue else 0
+
+    @property
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': self.max_workers,
+                'busy': self.busy,
+                'queued': sum(len(q) for q in self.queues.values()),
+                'wait_avg': self.wait_avg,
+                'wait_max': self.wait_max
+            }
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
+
+    def _run(self, key):
+        with self.lock:
+            queued, func, args = self.queues[key].popleft()
+
+            wait = time.monotonic() - queued
+
+            self.busy += 1
+            self.wait_avg = 0.9 * self.wait_avg + 0.1 * wait
+            self.wait_max = max(self.wait_max, wait)
+
+        try:
+            func(*args)
+        except Exception:
+            LOGGER.exception('Action failed')
+
+        with self.lock:
+            self.busy -= 1
+
+            if not self.queues[key]:
+                del self.queues[key]
+                return
+
+        # Resubmit in order to give other keys a chance to run
+        self.pool.submit(self._run, key)
@@ -0,0 +1,194 @@
+import logging
+import threading
+
+import kubernetes as k8s
+import urllib3
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Informer:
+    """ A local cache of Kubernetes objects which is kept up to date by
+    a single list and a subsequent watch.
+
+    The watch resumes from the last seen resourceVersion whenever it
+    times out or the connection is lost. Only if the API server has
+    expired this version, the objects are listed again.
+
+    Objects are stored by name and indexed by the values of the given
+    labels. on_change(type, object) is called on the watch thread for
+    each ADDED, MODIFIED or DELETED object.
+    """
+
+    # Delay before reconnecting after an error
+    RETRY_INTERVAL = 1
+
+    def __init__(self, list_func, namespace, label_selector, indexes=[],
+                 on_change=None, timeout=300, name=None):
+        self.list_func = list_func
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.on_change = on_change
+        self.timeout = timeout
+        self.name = name or list_func.__name__
+
+        self.lock = threading.Lock()
+        self.objects = {}
+
+        # Dict (label -> dict (value -> set of names))
+        self.indexes = {label: {} for label in indexes}
+
+        self.resource_version = None
+        self.synced = threading.Event()
+
+        self.watch = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run,
+                                       name=f'informer-{self.name}',
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+        if self.watch is not None:
+            self.watch.stop()
+
+    def get(self, name):
+        with self.lock:
+            return self.objects.get(name)
+
+    def list(self):
+        with self.lock:
+            return list(self.objects.values())
+
+    def by_index(self, label, value):
+        with self.lock:
+            names = self.indexes[label].get(value, ())
+
+            return [self.objects[n] for n in names]
+
+    def _labels(self, obj):
+        return obj.metadata.labels or {}
+
+    def _store(self, obj):
+        name = obj.metadata.name
+
+        self._remove(name)
+        self.objects[name] = obj
+
+        labels = self._labels(obj)
+        for label, index in self.indexes.items():
+            if label in labels:
+                index.setdefault(labels[label], set()).add(name)
+
+    def _remove(self, name):
+        obj = self.objects.pop(name, None)
+        if obj is None:
+            return None
+
+        labels = self._labels(obj)
+        for label, index in self.indexes.items():
+            names = index.get(labels.get(label))
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del index[labels[label]]
+
+        return obj
+
+    def _notify(self, typ, obj):
+        if self.on_change is None:
+            return
+
+        try:
+            self.on_change(typ, obj)
+        except Exception:
+            LOGGER.exception('Informer handler failed')
+
+    def relist(self):
+        resp = self.list_func(namespace=self.namespace,
+                              label_selector=self.label_selector)
+
+        with self.lock:
+            old = self.objects
+            self.objects = {}
+            for index in self.indexes.values():
+                index.clear()
+
+            for obj in resp.items:
+                self._store(obj)
+
+            self.resource_version = resp.metadata.resource_version
+
+        LOGGER.debug('Listed %d objects (%s) at version %s', len(resp.items),
+                     self.name, self.resource_version)
+
+        # Objects which have been deleted while we did not watch
+        for name, obj in old.items():
+            if name not in self.objects:
+                self._notify('DELETED', obj)
+
+        for obj in resp.items:
+            self._notify('ADDED' if obj.metadata.name not in old
+                         else 'MODIFIED', obj)
+
+        self.synced.set()
+
+    def handle(self, event):
+        typ = event['type']
+        obj = event['object']
+
+        if typ not in ['ADDED', 'MODIFIED', 'DELETED']:
+            return
+
+        with self.lock:
+            if typ == 'DELETED':
+                self._remove(obj.metadata.name)
+            else:
+                self._store(obj)
+
+        self._notify(typ, obj)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            try:
+                if self.resource_version is None:
+                    self.relist()
+
+                self.watch = k8s.watch.Watch()
+
+                for event in self.watch.stream(
+                        self.list_func,
+                        namespace=self.namespace,
+                        label_selector=self.label_selector,
+                        resource_version=self.resource_version,
+                        allow_watch_bookmarks=True,
+                        timeout_seconds=self.timeout):
+                    self.handle(event)
+
+                    # A lost watch resumes after the last event
+                    self.resource_version = self.watch.resource_version
+
+                    if self.stopped.is_set():
+                        break
+
+                # Bookmarks advance the version without an event
+                if self.watch.resource_version is not None:
+                    self.resource_version = self.watch.resource_version
+
+            except k8s.client.ApiException as e:
+                if e.status == 410:
+                    LOGGER.info('Version %s of %s expired. Listing again',
+                                self.resource_version, self.name)
+                    self.resource_version = None
+                else:
+                    LOGGER.error('Failed to watch %s: %s', self.name, e)
+                    self.stopped.wait(self.RETRY_INTERVAL)
+
+            except (urllib3.exceptions.HTTPError, OSError) as e:
+                LOGGER.warning('Lost watch of %s: %s', self.name, e)
+                self.stopped.wait(self.RETRY_INTERVAL)
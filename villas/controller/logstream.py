@@ -0,0 +1,189 @@
+import codecs
+import logging
+import os
+import threading
+import time
+
+from collections import deque
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LogStream:
+    """ Forwards the output of a child process in batches.
+
+    Output is read from a pipe by the reaper, appended to the tee file
+    and buffered. A batch is published as soon as batch_size characters
+    are buffered or interval seconds after the first buffered output.
+
+    Publishing is limited to rate characters per second. If the buffer
+    grows beyond buffer_size, the oldest output is dropped and the
+    number of dropped characters is reported with the next batch.
+    """
+
+    def __init__(self, fd, reaper, publish, tee=None, batch_size=16 << 10,
+                 interval=0.5, rate=64 << 10, buffer_size=256 << 10):
+        self.fd = fd
+        self.reaper = reaper
+        self.publish = publish
+        self.tee = tee
+
+        self.batch_size = batch_size
+        self.interval = interval
+        self.rate = rate
+        self.buffer_size = buffer_size
+
+        self.decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self.lock = threading.Lock()
+
+        self.buffer = deque()
+        self.buffered = 0
+        self.dropped = 0
+        self.seq = 0
+        self.timer = None
+        self.closed = False
+
+        # Token bucket for rate limiting
+        self.tokens = rate
+        self.refilled = time.monotonic()
+
+        os.set_blocking(fd, False)
+        reaper.add_reader(fd, self.on_readable)
+
+    def on_readable(self, fd):
+        """ Read available output. Returns False if none is available. """
+        if self.closed:
+            return False
+
+        try:
+            data = os.read(fd, 1 << 16)
+        except BlockingIOError:
+            return False
+
+        if not data:
+            self.close()
+            return False
+
+        if self.tee is not None:
+            self.tee.write(data)
+
+        self.feed(self.decoder.decode(data))
+
+        return True
+
+    def drain(self):
+        """ Read all output which is available without blocking. """
+        while self.on_readable(self.fd):
+            pass
+
+        if self.tee is not None and not self.tee.closed:
+            self.tee.flush()
+
+    def feed(self, text):
+        if not text:
+            return
+
+        with self.lock:
+            self.buffer.append(text)
+            self.buffered += len(text)
+
+            # The ring buffer drops the oldest output
+            while self.buffered > self.buffer_size:
+                chunk = self.buffer.popleft()
+                excess = self.buffered - self.buffer_size
+
+                if len(chunk) > excess:
+                    self.buffer.appendleft(chunk[excess:])
+                    chunk = chunk[:excess]
+
+                self.buffered -= len(chunk)
+                self.dropped += len(chunk)
+
+            if self.buffered >= self.batch_size:
+                flush = True
+            else:
+                flush = False
+                if self.timer is None:
+                    self.timer = self.reaper.call_later(self.interval,
+                                                        self.flush)
+
+        if flush:
+            self.flush()
+
+    def flush(self, final=False):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens +
+                              (now - self.refilled) * self.rate)
+            self.refilled = now
+
+            size = min(self.buffered, self.batch_size)
+            if not final:
+                size = min(size, int(self.tokens))
+
+            text = self.take(size)
+            self.tokens -= len(text)
+
+            dropped, self.dropped = self.dropped, 0
+
+            if text or dropped or final:
+                self.seq += 1
+                batch = {
+                    'log': text,
+                    'seq': self.seq,
+                    'dropped': dropped,
+                    'eof': final and self.buffered == 0
+                }
+            else:
+                batch = None
+
+            # Remaining output is sent once enough tokens are available
+            if self.buffered and not final:
+                delay = max(self.interval,
+                            min(self.buffered, self.batch_size) / self.rate)
+                self.timer = self.reaper.call_later(delay, self.flush)
+
+        if batch is not None:
+            try:
+                self.publish(batch)
+            except Exception:
+                LOGGER.exception('Failed to publish log batch')
+
+        if final and self.buffered:
+            self.flush(final=True)
+
+    def take(self, size):
+        parts = []
+
+        while size > 0 and self.buffer:
+            chunk = self.buffer.popleft()
+
+            if len(chunk) > size:
+                self.buffer.appendleft(chunk[size:])
+                chunk = chunk[:size]
+
+            parts.append(chunk)
+            size -= len(chunk)
+            self.buffered -= len(chunk)
+
+        return ''.join(parts)
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+        self.reaper.remove_reader(self.fd)
+        os.close(self.fd)
+
+        self.feed(self.decoder.decode(b'', final=True))
+
+        if self.tee is not None:
+            self.tee.close()
+
+        # The remaining output is sent regardless of the rate limit
+        self.flush(final=True)
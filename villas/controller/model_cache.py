@@ -0,0 +1,327 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+import requests
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ModelCache:
+    """ A content-addressed on-disk cache for simulation models.
+
+    Downloaded models are stored by the SHA-256 digest of their content.
+    ZIP archives are extracted once and the extracted tree is reused.
+    An index maps each URL to the digest, ETag and Last-Modified header
+    of its last download so that repeated downloads can be validated
+    with a conditional GET.
+
+    Objects which have not been used for the longest time are evicted
+    as soon as the cache grows beyond max_size bytes. Objects which are
+    pinned by a running simulation are never evicted. Each process which
+    pins an object records this by a file in its pins/ directory, so that
+    the cache can be shared by several processes, e.g. the workers of
+    the daemon. Pins of processes which no longer exist are ignored.
+    Paths returned by fetch() are shared and must not be modified.
+
+    Downloads are read in chunks of chunk_size bytes and hashed while
+    they are written. The members of an archive are extracted in
+    parallel by up to extract_workers threads.
+    """
+
+    # Dict (directory -> Counter (digest -> number of pins)) of the pins
+    # of this process
+    _pins = {}
+    _pins_lock = threading.Lock()
+
+    # Number of attempts to download a model which is evicted meanwhile
+    attempts = 3
+
+    def __init__(self, directory, max_size=4 << 30, chunk_size=1 << 20,
+                 extract_workers=None):
+        self.directory = directory
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+
+        self.lock = threading.Lock()
+        self.url_locks = {}
+
+        with self._pins_lock:
+            self.pins = self._pins.setdefault(os.path.realpath(directory),
+                                              Counter())
+
+    def fetch(self, url, digest=None, pin=False):
+        """ Return the local path of the model at url.
+
+        The path points either to the extracted tree of a ZIP archive
+        or to the downloaded file itself. If the expected SHA-256 digest
+        is known and already cached, no request is made at all.
+
+        With pin, the object is kept until it is released by release().
+        """
+        with self.lock:
+            lock = self.url_locks.setdefault(url, threading.Lock())
+
+            for sub in ['index', 'objects', 'tmp']:
+                os.makedirs(self._path(sub), exist_ok=True)
+
+        with lock:
+            if digest is not None and self._has_object(digest):
+                LOGGER.debug('Using cached model %s for %s', digest, url)
+
+                path = self._use(digest, pin)
+                if path is not None:
+                    return path
+
+            # Another process may evict the object before we use it.
+            # It is downloaded again in this case
+            for _ in range(self.attempts):
+                path = self._download(url, digest, pin)
+                if path is not None:
+                    return path
+
+                LOGGER.info('Model %s has been evicted meanwhile', url)
+
+            raise OSError(f'Model {url} has been evicted repeatedly')
+
+    def release(self, digest):
+        """ Release a pin of fetch(). """
+        with self._locked():
+            self.pins[digest] -= 1
+            if self.pins[digest] > 0:
+                return
+
+            del self.pins[digest]
+
+            try:
+                os.unlink(self._pin_path(digest, os.getpid()))
+            except FileNotFoundError:
+                pass
+
+    def evict(self, keep=None):
+        """ Remove least recently used objects until the cache fits. """
+        objects = []
+        total = 0
+
+        # Objects can not be pinned while we evict them
+        with self._locked():
+            with os.scandir(self._path('objects')) as it:
+                for obj in it:
+                    size = self._size(obj.path)
+                    total += size
+
+                    if obj.name != keep and not self._pinned(obj.name):
+                        objects.append((obj.stat().st_mtime, size, obj))
+
+            for _, size, obj in sorted(objects, key=lambda o: o[0]):
+                if total <= self.max_size:
+                    break
+
+                LOGGER.info('Evicting cached model %s', obj.name)
+                shutil.rmtree(obj.path, ignore_errors=True)
+                total -= size
+
+    @property
+    def size(self):
+        return self._size(self._path('objects'))
+
+    @staticmethod
+    def digest(path):
+        """ Return the SHA-256 digest of a path returned by fetch(). """
+        return os.path.basename(os.path.dirname(os.path.normpath(path)))
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def _index_path(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+
+        return self._path('index', key + '.json')
+
+    def _load_index(self, url):
+        try:
+            with open(self._index_path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_index(self, url, entry):
+        fd, tmp = tempfile.mkstemp(dir=self._path('tmp'))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+
+        os.replace(tmp, self._index_path(url))
+
+    def _has_object(self, digest):
+        return os.path.exists(self._path('objects', digest, 'model'))
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # Serializes pins and evictions of all threads and processes
+        with self._pins_lock, open(self._path('lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _pin_path(self, digest, pid):
+        return self._path('objects', digest, 'pins', str(pid))
+
+    def _pinned(self, digest):
+        try:
+            pids = os.listdir(self._path('objects', digest, 'pins'))
+        except FileNotFoundError:
+            return False
+
+        pinned = False
+        for pid in map(int, pids):
+            if pid == os.getpid():
+                pinned |= self.pins[digest] > 0
+            elif psutil.pid_exists(pid):
+                pinned = True
+            else:
+                # The process exited without releasing its pin
+                os.unlink(self._pin_path(digest, pid))
+
+        return pinned
+
+    def _use(self, digest, pin=False):
+        """ Return the path of an object or None if it has been evicted. """
+        obj = self._path('objects', digest)
+
+        with self._locked():
+            # The modification time of an object is its LRU timestamp
+            try:
+                os.utime(obj)
+            except FileNotFoundError:
+                return None
+
+            if pin:
+                self.pins[digest] += 1
+
+                pins = self._path('objects', digest, 'pins')
+                os.makedirs(pins, exist_ok=True)
+                open(self._pin_path(digest, os.getpid()), 'a').close()
+
+        tree = os.path.join(obj, 'tree')
+        if os.path.isdir(tree):
+            return tree
+
+        return os.path.join(obj, 'model')
+
+    def _download(self, url, digest, pin):
+        entry = self._load_index(url)
+        headers = {}
+
+        # A cached object with another digest than the expected one
+        # must not be validated but downloaded again
+        if digest is None and entry and \
+                self._has_object(entry['digest']):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with requests.get(url, headers=headers, stream=True) as r:
+            if r.status_code == 304:
+                LOGGER.debug('Model %s has not been modified', url)
+                return self._use(entry['digest'], pin)
+
+            r.raise_for_status()
+
+            new_digest = self._store(r)
+            entry = {
+                'url': url,
+                'digest': new_digest,
+                'etag': r.headers.get('ETag'),
+                'last_modified': r.headers.get('Last-Modified')
+            }
+
+        if digest is not None and digest != new_digest:
+            raise ValueError(f'Digest mismatch for {url}: '
+                             f'expected {digest}, got {new_digest}')
+
+        self._save_index(url, entry)
+        self.evict(keep=new_digest)
+
+        return self._use(new_digest, pin)
+
+    def _store(self, response):
+        tmpdir = tempfile.mkdtemp(dir=self._path('tmp'))
+
+        try:
+            h = hashlib.sha256()
+            model = os.path.join(tmpdir, 'model')
+
+            with open(model, 'wb') as f:
+                for chunk in response.iter_content(self.chunk_size):
+                    h.update(chunk)
+                    f.write(chunk)
+
+            digest = h.hexdigest()
+            if self._has_object(digest):
+                return digest
+
+            if zipfile.is_zipfile(model):
+                self._extract(model, os.path.join(tmpdir, 'tree'))
+
+            try:
+                os.rename(tmpdir, self._path('objects', digest))
+            except OSError:
+                # Another process has stored the same object meanwhile
+                if not self._has_object(digest):
+                    raise
+
+            return digest
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def _extract(self, archive, path):
+        with zipfile.ZipFile(archive) as z:
+            members = z.infolist()
+
+        # Distribute the members evenly by size over the workers.
+        # Each worker uses its own handle for the archive.
+        workers = min(self.extract_workers, len(members)) or 1
+        shares = [[] for _ in range(workers)]
+        members.sort(key=lambda m: m.file_size, reverse=True)
+        for i, member in enumerate(members):
+            shares[i % workers].append(member)
+
+        def extract(share):
+            with zipfile.ZipFile(archive) as z:
+                for member in share:
+                    try:
+                        z.extract(member, path)
+                    except FileExistsError:
+                        # Another worker created the parent directory
+                        z.extract(member, path)
+
+        with ThreadPoolExecutor(workers) as pool:
+            # Consume the results to raise the errors of the workers
+            list(pool.map(extract, shares))
+
+    @staticmethod
+    def _size(path):
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+
+        total = 0
+        for root, _, files in os.walk(path):
+            for fn in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, fn))
+                except OSError:
+                    pass
+
+        return total
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+
+import psutil
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Entry:
+
+    def __init__(self, value, size, parse_time):
+        self.value = value
+        self.size = size
+        self.parse_time = parse_time
+
+
+class ParseCache:
+    """ A memory-bounded LRU cache of parsed models.
+
+    Models are keyed by the digest of their content so that a model
+    which has not changed is parsed only once. The memory used by a
+    parsed model is estimated by the growth of the resident set size
+    during parsing, but at least by the size of its source files.
+
+    Least recently used models are evicted as soon as the estimated
+    size of all models exceeds max_size bytes. The most recent model
+    is always kept.
+    """
+
+    def __init__(self, max_size=1 << 30):
+        self.max_size = max_size
+
+        self.lock = threading.Lock()
+        self.key_locks = {}
+
+        self.entries = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.parse_time = 0.0
+        self.time_saved = 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, parse, size=0):
+        """ Return the parsed model for key.
+
+        parse() is only called if the model is not cached yet.
+        Concurrent calls for the same key parse the model once.
+        """
+        with self.lock:
+            lock = self.key_locks.setdefault(key, threading.Lock())
+
+        with lock:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    self.time_saved += entry.parse_time
+
+                    return entry.value
+
+                self.misses += 1
+
+            process = psutil.Process()
+            rss = process.memory_info().rss
+            started = time.monotonic()
+
+            try:
+                value = parse()
+            except Exception:
+                with self.lock:
+                    self.key_locks.pop(key, None)
+                raise
+
+            parse_time = time.monotonic() - started
+            size = max(size, process.memory_info().rss - rss)
+
+            LOGGER.info('Parsed model %s in %.3f s (%d bytes)',
+                        key, parse_time, size)
+
+            with self.lock:
+                self.entries[key] = Entry(value, size, parse_time)
+                self.size += size
+                self.parse_time += parse_time
+                self.key_locks.pop(key, None)
+
+                self.evict()
+
+            return value
+
+    def discard(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry.size
+
+    def evict(self):
+        while self.size > self.max_size and len(self.entries) > 1:
+            key, entry = self.entries.popitem(last=False)
+            self.size -= entry.size
+
+            LOGGER.info('Evicting parsed model %s', key)
+
+    @property
+    def status(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+
+            return {
+                'entries': len(self.entries),
+                'size': self.size,
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'parse_time': self.parse_time,
+                'time_saved': self.time_saved
+            }
@@ -0,0 +1,326 @@
+import json
+import os
+import resource
+import sys
+
+import psutil
+
+POLICIES = {
+    'other': os.SCHED_OTHER,
+    'batch': os.SCHED_BATCH,
+    'idle': os.SCHED_IDLE,
+    'fifo': os.SCHED_FIFO,
+    'rr': os.SCHED_RR
+}
+
+IOPRIO_CLASSES = {
+    'rt': psutil.IOPRIO_CLASS_RT,
+    'be': psutil.IOPRIO_CLASS_BE,
+    'idle': psutil.IOPRIO_CLASS_IDLE
+}
+
+# See capability.h
+CAP_IPC_LOCK = 14
+CAP_SYS_ADMIN = 21
+CAP_SYS_NICE = 23
+CAP_SYS_RESOURCE = 24
+
+
+def parse_cpus(spec):
+    """ Parse a list of CPUs or a CPU list string like '2-3,6'. """
+    if isinstance(spec, int):
+        return {spec}
+
+    if isinstance(spec, str):
+        cpus = set()
+        for part in spec.split(','):
+            part = part.strip()
+            if not part:
+                continue
+
+            first, _, last = part.partition('-')
+            cpus.update(range(int(first), int(last or first) + 1))
+
+        return cpus
+
+    return {int(cpu) for cpu in spec}
+
+
+def online_cpus():
+    try:
+        with open('/sys/devices/system/cpu/online') as f:
+            return parse_cpus(f.read())
+    except OSError:
+        return set(range(os.cpu_count() or 1))
+
+
+def capable(cap):
+    """ Check if this process has an effective capability. """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('CapEff:'):
+                    return bool(int(line.split()[1], 16) & (1 << cap))
+    except OSError:
+        pass
+
+    return os.geteuid() == 0
+
+
+def isolate(cpus):
+    """ Keep all threads of this process off the given CPUs.
+
+    Threads which are started later inherit the affinity of their
+    creator. Returns the remaining CPUs or None if none would remain.
+    """
+    allowed = os.sched_getaffinity(0) - set(cpus)
+    if not allowed:
+        return None
+
+    for tid in os.listdir('/proc/self/task'):
+        try:
+            os.sched_setaffinity(int(tid), allowed)
+        except OSError:
+            # The thread exited meanwhile
+            pass
+
+    return allowed
+
+
+class RealtimeOptions:
+    """ CPU affinity, scheduling and memory locking of a child process.
+
+    The options are applied by a small wrapper which is executed in
+    place of the child. The wrapper adjusts itself and then replaces
+    itself by the child, which inherits all settings except memory locks.
+    Those do not survive execve(). With 'mlock', the wrapper therefore
+    only lifts RLIMIT_MEMLOCK so that the child or an mlock wrapper can
+    call mlockall().
+    """
+
+    KEYS = ['cpus', 'sched_policy', 'sched_priority', 'nice', 'ionice',
+            'mlock']
+
+    def __init__(self, cpus=None, sched_policy=None, sched_priority=None,
+                 nice=None, ionice=None, mlock=False):
+        self.cpus = parse_cpus(cpus) if cpus is not None else None
+        self.sched_policy = sched_policy
+        self.sched_priority = sched_priority
+        self.nice = nice
+        self.ionice = ionice
+        self.mlock = bool(mlock)
+
+        if sched_policy is not None and sched_policy not in POLICIES:
+            raise ValueError(f'Unknown scheduling policy: {sched_policy}')
+
+        if self.realtime and sched_priority is None:
+            self.sched_priority = 1
+
+        if ionice is not None:
+            self.ioprio_class, self.ioprio_level = self.parse_ionice(ionice)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**{k: d[k] for k in cls.KEYS if k in d})
+
+    @staticmethod
+    def parse_ionice(spec):
+        """ Parse 'class[:level]' or {'class': ..., 'level': ...}. """
+        if isinstance(spec, dict):
+            cls, level = spec.get('class', 'be'), spec.get('level')
+        else:
+            cls, _, level = str(spec).partition(':')
+
+        if cls not in IOPRIO_CLASSES:
+            raise ValueError(f'Unknown I/O scheduling class: {cls}')
+
+        if cls == 'idle':
+            return cls, 0
+
+        level = int(level) if level not in [None, ''] else 4
+        if not 0 <= level <= 7:
+            raise ValueError(f'Invalid I/O priority level: {level}')
+
+        return cls, level
+
+    @property
+    def realtime(self):
+        return self.sched_policy in ['fifo', 'rr']
+
+    def __bool__(self):
+        return self.as_dict() != {}
+
+    def as_dict(self):
+        d = {}
+
+        if self.cpus is not None:
+            d['cpus'] = sorted(self.cpus)
+        if self.sched_policy is not None:
+            d['sched_policy'] = self.sched_policy
+            if self.realtime:
+                d['sched_priority'] = self.sched_priority
+        if self.nice is not None:
+            d['nice'] = self.nice
+        if self.ionice is not None:
+            d['ionice'] = f'{self.ioprio_class}:{self.ioprio_level}'
+        if self.mlock:
+            d['mlock'] = True
+
+        return d
+
+    def override(self, params):
+        """ Return the options of a run with per-start parameters.
+
+        A run may choose a subset of the CPUs and at most the scheduling
+        priority which are configured for the simulator, and at least its
+        nice value. CPU affinity, nice values, real-time scheduling and
+        memory locking can only be requested if they are configured for
+        the simulator.
+        """
+        opts = RealtimeOptions.from_dict({
+            **self.as_dict(),
+            **{k: params[k] for k in self.KEYS if k in params}
+        })
+
+        if opts.cpus != self.cpus:
+            if self.cpus is None:
+                raise ValueError('CPU affinity is not permitted '
+                                 'for this simulator')
+
+            if not opts.cpus <= self.cpus:
+                raise ValueError('CPUs %s are not reserved for this '
+                                 'simulator' % sorted(opts.cpus - self.cpus))
+
+        if opts.realtime:
+            if not self.realtime:
+                raise ValueError('Real-time scheduling is not permitted '
+                                 'for this simulator')
+
+            if opts.sched_priority > self.sched_priority:
+                raise ValueError('Scheduling priority exceeds the maximum '
+                                 f'of {self.sched_priority}')
+
+        if opts.nice is not None and opts.nice != self.nice:
+            if self.nice is None:
+                raise ValueError('Nice values are not permitted '
+                                 'for this simulator')
+
+            if opts.nice < self.nice:
+                raise ValueError('Nice value is below the minimum '
+                                 f'of {self.nice}')
+
+        if opts.mlock and not self.mlock:
+            raise ValueError('Locking memory is not permitted '
+                             'for this simulator')
+
+        if opts.ionice is not None and opts.ioprio_class == 'rt' and \
+           (self.ionice is None or self.ioprio_class != 'rt'):
+            raise ValueError('Real-time I/O scheduling is not permitted '
+                             'for this simulator')
+
+        return opts
+
+    def check(self):
+        """ Raise ValueError if the host can not grant the options. """
+        if self.cpus is not None:
+            if not self.cpus:
+                raise ValueError('Empty CPU set')
+
+            missing = self.cpus - online_cpus()
+            if missing:
+                raise ValueError(f'CPUs {sorted(missing)} are not online')
+
+        if self.realtime:
+            policy = POLICIES[self.sched_policy]
+            low = os.sched_get_priority_min(policy)
+            high = os.sched_get_priority_max(policy)
+
+            if not low <= self.sched_priority <= high:
+                raise ValueError(f'Scheduling priority must be between '
+                                 f'{low} and {high}')
+
+            limit, _ = resource.getrlimit(resource.RLIMIT_RTPRIO)
+            if not capable(CAP_SYS_NICE) and \
+               not (limit == resource.RLIM_INFINITY or
+                    self.sched_priority <= limit):
+                raise ValueError('Real-time scheduling is not permitted '
+                                 '(RLIMIT_RTPRIO or CAP_SYS_NICE required)')
+
+        if self.nice is not None:
+            if not -20 <= self.nice <= 19:
+                raise ValueError('Nice value must be between -20 and 19')
+
+            # Only privileged processes can raise the priority
+            limit, _ = resource.getrlimit(resource.RLIMIT_NICE)
+            if self.nice < os.getpriority(os.PRIO_PROCESS, 0) and \
+               not capable(CAP_SYS_NICE) and \
+               not (limit == resource.RLIM_INFINITY or
+                    20 - self.nice <= limit):
+                raise ValueError('Raising the priority is not permitted '
+                                 '(RLIMIT_NICE or CAP_SYS_NICE required)')
+
+        if self.ionice is not None and self.ioprio_class == 'rt':
+            if not (capable(CAP_SYS_ADMIN) or capable(CAP_SYS_NICE)):
+                raise ValueError('Real-time I/O scheduling is not permitted')
+
+        if self.mlock:
+            _, hard = resource.getrlimit(resource.RLIMIT_MEMLOCK)
+            if hard != resource.RLIM_INFINITY and \
+               not capable(CAP_IPC_LOCK) and \
+               not capable(CAP_SYS_RESOURCE):
+                raise ValueError('Locking memory is not permitted '
+                                 '(RLIMIT_MEMLOCK or CAP_IPC_LOCK required)')
+
+    def wrap(self, argv):
+        """ Prefix argv by the wrapper which applies the options. """
+        return [sys.executable, '-m', __name__,
+                json.dumps(self.as_dict()), '--', *argv]
+
+    def apply(self):
+        """ Apply the options to the calling process. """
+        if self.cpus is not None:
+            os.sched_setaffinity(0, self.cpus)
+
+        if self.sched_policy is not None:
+            priority = self.sched_priority if self.realtime else 0
+            os.sched_setscheduler(0, POLICIES[self.sched_policy],
+                                  os.sched_param(priority))
+
+        if self.nice is not None:
+            os.setpriority(os.PRIO_PROCESS, 0, self.nice)
+
+        if self.ionice is not None:
+            psutil.Process().ionice(IOPRIO_CLASSES[self.ioprio_class],
+                                    self.ioprio_level
+                                    if self.ioprio_class != 'idle' else None)
+
+        if self.mlock:
+            try:
+                resource.setrlimit(resource.RLIMIT_MEMLOCK,
+                                   (resource.RLIM_INFINITY,
+                                    resource.RLIM_INFINITY))
+            except (ValueError, OSError):
+                # Locking is not limited with CAP_IPC_LOCK
+                if not capable(CAP_IPC_LOCK):
+                    raise
+
+
+def main(argv):
+    opts = RealtimeOptions.from_dict(json.loads(argv[0]))
+    argv = argv[2:] if argv[1] == '--' else argv[1:]
+
+    try:
+        opts.apply()
+    except (OSError, ValueError, psutil.Error) as e:
+        print(f'Failed to apply real-time options: {e}', file=sys.stderr)
+        sys.exit(126)
+
+    try:
+        os.execvp(argv[0], argv)
+    except OSError as e:
+        print(f'Failed to execute {argv[0]}: {e}', file=sys.stderr)
+        sys.exit(127)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,381 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import selectors
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Timer:
+
+    def __init__(self, deadline, func, args):
+        self.deadline = deadline
+        self.func = func
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Reaper:
+    """ Watches child processes, their output and deadlines on a single
+    thread.
+
+    Exited children are detected by their pidfd and reaped. Where pidfds
+    are not available, children are polled instead. The callbacks of
+    exited children, readable file descriptors and expired timers are
+    called on the reaper thread and should therefore return quickly.
+    """
+
+    # Interval for polling children without a pidfd
+    POLL_INTERVAL = 0.1
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+
+        # File descriptors to be (un)registered by the reaper thread
+        self.pending = []
+        # Dict (Popen -> callback) of children without pidfd
+        self.polled = {}
+
+        # Heap of (deadline, seq, timer)
+        self.timers = []
+        self.counter = itertools.count()
+
+        self.rfd, self.wfd = os.pipe()
+        os.set_blocking(self.rfd, False)
+        self.selector.register(self.rfd, selectors.EVENT_READ)
+
+        self.thread = None
+        self.stopped = False
+
+    def __len__(self):
+        """ Number of watched children. """
+        with self.lock:
+            registered = [k for k in self.selector.get_map().values()
+                          if k.data and k.data[0] == 'child']
+            pending = [p for p in self.pending if p[1] == 'child']
+
+            return len(registered) + len(pending) + len(self.polled)
+
+    def watch(self, child, callback):
+        """ Call callback(child) once the subprocess.Popen child exited. """
+        try:
+            fd = os.pidfd_open(child.pid)
+        except (AttributeError, OSError):
+            fd = None
+
+        with self.lock:
+            if fd is None:
+                self.polled[child] = callback
+            else:
+                self.pending.append((fd, 'child', child, callback))
+
+        self._wakeup()
+
+    def add_reader(self, fd, callback):
+        """ Call callback(fd) whenever fd is readable. """
+        with self.lock:
+            self.pending.append((fd, 'reader', None, callback))
+
+        self._wakeup()
+
+    def remove_reader(self, fd):
+        with self.lock:
+            # Readers usually remove themselves on EOF
+            if threading.current_thread() is self.thread:
+                if fd in self.selector.get_map():
+                    self.selector.unregister(fd)
+                return
+
+            self.pending.append((fd, 'remove', None, None))
+
+        self._wakeup()
+
+    def call_later(self, delay, func, *args):
+        timer = Timer(time.monotonic() + delay, func, args)
+
+        with self.lock:
+            heapq.heappush(self.timers,
+                           (timer.deadline, next(self.counter), timer))
+
+        self._wakeup()
+
+        return timer
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+
+        self._wakeup()
+
+        if self.thread is not None:
+            self.thread.join()
+
+    def _wakeup(self):
+        with self.lock:
+            if self.thread is None and not self.stopped:
+                self.thread = threading.Thread(target=self._run,
+                                               name='villas-reaper',
+                                               daemon=True)
+                self.thread.start()
+
+        try:
+            os.write(self.wfd, b'\0')
+        except BlockingIOError:
+            pass
+
+    def _timeout(self):
+        with self.lock:
+            timeout = None
+
+            while self.timers and self.timers[0][2].cancelled:
+                heapq.heappop(self.timers)
+
+            if self.timers:
+                timeout = max(0, self.timers[0][0] - time.monotonic())
+
+            if self.polled:
+                timeout = min(timeout or self.POLL_INTERVAL,
+                              self.POLL_INTERVAL)
+
+            return timeout
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if self.stopped:
+                    break
+
+                for fd, kind, child, callback in self.pending:
+                    if kind == 'remove':
+                        if fd in self.selector.get_map():
+                            self.selector.unregister(fd)
+                    else:
+                        self.selector.register(fd, selectors.EVENT_READ,
+                                               (kind, child, callback))
+                self.pending = []
+
+            exited = []
+
+            for key, _ in self.selector.select(self._timeout()):
+                if key.fd == self.rfd:
+                    while True:
+                        try:
+                            if not os.read(self.rfd, 4096):
+                                break
+                        except BlockingIOError:
+                            break
+                    continue
+
+                kind, child, callback = key.data
+
+                if kind == 'reader':
+                    self._call(callback, key.fd)
+                else:
+                    with self.lock:
+                        self.selector.unregister(key.fd)
+                    os.close(key.fd)
+
+                    exited.append((child, callback))
+
+            with self.lock:
+                for child, callback in list(self.polled.items()):
+                    if child.poll() is not None:
+                        del self.polled[child]
+                        exited.append((child, callback))
+
+            for child, callback in exited:
+                self._reap(child)
+                self._call(callback, child)
+
+            now = time.monotonic()
+            while True:
+                with self.lock:
+                    if not self.timers or self.timers[0][0] > now:
+                        break
+
+                    _, _, timer = heapq.heappop(self.timers)
+
+                if not timer.cancelled:
+                    self._call(timer.func, *timer.args)
+
+    @staticmethod
+    def _reap(child):
+        """ Reap the child and set its returncode and resource usage. """
+        child.rusage = None
+
+        if child.returncode is not None:
+            return
+
+        try:
+            _, status, rusage = os.wait4(child.pid, 0)
+        except ChildProcessError:
+            child.wait()
+        else:
+            child.returncode = os.waitstatus_to_exitcode(status)
+            child.rusage = rusage
+
+    @staticmethod
+    def _call(func, *args):
+        try:
+            func(*args)
+        except Exception:
+            LOGGER.exception('Reaper callback failed')
+
+
+class AsyncReaper:
+    """ Watches child processes, their output and deadlines on an asyncio
+    event loop.
+
+    Provides the interface of Reaper for the asyncio engine. Exited
+    children are detected by their pidfd which is watched by the loop
+    like any other file descriptor, so no thread is needed. Methods can
+    be called from any thread. Calls before the reaper has been started
+    are deferred until start().
+    """
+
+    POLL_INTERVAL = Reaper.POLL_INTERVAL
+
+    def __init__(self):
+        self.loop = None
+        self.lock = threading.Lock()
+        self.stopped = False
+
+        # Calls deferred until the loop is known
+        self.pending = []
+        # Registered file descriptors (fd -> is pidfd)
+        self.fds = {}
+        self.watched = 0
+
+    def __len__(self):
+        """ Number of watched children. """
+        with self.lock:
+            return self.watched
+
+    def start(self, loop):
+        with self.lock:
+            self.loop = loop
+            pending, self.pending = self.pending, []
+
+        for func, args in pending:
+            func(*args)
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+
+        self._call_soon(self._close)
+
+    def watch(self, child, callback):
+        """ Call callback(child) once the subprocess.Popen child exited. """
+        with self.lock:
+            self.watched += 1
+
+        self._call_soon(self._watch, child, callback)
+
+    def add_reader(self, fd, callback):
+        """ Call callback(fd) whenever fd is readable. """
+        self._call_soon(self._add_reader, fd, callback)
+
+    def remove_reader(self, fd):
+        self._call_soon(self._remove_reader, fd)
+
+    def call_later(self, delay, func, *args):
+        timer = Timer(time.monotonic() + delay, func, args)
+
+        self._call_soon(self._call_later, delay, timer)
+
+        return timer
+
+    def _call_soon(self, func, *args):
+        with self.lock:
+            if self.loop is None:
+                self.pending.append((func, args))
+                return
+
+            loop = self.loop
+
+        if loop.is_closed():
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            func(*args)
+        else:
+            loop.call_soon_threadsafe(func, *args)
+
+    def _watch(self, child, callback):
+        if self.stopped:
+            return
+
+        try:
+            fd = os.pidfd_open(child.pid)
+        except (AttributeError, OSError):
+            self.loop.call_later(self.POLL_INTERVAL, self._poll,
+                                 child, callback)
+        else:
+            self.fds[fd] = True
+            self.loop.add_reader(fd, self._exited, fd, child, callback)
+
+    def _poll(self, child, callback):
+        if self.stopped:
+            return
+
+        if child.poll() is None:
+            self.loop.call_later(self.POLL_INTERVAL, self._poll,
+                                 child, callback)
+        else:
+            self._exited(None, child, callback)
+
+    def _exited(self, fd, child, callback):
+        if fd is not None:
+            self._remove_reader(fd)
+
+        with self.lock:
+            self.watched -= 1
+
+        Reaper._reap(child)
+        Reaper._call(callback, child)
+
+    def _add_reader(self, fd, callback):
+        if self.stopped:
+            return
+
+        self.fds[fd] = False
+        self.loop.add_reader(fd, Reaper._call, callback, fd)
+
+    def _remove_reader(self, fd):
+        pidfd = self.fds.pop(fd, None)
+        if pidfd is None:
+            return
+
+        self.loop.remove_reader(fd)
+
+        # Only pidfds are owned by the reaper
+        if pidfd:
+            os.close(fd)
+
+    def _call_later(self, delay, timer):
+        if self.stopped:
+            return
+
+        self.loop.call_later(delay, self._expired, timer)
+
+    def _expired(self, timer):
+        if not timer.cancelled and not self.stopped:
+            Reaper._call(timer.func, *timer.args)
+
+    def _close(self):
+        for fd in list(self.fds):
+            self._remove_reader(fd)
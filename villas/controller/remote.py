@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import threading
+import traceback
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RemoteError(Exception):
+    """ An exception raised by a call in the remote process. """
+
+    def __init__(self, type, msg, tb=None):
+        super().__init__(f'{type}: {msg}')
+
+        self.type = type
+        self.msg = msg
+        self.traceback = tb
+
+
+def serve(conn, factory, args):
+    """ Main loop of the remote process.
+
+    Calls the methods of the object returned by factory(*args) as
+    requested via conn until the connection is closed.
+    """
+    target = factory(*args)
+
+    while True:
+        try:
+            seq, method, args, kwargs = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        if method is None:
+            break
+
+        try:
+            result = getattr(target, method)(*args, **kwargs)
+            conn.send((seq, True, result))
+        except Exception as e:
+            conn.send((seq, False, (type(e).__name__, str(e),
+                                    traceback.format_exc())))
+
+    close = getattr(target, 'close', None)
+    if close is not None:
+        close()
+
+
+class RemoteProcess:
+    """ Hosts the object returned by factory(*args) in a separate process.
+
+    Methods of the object are called over a pipe. A crash of the remote
+    process leaves the calling process intact. If a reaper is given, its
+    thread detects the exit and calls on_exit(exitcode).
+    """
+
+    def __init__(self, factory, *args, name=None, reaper=None,
+                 on_exit=None):
+        self.context = multiprocessing.get_context('spawn')
+        self.conn, conn = self.context.Pipe()
+
+        self.process = self.context.Process(target=serve,
+                                            args=(conn, factory, args),
+                                            name=name,
+                                            daemon=True)
+        self.process.start()
+        conn.close()
+
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.stopping = False
+
+        self.reaper = reaper
+        self.on_exit = on_exit
+
+        if reaper is not None:
+            reaper.add_reader(self.process.sentinel, self._on_sentinel)
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            return self.call(method, *args, **kwargs)
+
+        return call
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    @property
+    def alive(self):
+        return self.process.is_alive()
+
+    def call(self, method, *args, timeout=None, **kwargs):
+        with self.lock:
+            self.seq += 1
+
+            try:
+                self.conn.send((self.seq, method, args, kwargs))
+
+                if self.conn.poll(timeout):
+                    seq, ok, result = self.conn.recv()
+                else:
+                    seq = None
+            except (EOFError, OSError):
+                self.process.join(1)
+                raise RemoteError('ProcessExited', 'Remote process exited '
+                                  f'with code {self.process.exitcode}')
+
+            if seq is None:
+                # The reply of a timed out call would be mistaken
+                # for the reply of the next one
+                self.kill()
+                raise TimeoutError(f'Remote call {method} timed out')
+
+        if not ok:
+            raise RemoteError(*result)
+
+        return result
+
+    def kill(self):
+        self.stopping = True
+        self.process.kill()
+        self.process.join()
+
+    def stop(self, timeout=5):
+        self.stopping = True
+
+        if self.process.is_alive():
+            try:
+                with self.lock:
+                    self.conn.send((0, None, (), {}))
+            except OSError:
+                pass
+
+            self.process.join(timeout)
+
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+
+        self.conn.close()
+
+    def _on_sentinel(self, fd):
+        self.reaper.remove_reader(fd)
+        self.process.join()
+
+        if not self.stopping and self.on_exit is not None:
+            self.on_exit(self.process.exitcode)
@@ -0,0 +1,175 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """ Runs periodic jobs for all components of a controller.
+
+    A single thread waits for the earliest deadline in a heap of jobs.
+    Each job gets a random phase within its first interval so that the
+    jobs of many components do not all fire at the same time.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.jobs = {}
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.stopped = False
+
+        self.thread = threading.Thread(target=self._run,
+                                       name='villas-scheduler',
+                                       daemon=True)
+
+    def start(self):
+        if not self.thread.is_alive():
+            self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def add(self, key, interval, func, jitter=True):
+        delay = random.uniform(0, interval) if jitter else interval
+
+        # Entries are mutable lists so that removed jobs
+        # can be invalidated without searching the heap
+        entry = [time.monotonic() + delay, next(self.counter),
+                 interval, func]
+
+        with self.cond:
+            old = self.jobs.pop(key, None)
+            if old:
+                old[3] = None
+
+            self.jobs[key] = entry
+            heapq.heappush(self.heap, entry)
+
+            self.cond.notify()
+
+    def remove(self, key):
+        with self.cond:
+            entry = self.jobs.pop(key, None)
+            if entry:
+                entry[3] = None
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def _next(self):
+        with self.cond:
+            while not self.stopped:
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+
+                entry = self.heap[0]
+                if entry[3] is None:
+                    heapq.heappop(self.heap)
+                    continue
+
+                now = time.monotonic()
+                if entry[0] > now:
+                    self.cond.wait(entry[0] - now)
+                    continue
+
+                # Reschedule without accumulating drift but skip
+                # deadlines which have been missed entirely
+                entry[0] += entry[2]
+                if entry[0] < now:
+                    entry[0] = now + entry[2]
+
+                heapq.heapreplace(self.heap, entry)
+
+                return entry[3]
+
+    def _run(self):
+        while True:
+            func = self._next()
+            if func is None:
+                break
+
+            try:
+                func()
+            except Exception:
+                LOGGER.exception('Scheduled job failed')
+
+
+class AsyncScheduler:
+    """ Runs periodic jobs as tasks on an asyncio event loop.
+
+    Jobs can be added and removed from any thread. Jobs which are added
+    before the scheduler has been started are spawned by start().
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.tasks = {}
+        self.loop = None
+
+    def start(self, loop):
+        self.loop = loop
+
+        for key in list(self.jobs):
+            self._spawn(key)
+
+    def stop(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+        self.tasks = {}
+
+    def add(self, key, interval, func, jitter=True):
+        self.jobs[key] = interval, func, jitter
+
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._spawn, key)
+
+    def remove(self, key):
+        self.jobs.pop(key, None)
+
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._cancel, key)
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def _cancel(self, key):
+        task = self.tasks.pop(key, None)
+        if task:
+            task.cancel()
+
+    def _spawn(self, key):
+        self._cancel(key)
+
+        job = self.jobs.get(key)
+        if job:
+            self.tasks[key] = self.loop.create_task(self._run(*job))
+
+    async def _run(self, interval, func, jitter):
+        delay = random.uniform(0, interval) if jitter else interval
+        deadline = self.loop.time() + delay
+
+        while True:
+            await asyncio.sleep(deadline - self.loop.time())
+
+            try:
+                func()
+            except Exception:
+                LOGGER.exception('Scheduled job failed')
+
+            # Skip deadlines which have been missed entirely
+            deadline += interval
+            if deadline < self.loop.time():
+                deadline = self.loop.time() + interval
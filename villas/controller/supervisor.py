@@ -0,0 +1,283 @@
+import argparse
+import logging
+import multiprocessing
+import queue
+import socket
+import time
+import uuid
+import zlib
+
+import kombu
+
+from villas.controller.component import Component
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Shard:
+    """ Identifies a worker process and its peers.
+
+    Each worker publishes its number of components in a shared array.
+    Requests for other workers are passed via their inbox queues.
+    Components which are created or deleted at runtime are reported to
+    the supervisor so that it can restore them after a restart.
+    """
+
+    def __init__(self, index, loads, inboxes, events=None):
+        self.index = index
+        self.loads = loads
+        self.inboxes = inboxes
+        self.events = events
+
+    @property
+    def primary(self):
+        return self.index == 0
+
+    def update_load(self, load):
+        self.loads[self.index] = load
+
+    def least_loaded(self):
+        loads = list(self.loads)
+
+        return loads.index(min(loads))
+
+    def send(self, index, action, parameters):
+        self.inboxes[index].put((action, parameters))
+
+    def broadcast(self, action, parameters):
+        for index in range(len(self.inboxes)):
+            if index != self.index:
+                self.send(index, action, parameters)
+
+    def report(self, action, parameters):
+        if self.events is not None:
+            self.events.put((self.index, action, parameters))
+
+    def receive(self):
+        while True:
+            try:
+                yield self.inboxes[self.index].get_nowait()
+            except queue.Empty:
+                break
+
+
+def worker_main(index, url, components, manager, shard, options):
+    from villas.controller.main import setup_logging
+
+    setup_logging(argparse.Namespace(log_level=options.pop('log_level')))
+
+    engine = options.pop('engine', 'kombu')
+
+    comps = [Component.from_dict(c) for c in components]
+
+    # All managers are hosted by the primary worker.
+    # The others get a replica of the generic manager
+    if not shard.primary:
+        manager = Component.from_dict(manager)
+    else:
+        manager = None
+
+    LOGGER.info('Starting worker %d with %d components', index, len(comps))
+
+    d = None
+    try:
+        if engine == 'asyncio':
+            from villas.controller.async_controller import AsyncController
+
+            options.pop('single_queue', None)
+
+            d = AsyncController(url, comps, shard=shard, manager=manager,
+                                **options)
+            d.run()
+        else:
+            from villas.controller.controller import ControllerMixin
+
+            with kombu.Connection(url, connect_timeout=3) as c:
+                d = ControllerMixin(c, comps, shard=shard, manager=manager,
+                                    **options)
+                d.run()
+    except KeyboardInterrupt:
+        if d is not None:
+            d.shutdown()
+
+
+class Supervisor:
+    """ Runs the components in several worker processes.
+
+    Components are assigned to workers by a stable hash of their UUID.
+    Managers are hosted by the first worker. Workers which exit are
+    restarted together with the components which have been created on
+    them at runtime. Workers which exit again shortly after their start
+    are restarted with an exponential backoff of up to max_backoff
+    seconds.
+
+    The working directory quota is split statically: each worker enforces
+    quota / workers for the simulators it hosts, independently of the
+    usage of the other workers. All workers together therefore do not
+    exceed the quota, but a worker can not use the unused share of another.
+    """
+
+    target = staticmethod(worker_main)
+
+    def __init__(self, url, components, workers, backoff=1, max_backoff=60,
+                 **options):
+        self.url = url
+        self.workers = workers
+        self.options = options
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        if options.get('workdir_quota') is not None:
+            options['workdir_quota'] //= workers
+
+        self.context = multiprocessing.get_context('spawn')
+        self.loads = self.context.Array('i', workers)
+        self.inboxes = [self.context.Queue() for _ in range(workers)]
+        self.events = self.context.Queue()
+        self.processes = [None] * workers
+
+        # Restarts of each worker with a backoff
+        self.started = [0] * workers
+        self.failures = [0] * workers
+        self.restart_at = [None] * workers
+
+        # Dict (uuid -> (worker index, parameters)) of components
+        # which have been created at runtime
+        self.created = {}
+
+        components = [self.prepare(c) for c in components]
+
+        self.manager = self.find_manager(components)
+        if self.manager not in components:
+            components.append(self.manager)
+
+        self.shards = self.assign(components, workers)
+
+    @staticmethod
+    def prepare(comp):
+        comp = dict(comp)
+
+        # All workers must agree on the UUIDs
+        if not comp.get('uuid'):
+            comp['uuid'] = str(uuid.uuid4())
+
+        return comp
+
+    @staticmethod
+    def find_manager(components):
+        for comp in components:
+            if comp.get('category') == 'manager' and \
+               comp.get('type', 'generic') == 'generic':
+                return comp
+
+        return {
+            'category': 'manager',
+            'type': 'generic',
+            'name': 'Generic Manager',
+            'location': socket.gethostname(),
+            'uuid': str(uuid.uuid4())
+        }
+
+    @staticmethod
+    def assign(components, workers):
+        shards = [[] for _ in range(workers)]
+
+        for comp in components:
+            if comp.get('category') == 'manager':
+                index = 0
+            else:
+                index = zlib.crc32(comp['uuid'].encode()) % workers
+
+            shards[index].append(comp)
+
+        return shards
+
+    def components(self, index):
+        created = [parameters for i, parameters in self.created.values()
+                   if i == index]
+
+        return self.shards[index] + created
+
+    def start(self, index):
+        shard = Shard(index, self.loads, self.inboxes, self.events)
+        components = self.components(index)
+
+        p = self.context.Process(target=self.target,
+                                 name=f'villas-worker-{index}',
+                                 args=(index, self.url, components,
+                                       self.manager, shard,
+                                       dict(self.options)))
+        p.start()
+
+        self.processes[index] = p
+        self.started[index] = time.monotonic()
+
+    def receive_events(self):
+        while True:
+            try:
+                index, action, parameters = self.events.get_nowait()
+            except queue.Empty:
+                break
+
+            uuid = parameters['uuid']
+
+            if action == 'created':
+                self.created[uuid] = index, parameters
+            elif action == 'deleted':
+                self.created.pop(uuid, None)
+
+    def check(self):
+        # Components created just before a crash are restored as well
+        self.receive_events()
+
+        now = time.monotonic()
+
+        for index, p in enumerate(self.processes):
+            if p.is_alive():
+                continue
+
+            if self.restart_at[index] is None:
+                # Workers which ran for a while are restarted immediately
+                if now - self.started[index] > self.max_backoff:
+                    self.failures[index] = 0
+
+                failures = self.failures[index]
+                delay = min(self.backoff * 2 ** (failures - 1),
+                            self.max_backoff) if failures else 0
+
+                self.failures[index] += 1
+                self.restart_at[index] = now + delay
+
+                created = len(self.components(index)) - \
+                    len(self.shards[index])
+
+                LOGGER.warning('Worker %d exited with code %d. Restarting '
+                               'with %d created components in %d s', index,
+                               p.exitcode, created, delay)
+
+            if now >= self.restart_at[index]:
+                self.restart_at[index] = None
+                self.loads[index] = 0
+                self.start(index)
+
+    def run(self):
+        LOGGER.info('Starting %d workers', self.workers)
+
+        for index in range(self.workers):
+            self.start(index)
+
+        while True:
+            self.check()
+
+            time.sleep(1)
+
+    def shutdown(self):
+        LOGGER.info('Shutdown workers')
+
+        # Workers receive the SIGINT of the terminal themselves
+        for p in self.processes:
+            if p is not None:
+                p.join(5)
+
+                if p.is_alive():
+                    p.terminate()
@@ -0,0 +1,366 @@
+import collections
+import itertools
+import logging
+import socket
+import time
+import uuid
+
+import kombu
+
+LOGGER = logging.getLogger(__name__)
+
+
+def expand_grid(grid):
+    """ Return all combinations of a dict (name -> list of values). """
+    names = list(grid.keys())
+    values = [v if isinstance(v, list) else [v] for v in grid.values()]
+
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*values)]
+
+
+def substitute(value, **fields):
+    """ Replace placeholders like {index} in all strings of value. """
+    if isinstance(value, str):
+        for key, field in fields.items():
+            value = value.replace('{%s}' % key, str(field))
+
+        return value
+
+    if isinstance(value, dict):
+        return {k: substitute(v, **fields) for k, v in value.items()}
+
+    if isinstance(value, list):
+        return [substitute(v, **fields) for v in value]
+
+    return value
+
+
+class Variant:
+    """ A single run of a parameter sweep. """
+
+    def __init__(self, index, parameters):
+        self.index = index
+        self.parameters = parameters
+
+        self.state = 'pending'
+        self.simulator = None
+        self.simuuid = None
+        self.results = None
+        self.upload = None
+        self.error = None
+
+        self.started = None
+        self.finished = None
+
+    @property
+    def manifest(self):
+        return {
+            'index': self.index,
+            'parameters': self.parameters,
+            'state': self.state,
+            'simulator': self.simulator,
+            'simuuid': self.simuuid,
+            'results': self.results,
+            'upload': self.upload,
+            'error': self.error,
+            'started': self.started,
+            'finished': self.finished,
+            'duration': self.finished - self.started
+            if self.finished and self.started else None
+        }
+
+
+class Sweep:
+    """ Fans the variants of a parameter study out over simulators.
+
+    Simulators matching all headers are discovered by a ping. Each idle
+    simulator gets as many runs as it has free slots, limited by
+    max_runs. The runs are identified by a UUID which is chosen by the
+    sweep. Their completion is tracked by the status messages of the
+    simulators. A run which does not complete within timeout seconds is
+    considered as failed.
+
+    Placeholders {index} and {simuuid} in the results of a run are
+    substituted so that each run uploads its results to its own URL.
+    """
+
+    # States in which a simulator with slots accepts further runs
+    ACCEPTING = ['idle', 'running']
+
+    # States in which a simulator does not accept runs without a reset
+    UNAVAILABLE = ['error', 'shuttingdown', 'shutdown', 'gone']
+
+    def __init__(self, connection, variants, headers={}, model=None,
+                 results=None, max_runs=None, timeout=None,
+                 discovery_timeout=10, ping_interval=10):
+        self.connection = connection
+        self.headers = {'category': 'simulator', **headers}
+
+        self.model = model
+        self.results = results
+        self.max_runs = max_runs
+        self.timeout = timeout
+        self.discovery_timeout = discovery_timeout
+        self.ping_interval = ping_interval
+
+        self.variants = [Variant(i, p) for i, p in enumerate(variants)]
+        self.pending = collections.deque(self.variants)
+
+        # Dict (simulator uuid -> last known status)
+        self.status = {}
+        # Dict (simulator uuid -> list of variants)
+        self.inflight = collections.defaultdict(list)
+        # Dict (simuuid -> variant)
+        self.runs = {}
+
+        # Highest number of concurrent runs
+        self.concurrency = 0
+
+        self.exchange = kombu.Exchange('villas', type='headers',
+                                       durable=True)
+        self.status_exchange = kombu.Exchange('villas.status',
+                                              type='headers',
+                                              durable=True)
+
+    @property
+    def done(self):
+        return not self.pending and not any(self.inflight.values())
+
+    def run(self):
+        started = time.time()
+        pinged = None
+        stalled = None
+
+        queue = kombu.Queue(bindings=[
+            kombu.binding(self.status_exchange, arguments={
+                'x-match': 'all',
+                **self.headers
+            }),
+            # Bulk status frames are filtered after their expansion
+            kombu.binding(self.status_exchange, arguments={
+                'x-match': 'all',
+                'bulk': True
+            })
+        ], durable=False)
+
+        with self.connection.channel() as channel:
+            self.producer = kombu.Producer(channel, exchange=self.exchange)
+
+            consumer = kombu.Consumer(channel, queues=queue,
+                                      on_message=self.on_message)
+
+            with consumer:
+                while not self.done:
+                    now = time.time()
+
+                    if pinged is None or now - pinged > self.ping_interval:
+                        self.producer.publish({'action': 'ping'},
+                                              headers=self.headers)
+                        pinged = now
+
+                    if not self.status and \
+                       now - started > self.discovery_timeout:
+                        raise RuntimeError('No matching simulator found')
+
+                    try:
+                        self.connection.drain_events(timeout=0.1)
+                    except (socket.timeout, TimeoutError):
+                        pass
+
+                    self.check_timeouts()
+                    self.dispatch()
+
+                    # Remaining runs fail if no simulator can accept them
+                    if self.pending and not any(self.inflight.values()) \
+                       and all(s.get('state') in self.UNAVAILABLE
+                               for s in self.status.values()):
+                        stalled = stalled or now
+                        if now - stalled > self.discovery_timeout:
+                            self.abort('No simulator accepts runs')
+                    else:
+                        stalled = None
+
+        return self.manifest(time.time() - started)
+
+    def manifest(self, duration=None):
+        states = collections.Counter(v.state for v in self.variants)
+
+        return {
+            'variants': [v.manifest for v in self.variants],
+            'summary': {
+                'total': len(self.variants),
+                'simulators': len(self.status),
+                'concurrency': self.concurrency,
+                'duration': duration,
+                **states
+            }
+        }
+
+    def matches(self, headers):
+        return all(headers.get(k) == v for k, v in self.headers.items())
+
+    def on_message(self, message):
+        payload = message.payload
+
+        if payload.get('bulk'):
+            for comp_uuid, comp in payload['components'].items():
+                if self.matches(comp['headers']):
+                    self.update(comp_uuid, {
+                        'status': {
+                            **payload['status'],
+                            **comp['status']
+                        }
+                    })
+        elif 'status' in payload and self.matches(message.headers):
+            self.update(message.headers['uuid'], payload)
+
+        message.ack()
+
+    def update(self, sim, payload):
+        status = payload['status']
+
+        # Delta updates only contain the changed fields
+        if payload.get('delta'):
+            if sim not in self.status:
+                return
+
+            status = {
+                **self.status.get(sim, {}),
+                **status
+            }
+            status = {k: v for k, v in status.items() if v is not None}
+        elif sim not in self.status:
+            LOGGER.info('Found simulator %s', sim)
+
+        self.status[sim] = status
+        self.check(sim)
+
+    def reported_runs(self, status):
+        """ Return a dict (simuuid -> status) of the runs of a simulator. """
+        if 'slots' in status:
+            return {r['simuuid']: r for r in status['slots']['runs']
+                    if r.get('simuuid')}
+
+        if status.get('simuuid'):
+            return {status['simuuid']: status}
+
+        return {}
+
+    def check(self, sim):
+        status = self.status[sim]
+        runs = self.reported_runs(status)
+
+        for simuuid, upload in status.get('uploads', {}).items():
+            if simuuid in self.runs:
+                self.runs[simuuid].upload = upload
+
+        for variant in list(self.inflight[sim]):
+            run = runs.get(variant.simuuid)
+
+            if run is None:
+                # A simulator reports a rejected start before it knows
+                # the UUID of the run. It does not accept runs in this
+                # state, so the error follows our start
+                if status['state'] == 'error':
+                    self.finish(variant, 'failed', status.get('msg'))
+                continue
+
+            if run['state'] == 'idle':
+                self.finish(variant, 'done')
+            elif run['state'] == 'error':
+                self.finish(variant, 'failed', run.get('msg'))
+            else:
+                variant.state = 'running'
+
+    def finish(self, variant, state, error=None):
+        variant.state = state
+        variant.error = error
+        variant.finished = time.time()
+
+        self.inflight[variant.simulator].remove(variant)
+
+        LOGGER.info('Run %d on %s: %s', variant.index, variant.simulator,
+                    state)
+
+    def abort(self, error):
+        while self.pending:
+            variant = self.pending.popleft()
+            variant.state = 'failed'
+            variant.error = error
+
+    def check_timeouts(self):
+        if self.timeout is None:
+            return
+
+        now = time.time()
+        for variants in list(self.inflight.values()):
+            for variant in list(variants):
+                if now - variant.started > self.timeout:
+                    self.finish(variant, 'failed', 'Timeout')
+
+    def capacity(self, sim):
+        """ Return the number of runs a simulator can accept now. """
+        status = self.status[sim]
+        inflight = len(self.inflight[sim])
+
+        if 'slots' in status:
+            if status['state'] not in self.ACCEPTING:
+                return 0
+
+            slots = status['slots']
+            free = slots['total'] - max(slots['busy'], inflight)
+        else:
+            if status['state'] != 'idle':
+                return 0
+
+            free = 1 - inflight
+
+        if self.max_runs is not None:
+            free = min(free, self.max_runs - inflight)
+
+        return max(0, free)
+
+    def dispatch(self):
+        # Runs are distributed round-robin over the simulators
+        while self.pending:
+            started = False
+
+            for sim in list(self.status.keys()):
+                if self.pending and self.capacity(sim) > 0:
+                    self.start(self.pending.popleft(), sim)
+                    started = True
+
+            if not started:
+                break
+
+        running = sum(len(v) for v in self.inflight.values())
+        self.concurrency = max(self.concurrency, running)
+
+    def start(self, variant, sim):
+        variant.simulator = sim
+        variant.simuuid = str(uuid.uuid4())
+        variant.state = 'starting'
+        variant.started = time.time()
+
+        message = {
+            'action': 'start',
+            'simuuid': variant.simuuid,
+            'parameters': variant.parameters
+        }
+
+        if self.model is not None:
+            message['model'] = self.model
+
+        if self.results is not None:
+            message['results'] = substitute(self.results,
+                                            index=variant.index,
+                                            simuuid=variant.simuuid)
+            variant.results = message['results'].get('url')
+
+        self.inflight[sim].append(variant)
+        self.runs[variant.simuuid] = variant
+
+        LOGGER.info('Starting run %d on %s', variant.index, sim)
+
+        self.producer.publish(message, headers={'uuid': sim})
@@ -0,0 +1,133 @@
+import time
+
+import psutil
+
+
+class ProcessTelemetry:
+    """ Samples the resource usage of a process and all its descendants.
+
+    Cumulative counters (CPU time, I/O bytes and context switches) are
+    remembered for every process of the tree, so that the totals do not
+    decrease when processes exit between samples.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.started = time.time()
+
+        # Dict ((pid, create_time) -> cumulative counters)
+        self.counters = {}
+
+        self.last = None
+        self.last_time = None
+        self.samples = 0
+
+        self.rss_peak = 0
+        self.threads_peak = 0
+        self.processes_peak = 0
+
+    def processes(self):
+        try:
+            parent = psutil.Process(self.pid)
+
+            return [parent] + parent.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    def sample(self):
+        rss = 0
+        threads = 0
+        processes = 0
+
+        for p in self.processes():
+            try:
+                with p.oneshot():
+                    key = p.pid, p.create_time()
+
+                    cpu = p.cpu_times()
+                    ctx = p.num_ctx_switches()
+
+                    try:
+                        io = p.io_counters()
+                        read, written = io.read_bytes, io.write_bytes
+                    except (psutil.AccessDenied, AttributeError):
+                        read, written = 0, 0
+
+                    self.counters[key] = (
+                        cpu.user + cpu.system,
+                        read,
+                        written,
+                        ctx.voluntary + ctx.involuntary
+                    )
+
+                    rss += p.memory_info().rss
+                    threads += p.num_threads()
+                    processes += 1
+            except psutil.Error:
+                # The process exited meanwhile
+                continue
+
+        self.rss_peak = max(self.rss_peak, rss)
+        self.threads_peak = max(self.threads_peak, threads)
+        self.processes_peak = max(self.processes_peak, processes)
+        self.samples += 1
+
+        cpu_time, read, written, ctx = self.totals
+        now = time.monotonic()
+
+        if self.last_time is not None and now > self.last_time:
+            cpu_percent = 100 * (cpu_time - self.last['cpu_time']) / \
+                (now - self.last_time)
+        else:
+            cpu_percent = 0.0
+
+        self.last_time = now
+        self.last = {
+            'cpu_time': cpu_time,
+            'cpu_percent': cpu_percent,
+            'rss': rss,
+            'read_bytes': read,
+            'write_bytes': written,
+            'ctx_switches': ctx,
+            'threads': threads,
+            'processes': processes
+        }
+
+        return self.last
+
+    @property
+    def totals(self):
+        totals = [0, 0, 0, 0]
+        for counters in self.counters.values():
+            for i, value in enumerate(counters):
+                totals[i] += value
+
+        return tuple(totals)
+
+    def summary(self, rusage=None):
+        """ Return a summary of the whole run.
+
+        The resource usage of the reaped child is included, if known.
+        It also covers runs which were too short to be sampled.
+        """
+        cpu_time, read, written, ctx = self.totals
+        rss_peak = self.rss_peak
+
+        if rusage is not None:
+            cpu_time = max(cpu_time, rusage.ru_utime + rusage.ru_stime)
+            ctx = max(ctx, rusage.ru_nvcsw + rusage.ru_nivcsw)
+
+            # ru_maxrss is given in KiB on Linux
+            rss_peak = max(rss_peak, rusage.ru_maxrss * 1024)
+
+        return {
+            'duration': time.time() - self.started,
+            'cpu_time': cpu_time,
+            'rss_peak': rss_peak,
+            'read_bytes': read,
+            'write_bytes': written,
+            'ctx_switches': ctx,
+            'threads_peak': self.threads_peak,
+            'processes_peak': self.processes_peak,
+            'samples': self.samples
+        }
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from villas.controller.archiver import ZipStream
+
+LOGGER = logging.getLogger(__name__)
+
+
+class UploadJob:
+    """ The upload of the results of a single simulation run.
+
+    The results are archived while they are sent, so that no archive
+    is written to disk. Progress is counted in bytes of the results.
+    An attempt fails if the server does not accept the connection or
+    does not respond within timeout seconds.
+    """
+
+    def __init__(self, url, folder, level=6, workers=None, timeout=60):
+        self.url = url
+        self.folder = folder
+        self.level = level
+        self.workers = workers
+        self.timeout = timeout
+
+        self.state = 'queued'
+        self.size = 0
+        self.attempts = 0
+        self.error = None
+
+        self.stream = None
+        self.done = threading.Event()
+
+        # Functions which are called with the job once it has finished
+        self.callbacks = []
+
+    @property
+    def sent(self):
+        return self.stream.read if self.stream is not None else 0
+
+    @property
+    def status(self):
+        status = {
+            'state': self.state,
+            'sent': self.sent,
+            'size': self.size,
+            'attempts': self.attempts
+        }
+
+        if self.error:
+            status['error'] = self.error
+
+        return status
+
+    def upload(self):
+        self.state = 'uploading'
+        self.attempts += 1
+
+        # The body is sent with chunked transfer encoding
+        self.stream = ZipStream(self.folder, self.level, self.workers)
+        self.size = self.stream.size
+
+        r = requests.put(self.url, data=iter(self.stream),
+                         timeout=self.timeout)
+        r.raise_for_status()
+
+        self.state = 'done'
+        self.error = None
+
+    def finish(self):
+        self.done.set()
+
+        for callback in self.callbacks:
+            callback(self)
+
+
+class ResultUploader:
+    """ Uploads simulation results in the background.
+
+    At most max_workers uploads run at the same time. Failed uploads
+    are retried with an exponential backoff.
+    """
+
+    def __init__(self, max_workers=2, retries=5, backoff=1, max_backoff=60):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.pool = ThreadPoolExecutor(max_workers,
+                                       thread_name_prefix='villas-upload')
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def submit(self, job):
+        with self.lock:
+            self.pending.add(job)
+
+        self.pool.submit(self.run, job)
+
+        return job
+
+    def run(self, job):
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    job.upload()
+
+                    LOGGER.info('Uploaded results %s to %s',
+                                job.folder, job.url)
+                    return
+                except (requests.RequestException, OSError) as e:
+                    job.error = str(e)
+
+                    if attempt == self.retries:
+                        break
+
+                    delay = min(self.backoff * 2 ** attempt,
+                                self.max_backoff)
+                    job.state = 'retrying'
+
+                    LOGGER.warning('Upload of %s failed: %s. Retrying in '
+                                   '%d s', job.folder, e, delay)
+                    time.sleep(delay)
+
+            job.state = 'failed'
+            LOGGER.error('Upload of %s failed: %s', job.folder, job.error)
+        finally:
+            with self.lock:
+                self.pending.discard(job)
+
+            job.finish()
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            pending = len(self.pending)
+
+        if pending and not wait:
+            LOGGER.warning('Abandoning %d pending uploads', pending)
+
+        self.pool.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Run:
+
+    def __init__(self, name, path, mtime, size, released):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.released = released
+
+
+class WorkdirManager:
+    """ Manages the working directories of the runs of a simulator.
+
+    Runs are released once their results are no longer needed, e.g. after
+    their upload has been confirmed. Released runs are removed when they
+    are older than max_age seconds, when there are more than max_runs
+    runs or when the runs occupy more than quota bytes. Runs which have
+    not been released are only removed when they are older than max_age.
+    Without any limit, no run is ever removed.
+    """
+
+    # Marker of a released run. It contains the size of the run
+    RELEASED = '.released'
+
+    def __init__(self, root, quota=None, max_age=None, max_runs=None):
+        self.root = root
+        self.quota = quota
+        self.max_age = max_age
+        self.max_runs = max_runs
+
+        self.lock = threading.Lock()
+        self.usage = 0
+        self.count = 0
+
+    @property
+    def status(self):
+        return {
+            'usage': self.usage,
+            'runs': self.count,
+            'quota': self.quota
+        }
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def release(self, name):
+        path = self.path(name)
+        size = self.size(path)
+
+        with open(os.path.join(path, self.RELEASED), 'w') as f:
+            json.dump({'size': size}, f)
+
+    def runs(self):
+        runs = []
+
+        try:
+            it = os.scandir(self.root)
+        except FileNotFoundError:
+            return runs
+
+        with it:
+            for entry in it:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+
+                # The size of released runs does not change anymore
+                try:
+                    with open(os.path.join(entry.path, self.RELEASED)) as f:
+                        size = json.load(f)['size']
+                        released = True
+                except (OSError, ValueError, KeyError):
+                    size = self.size(entry.path)
+                    released = False
+
+                runs.append(Run(entry.name, entry.path,
+                                entry.stat().st_mtime, size, released))
+
+        runs.sort(key=lambda r: r.mtime)
+
+        return runs
+
+    def collect(self, keep=(), now=None):
+        """ Remove runs according to the retention policy.
+
+        Runs whose names are in keep are never removed.
+        Returns the removed runs.
+        """
+        if now is None:
+            now = time.time()
+
+        with self.lock:
+            runs = self.runs()
+            removed = []
+
+            def remove(run):
+                LOGGER.info('Removing working directory %s', run.path)
+                shutil.rmtree(run.path, ignore_errors=True)
+
+                runs.remove(run)
+                removed.append(run)
+
+            candidates = [r for r in runs if r.name not in keep]
+
+            if self.max_age is not None:
+                for run in candidates:
+                    if now - run.mtime > self.max_age:
+                        remove(run)
+
+            # Oldest released runs are removed first
+            released = [r for r in candidates
+                        if r.released and r not in removed]
+
+            for run in released:
+                usage = sum(r.size for r in runs)
+
+                over_count = self.max_runs is not None and \
+                    len(runs) > self.max_runs
+                over_quota = self.quota is not None and \
+                    usage > self.quota
+
+                if not over_count and not over_quota:
+                    break
+
+                remove(run)
+
+            self.usage = sum(r.size for r in runs)
+            self.count = len(runs)
+
+            return removed
+
+    @staticmethod
+    def size(path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for fn in files:
+                try:
+                    total += os.lstat(os.path.join(root, fn)).st_size
+                except OSError:
+                    pass
+
+        return total
+
+    @staticmethod
+    def collect_global(managers, quota):
+        """ Remove the oldest released runs of all managers until their
+        total usage does not exceed quota. """
+        runs = []
+        usage = 0
+
+        for manager in managers:
+            with manager.lock:
+                for run in manager.runs():
+                    usage += run.size
+                    if run.released:
+                        runs.append((run, manager))
+
+        for run, manager in sorted(runs, key=lambda r: r[0].mtime):
+            if usage <= quota:
+                break
+
+            with manager.lock:
+                LOGGER.info('Removing working directory %s', run.path)
+                shutil.rmtree(run.path, ignore_errors=True)
+
+                manager.usage -= run.size
+                manager.count -= 1
+
+            usage -= run.size